@@ -1,37 +1,87 @@
 import cv2
 import numpy as np
-from picamera2 import Picamera2
-from libcamera import controls
-import apriltag
+from CameraService import CameraService
+from Display import Display
+from AprilTagTracker import AprilTagTracker
+from TagLocalizer import CameraIntrinsics, TagMap, TagLocalizer
+from MotionGate import MotionGate
+from RobotBus import Bus
+import os
 import time
 
-cam = Picamera2()
-cam.configure(cam.create_preview_configuration(main={"format": 'XRGB8888', "size": (640, 480)}))
-cam.start()
-cam.set_controls({"AfMode":controls.AfModeEnum.Continuous})
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Tag placements (metres, see tag_map.json) and the camera calibration saved with
+# CameraIntrinsics.save(); without a calibration an ideal Pi Camera v2 is assumed
+TAG_MAP = os.path.join(HERE, "tag_map.json")
+CALIBRATION = os.path.join(HERE, "camera_calibration.npz")
+# Camera on the robot: x forward, y left, z up (metres), pitch down (degrees)
+CAMERA_POSE = (0.08, 0.0, 0.12, 0.0)
 
-# t_start = time.time()
-# fps = 0
+# The detector reads the grayscale Y plane of the lores stream (no XRGB -> GRAY
+# conversion); the XRGB main stream is only used for the display
+cam = CameraService(size=(640, 480), format='XRGB8888', lores=(640, 480)).start()
+frames = cam.reader("apriltag", stream="gray")
+# ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+display = Display.from_env("frame")
+shown_frames = cam.reader("display") if display.mode != "none" else None
 
-while True:
+# One detector for the whole run: quads found at 1/2 resolution, two worker
+# threads; after the first hit only the areas around known tags are searched,
+# with a full-frame pass every 15 frames to pick up new tags
+tracker = AprilTagTracker(family="tag36h11", quad_decimate=2.0, threads=2, full_every=15)
+
+# Intrinsics are loaded once; every frame's robot pose is one PnP solve over all
+# map tags in view, published with the frame timestamp on "vision/pose"
+if os.path.exists(CALIBRATION):
+    intrinsics = CameraIntrinsics.load(CALIBRATION, size=(640, 480))
+else:
+    print(f"No {os.path.basename(CALIBRATION)}: assuming an undistorted Pi Camera v2")
+    intrinsics = CameraIntrinsics.from_fov((640, 480))
+bus = Bus()
+localizer = TagLocalizer(intrinsics, TagMap.from_file(TAG_MAP), camera_pose=CAMERA_POSE, bus=bus)
+# Detection is skipped while the view is unchanged (the last tags and pose stay
+# valid), apart from one pass a second
+gate = MotionGate(keep_alive_s=1.0)
+detections = []
+
+while display.running:
    
-    frame = cam.capture_array()
-    # fps += 1
-    # mfps = fps / (time.time() - t_start)
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    detector = apriltag.Detector()
-    detections = detector.detect(gray)
-    # cv2.putText(frame, "FPS : " + str(int(mfps)), (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-    
-    for detect in detections:
-        print("tag_id: %s, center: %s" % (detect.tag_id, detect.center)) 
+    captured = frames.get(timeout=1)
+    if captured is None:
+        continue
+    if gate.should_run(captured.array, captured.timestamp_ns):
+        detections = tracker.detect(captured.array, captured.timestamp_ns)
+        frames.release()
+        pose = localizer.locate(detections, captured.timestamp_ns)
+        for detect in detections:
+            print("tag_id: %s, center: %s, corners: %s, t: %d" % (detect.tag_id, detect.center,
+                                                                  detect.corners.tolist(), detect.timestamp_ns))
+        if pose is not None:
+            print(pose)
+    else:
+        frames.release()
+
+    if not display.wants_frame():
+        continue  # nobody is watching: skip the overlays
+    shown = shown_frames.get(timeout=0)
+    if shown is None:
+        continue
+    # The ring buffer is shared with other consumers; draw on a copy
+    frame = shown.array.copy()
+    tracker.draw(frame, detections)
+    stats = tracker.stats()
+    cv2.putText(frame, f"detect : {stats['detect_ms_mean']:.1f} ms", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                (0, 255, 0), 1)
+    if localizer.last is not None:
+        last = localizer.last
+        cv2.putText(frame, f"x {last.x:+.2f} m  y {last.y:+.2f} m  yaw {np.degrees(last.yaw):+.0f} deg", (10, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+    if detections:
         cv2.putText(frame, "AprilTag Detected", (30, 480), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        
-        
-    cv2.imshow('frame', frame)
+    display.show(frame)
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+display.close()
 cam.stop()
-cv2.destroyAllWindows()
-
+print(tracker.stats())
+print(localizer.stats())
+print(gate.stats())
@@ -1,4 +1,5 @@
 from RPi_Robot_Hat_Lib import RobotController
+from SharedState import SharedState
 import time 
 import os
 import sys
@@ -64,6 +65,8 @@ robot = RobotController()
 LOW_BATTERY_TRESH = 11
 USB_VOLTAGE = 5
 CHECK_INTERVAL = 30
+STATE_MAX_AGE = 5 # Seconds before a shared state battery reading is considered stale
+shared_state = None
 
 i2c = busio.I2C(board.SCL, board.SDA)
 disp = adafruit_ssd1306.SSD1306_I2C(128, 64, i2c)
@@ -172,6 +175,19 @@ def battery_checker(battery_stat):
             # time.sleep(1)
 
 
+def read_battery():
+    """Battery voltage from the state server's shared memory when it is running,
+    otherwise straight from the robot hat."""
+    global shared_state
+    if shared_state is None:
+        shared_state = SharedState.attach()
+    if shared_state is not None:
+        sample = shared_state.read_sample("battery")
+        if sample.valid and sample.age() < STATE_MAX_AGE:
+            return sample.value
+    return robot.get_battery()
+
+
 def main():
     global font
     # Clear existing log files at startup
@@ -187,7 +203,7 @@ def main():
     robot.cleanup_buzzer()
     while True: 
         try:
-            battery_stat = robot.get_battery()  
+            battery_stat = read_battery()
             battery_checker(battery_stat)
             time.sleep(CHECK_INTERVAL)
         except Exception as e:
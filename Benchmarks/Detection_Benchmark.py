@@ -0,0 +1,240 @@
+"""
+Repeatable detection post-processing benchmark on model output tensors.
+
+Decodes YOLOv5 output tensors, either saved from the camera example
+(yolo_v5_real_time_with_labels.py --save-output outputs.npy) or synthetic
+ones with clusters of overlapping anchor boxes per object, and measures,
+for each decoding implementation, the frame rate, CPU cost and the number
+of detections reported per frame.
+
+Also times writing a 300x300 picture into float and quantized input
+tensors, and, given .tflite models (e.g. a float and an int8 build of the
+same network) and a TFLite runtime, the preprocess + invoke latency of each
+model side by side, with and without XNNPACK.
+
+Usage:
+    python3 Detection_Benchmark.py [--tensors outputs.npy] [--frames N] [--seed N]
+                                   [--models float.tflite int8.tflite] [--threads N]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Allow running straight from a checkout without installing the libraries
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for lib in ("Robot_Core", "Robot_Vision"):
+    sys.path.insert(0, os.path.join(REPO_ROOT, "Libraries", lib))
+
+import cv2
+import numpy as np
+
+INPUT_SIZE = 300        # SSD MobileNet input
+ROWS = 25200            # YOLOv5s anchors at 640x640
+CLASSES = 80
+SCORE_THRESHOLD = 0.4
+FRAME_SIZE = (1920, 1080)
+
+
+def synthetic_outputs(frames, seed, objects=8, anchors_per_object=12):
+    """(1, ROWS, 5 + CLASSES) float32 outputs: low-confidence background rows and a few objects"""
+    rng = np.random.default_rng(seed)
+    outputs = []
+    for i in range(frames):
+        output = np.empty((1, ROWS, 5 + CLASSES), dtype=np.float32)
+        output[0, :, :4] = rng.uniform(0, 1, size=(ROWS, 4))
+        output[0, :, 4] = rng.uniform(0, 0.3, size=ROWS)
+        output[0, :, 5:] = rng.uniform(0, 0.2, size=(ROWS, CLASSES))
+        rows = rng.choice(ROWS, objects * anchors_per_object, replace=False).reshape(objects, anchors_per_object)
+        for k, anchors in enumerate(rows):
+            t = i / 30.0
+            center = np.array([0.5 + 0.35 * np.sin(t + k), 0.5 + 0.35 * np.cos(t * 0.7 + k)])
+            size = np.array([0.08 + 0.02 * k, 0.12 + 0.01 * k])
+            # Several anchors see the same object with jittered boxes
+            output[0, anchors, 0:2] = center + rng.normal(0, 0.005, size=(len(anchors), 2))
+            output[0, anchors, 2:4] = size * rng.uniform(0.9, 1.1, size=(len(anchors), 2))
+            output[0, anchors, 4] = rng.uniform(0.5, 0.95, size=len(anchors))
+            output[0, anchors, 5 + (k * 7) % CLASSES] = rng.uniform(0.8, 1.0, size=len(anchors))
+        outputs.append(output)
+    return outputs
+
+
+def summarize(name, latencies, wall, cpu, extra=None):
+    result = {
+        "case": name,
+        "frames": len(latencies),
+        "fps": len(latencies) / wall if wall > 0 else 0.0,
+        "cpu_pct": 100.0 * cpu / wall if wall > 0 else 0.0,
+        "lat_mean_ms": 1000.0 * statistics.mean(latencies) if latencies else float("nan"),
+        "lat_p95_ms": 1000.0 * sorted(latencies)[int(0.95 * (len(latencies) - 1))] if latencies else float("nan"),
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def run(name, outputs, decode):
+    """Frame rate of a decoding function and the mean number of detections per frame"""
+    counts, latencies = [], []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for output in outputs:
+        start = time.perf_counter()
+        counts.append(decode(output))
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    return summarize(name, latencies, wall, cpu, {"dets_per_frame": statistics.mean(counts)})
+
+
+##---------YOLOv5 decoding cases---------##
+def bench_yolo_classfilter(outputs):
+    """Current example: per-row argmax list, xyxy over every row, Python threshold loop, no NMS."""
+    def decode(output_data):
+        output_data = output_data[0]
+        boxes = np.squeeze(output_data[..., :4])
+        scores = np.squeeze(output_data[..., 4:5])
+        classes = [c.argmax() for c in output_data[..., 5:]]
+        x, y, w, h = boxes[..., 0], boxes[..., 1], boxes[..., 2], boxes[..., 3]
+        xyxy = [x - w / 2, y - h / 2, x + w / 2, y + h / 2]
+        rectangles = []
+        for i in range(len(scores)):
+            if (scores[i] > SCORE_THRESHOLD) and (scores[i] <= 1.0):
+                xmin = int(max(1, (xyxy[0][i] * FRAME_SIZE[0])))
+                ymin = int(max(1, (xyxy[1][i] * FRAME_SIZE[1])))
+                xmax = int(min(FRAME_SIZE[0], (xyxy[2][i] * FRAME_SIZE[0])))
+                ymax = int(min(FRAME_SIZE[1], (xyxy[3][i] * FRAME_SIZE[1])))
+                rectangles.append([xmin, ymin, xmax, ymax, classes[i]])
+        return len(rectangles)
+    return run("yolo_classfilter", outputs, decode)
+
+
+def bench_yolo_vectorized(outputs):
+    """YOLODecoder: objectness mask first, vectorized argmax and boxes, class-aware NumPy NMS."""
+    from YOLODecoder import YOLODecoder
+    decoder = YOLODecoder(score_threshold=SCORE_THRESHOLD)
+
+    def decode(output):
+        detections = decoder.decode(output)
+        boxes = np.stack([detections["xmin"], detections["ymin"], detections["xmax"], detections["ymax"]], axis=1)
+        boxes = (boxes * np.array(FRAME_SIZE * 2)).astype(np.int32)
+        return len(boxes)
+    return run("yolo_vectorized", outputs, decode)
+##########################################
+
+
+##---------Input tensor cases------------##
+def run_input(name, pictures, write):
+    latencies = []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for picture in pictures:
+        start = time.perf_counter()
+        write(picture)
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    return summarize(name, latencies, wall, cpu)
+
+
+def bench_input_float_alloc(pictures):
+    """Current examples: expand_dims, then (np.float32(x) - 127.5) / 127.5 in new arrays."""
+    tensor = np.empty((1, INPUT_SIZE, INPUT_SIZE, 3), dtype=np.float32)
+
+    def write(picture):
+        input_data = np.expand_dims(picture, axis=0)
+        input_data = (np.float32(input_data) - 127.5) / 127.5
+        tensor[...] = input_data  # what set_tensor() copies
+    return run_input("input_float_alloc", pictures, write)
+
+
+def bench_input_float_inplace(pictures):
+    """Model.set_input on a float model: normalized in place into the input tensor."""
+    tensor = np.empty((INPUT_SIZE, INPUT_SIZE, 3), dtype=np.float32)
+
+    def write(picture):
+        np.subtract(picture, 127.5, out=tensor, casting="unsafe")
+        np.multiply(tensor, 1.0 / 127.5, out=tensor)
+    return run_input("input_float_inplace", pictures, write)
+
+
+def bench_input_int8_lut(pictures):
+    """Model.set_input on an int8 model: one 256-entry table lookup into the tensor."""
+    from TFLiteDetector import input_lut
+    lut = input_lut({"dtype": np.int8, "quantization": (1 / 128.0, 0)}, mean=127.5, std=127.5)
+    tensor = np.empty((INPUT_SIZE, INPUT_SIZE, 3), dtype=np.int8)
+    return run_input("input_int8_lut", pictures, lambda picture: cv2.LUT(picture, lut, dst=tensor))
+
+
+def bench_input_uint8_copy(pictures):
+    """Model.set_input on a uint8 model whose quantization matches the pixels: a plain copy."""
+    tensor = np.empty((INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+    return run_input("input_uint8_copy", pictures, lambda picture: np.copyto(tensor, picture))
+##########################################
+
+
+##---------Model latency cases-----------##
+def bench_model(path, pictures, threads, xnnpack):
+    """Preprocess (into the input tensor) + invoke of one .tflite model"""
+    from ModelRegistry import Model
+    model = Model(path, num_threads=threads, xnnpack=xnnpack)
+    size = model.input_size
+    resized = [cv2.resize(picture, size) for picture in pictures]
+    model.run(resized[0], mean=127.5, std=127.5)  # warm-up
+    name = f"{os.path.basename(path)[:14]}{'' if xnnpack else ' noxnn'}"
+    result = run_input(name, resized, lambda picture: model.run(picture, mean=127.5, std=127.5))
+    result["dtype"] = np.dtype(model.input_dtype).name
+    return result
+##########################################
+
+
+CASES = [
+    bench_yolo_classfilter,
+    bench_yolo_vectorized,
+]
+INPUT_CASES = [
+    bench_input_float_alloc,
+    bench_input_float_inplace,
+    bench_input_int8_lut,
+    bench_input_uint8_copy,
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tensors", help="saved output tensors (.npy, one output per entry)")
+    parser.add_argument("--frames", type=int, default=60, help="synthetic outputs to decode")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic output random seed")
+    parser.add_argument("--models", nargs="*", default=[], help=".tflite models to time side by side")
+    parser.add_argument("--threads", type=int, default=4, help="interpreter CPU threads of the model cases")
+    args = parser.parse_args()
+
+    if args.tensors:
+        # Saved as batch item 0 of each output: restore the (1, rows, 5 + classes) layout
+        outputs = [output.astype(np.float32).reshape(1, *output.shape[-2:]) for output in np.load(args.tensors)]
+    else:
+        outputs = synthetic_outputs(args.frames, args.seed)
+    results = [case(outputs) for case in CASES]
+    rng = np.random.default_rng(args.seed)
+    pictures = [rng.integers(0, 256, size=(INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+                for _ in range(args.frames)]
+    results += [case(pictures) for case in INPUT_CASES]
+    for path in args.models:
+        for xnnpack in (True, False):
+            try:
+                results.append(bench_model(path, pictures, args.threads, xnnpack))
+            except ImportError:
+                print("Model cases skipped: neither tflite_runtime nor tensorflow is installed")
+                break
+            except Exception as e:
+                print(f"Detection_Benchmark: {path}{'' if xnnpack else ' (no XNNPACK)'}: {e}")
+
+    columns = sorted({key for result in results for key in result} - {"case"})
+    print(f"{'case':<20}" + "".join(f"{column:>16}" for column in columns))
+    for result in results:
+        row = f"{result['case']:<20}"
+        for column in columns:
+            value = result.get(column, "")
+            row += f"{value:>16.2f}" if isinstance(value, float) else f"{value!s:>16}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
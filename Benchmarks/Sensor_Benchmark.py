@@ -0,0 +1,166 @@
+"""
+Repeatable sensor benchmark on the simulated GPIO backend.
+
+Replays a scripted scene (ultrasonic echoes with noise and dropouts, IR
+obstacle pattern) through SimGPIO and measures, for each sensor
+implementation, the CPU cost, latency and achievable rate.
+
+Usage:
+    python3 Sensor_Benchmark.py [--samples N] [--duration S] [--seed N]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Allow running straight from a checkout without installing the libraries
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for lib in ("Robot_Core", "Ultrasonic_Sensor", "IR_Sensor"):
+    sys.path.insert(0, os.path.join(REPO_ROOT, "Libraries", lib))
+
+import SimGPIO
+
+LEFT_PIN, FRONT_PIN, RIGHT_PIN = 5, 16, 18
+IR_PIN = 24
+IR_PATTERN = [(0.10, 0.35), (0.60, 0.62), (0.80, 0.95)]
+IR_PERIOD = 1.0
+
+
+def build_scene(seed):
+    scene = SimGPIO.Scene(seed=seed)
+    scene.add_echo(LEFT_PIN, 35.0, noise=0.3, dropout=0.02)
+    scene.add_echo(FRONT_PIN, lambda t: 60.0 + 40.0 * ((t % 4.0) / 4.0), noise=0.5, dropout=0.05)
+    scene.add_echo(RIGHT_PIN, 120.0, noise=1.0, dropout=0.1)
+    scene.add_ir(IR_PIN, IR_PATTERN, period=IR_PERIOD, chatter=2)
+    return scene
+
+
+def summarize(name, latencies, wall, cpu, extra=None):
+    result = {
+        "case": name,
+        "samples": len(latencies),
+        "rate_hz": len(latencies) / wall if wall > 0 else 0.0,
+        "cpu_pct": 100.0 * cpu / wall if wall > 0 else 0.0,
+        "lat_mean_ms": 1000.0 * statistics.mean(latencies) if latencies else float("nan"),
+        "lat_p95_ms": 1000.0 * sorted(latencies)[int(0.95 * (len(latencies) - 1))] if latencies else float("nan"),
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+##---------Ultrasonic cases--------------##
+def bench_ultrasonic_polling(gpio, scene, samples, duration):
+    """Current implementation: busy-polling GPIO.input() for the echo edges."""
+    from Ultrasonic_sens import Ultrasonic
+    sensor = Ultrasonic()
+    latencies, errors, valid = [], [], 0
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for i in range(samples):
+        pin = (LEFT_PIN, FRONT_PIN, RIGHT_PIN)[i % 3]
+        t = scene.now()
+        start = time.perf_counter()
+        distance = sensor.get_distance(pin)
+        latencies.append(time.perf_counter() - start)
+        if distance is not None:
+            valid += 1
+            errors.append(abs(distance - scene.echoes[pin].distance_at(t)))
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    return summarize("ultrasonic_polling", latencies, wall, cpu, {
+        "valid_pct": 100.0 * valid / samples,
+        "err_mean_cm": statistics.mean(errors) if errors else float("nan"),
+    })
+##########################################
+
+
+##-------------IR cases------------------##
+def detection_latencies(scene, detections, duration):
+    """Delay between each scripted transition and the first detection reporting it."""
+    latencies = []
+    expected = scene.ir[IR_PIN].transitions(duration)
+    for index, (edge_t, state) in enumerate(expected):
+        next_t = expected[index + 1][0] if index + 1 < len(expected) else float("inf")
+        for t, detected in detections:
+            if edge_t <= t < next_t and detected == state:
+                latencies.append(t - edge_t)
+                break
+    return latencies
+
+
+def bench_ir_polling(gpio, scene, samples, duration, poll_interval=0.005):
+    """Current implementation: poll IRsens.status() at a fixed interval."""
+    from IRSens import IRsens
+    sensor = IRsens(IrPin=IR_PIN, edge_detect=False)  # status() reads the pin on every call
+    detections, last, reads = [], None, 0
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    end = scene.now() + duration
+    while scene.now() < end:
+        stat = sensor.status()
+        reads += 1
+        if stat != last:
+            detections.append((scene.now(), stat == 1))
+            last = stat
+        time.sleep(poll_interval)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    return summarize("ir_polling", detection_latencies(scene, detections, end), wall, cpu, {
+        "reads": reads,
+        "transitions": len(detections),
+    })
+
+
+def bench_ir_events(gpio, scene, samples, duration):
+    """Edge-triggered IRsens: transitions arrive through on_change callbacks."""
+    from IRSens import IRsens
+    sensor = IRsens(IrPin=IR_PIN)
+    detections = []
+    sensor.on_change(lambda event: detections.append((scene.now(), event.value == 1)))
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    end = scene.now() + duration
+    time.sleep(duration)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    sensor.cleanup()
+    return summarize("ir_events", detection_latencies(scene, detections, end), wall, cpu, {
+        "reads": gpio.stats["input"],
+        "transitions": len(detections),
+    })
+##########################################
+
+
+CASES = [
+    bench_ultrasonic_polling,
+    bench_ir_polling,
+    bench_ir_events,
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=300, help="ultrasonic readings per case")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per IR case")
+    parser.add_argument("--seed", type=int, default=0, help="scene random seed")
+    args = parser.parse_args()
+
+    results = []
+    for case in CASES:
+        scene = build_scene(args.seed)
+        gpio = SimGPIO.install(scene)
+        gpio.setmode(gpio.BCM)
+        for module in ("Ultrasonic_sens", "IRSens"):
+            sys.modules.pop(module, None)  # re-import against the fresh backend
+        results.append(case(gpio, scene, args.samples, args.duration))
+        gpio.cleanup()
+        SimGPIO.uninstall()
+
+    columns = sorted({key for result in results for key in result} - {"case"})
+    print(f"{'case':<24}" + "".join(f"{column:>14}" for column in columns))
+    for result in results:
+        row = f"{result['case']:<24}"
+        for column in columns:
+            value = result.get(column, "")
+            row += f"{value:>14.2f}" if isinstance(value, float) else f"{value!s:>14}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
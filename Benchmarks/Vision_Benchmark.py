@@ -0,0 +1,779 @@
+"""
+Repeatable vision benchmark on synthetic camera frames.
+
+Renders a scripted clip (a colored target moving over a noisy background,
+leaving the view for a while) and a curving line on the floor, and measures,
+for each color segmentation, tracking and line detection implementation,
+the frame rate, CPU cost and accuracy. Segmentation overlay rendering is
+timed on synthetic model label maps, and AprilTag detection on grayscale
+frames with moving tags (with the apriltag package, or OpenCV's aruco
+AprilTag dictionaries when it is not installed). Tag localization is timed
+on tag corners projected through a distorted camera from a scripted robot
+path around a wall-mounted tag map, QR code reading on frames with a
+still and a stop-and-go code, and single-object tracking of a textured
+target that changes size and is hidden for a while.
+
+Usage:
+    python3 Vision_Benchmark.py [--frames N] [--tag-frames N] [--qr-frames N]
+                                [--track-frames N] [--seed N]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Allow running straight from a checkout without installing the libraries
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for lib in ("Robot_Core", "Robot_Vision"):
+    sys.path.insert(0, os.path.join(REPO_ROOT, "Libraries", lib))
+
+import cv2
+import numpy as np
+
+WIDTH, HEIGHT = 640, 480
+TARGET_BGR = (40, 60, 200)          # red target
+TARGET_RADIUS = 45
+HSV_LOWER = np.array([170, 120, 80])  # wraps below red hue 180; upper bound below
+HSV_UPPER = np.array([179, 255, 255])
+HSV_LOWER_2 = np.array([0, 120, 80])
+HSV_UPPER_2 = np.array([8, 255, 255])
+MIN_AREA = 1500
+MASK_SIZE = 257                     # DeepLabV3 output resolution
+TAG_SIZE = 96                       # AprilTag side in pixels
+TRACK_SIZE = 80                     # tracked target side in pixels at scale 1
+QR_SIZE = 140                       # QR code side (with its quiet zone) in pixels
+CAMERA_POSE = (0.08, 0.0, 0.12, 10.0)  # camera on the robot: x, y, z, pitch down
+LINE_BOTTOM_Y = 454                 # bottom scan band row of the line cases (roi bottom 0.95)
+# Classes for the multi-class segmentation cases: red target, blue and yellow markers
+CLASSES = [
+    [(HSV_LOWER, HSV_UPPER), (HSV_LOWER_2, HSV_UPPER_2)],
+    [([100, 120, 80], [130, 255, 255])],
+    [([20, 120, 120], [35, 255, 255])],
+]
+
+
+def render_clip(frames, seed):
+    """Synthetic BGR frames and the true target centers (None while out of view)"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 120, size=(HEIGHT, WIDTH, 3), dtype=np.uint8)
+    background[..., 2] //= 2  # keep the background away from the target hue
+    clip, truth = [], []
+    for i in range(frames):
+        t = i / 30.0
+        frame = background.copy()
+        frame += rng.integers(0, 12, size=frame.shape, dtype=np.uint8)
+        if (i // 60) % 4 == 3:
+            truth.append(None)  # target leaves the view every fourth second
+        else:
+            cx = int(WIDTH / 2 + 220 * np.sin(t * 1.3))
+            cy = int(HEIGHT / 2 + 140 * np.sin(t * 0.9 + 1.0))
+            cv2.circle(frame, (cx, cy), TARGET_RADIUS, TARGET_BGR, -1)
+            truth.append((cx, cy))
+        cv2.rectangle(frame, (20, 380), (120, 460), (200, 80, 30), -1)  # blue marker
+        cv2.circle(frame, (580, 60), 30, (40, 210, 230), -1)           # yellow marker
+        clip.append(frame)
+    return clip, truth
+
+
+def render_line_clip(frames, seed):
+    """Synthetic frames of a curving dark line on a light floor and the true line x at the bottom band"""
+    rng = np.random.default_rng(seed)
+    floor = rng.integers(170, 220, size=(HEIGHT, WIDTH, 3), dtype=np.uint8)
+    ys = np.arange(HEIGHT // 3, HEIGHT)
+    clip, truth = [], []
+    for i in range(frames):
+        t = i / 30.0
+        shift, bend = 150 * np.sin(t * 0.8), 0.002 * np.sin(t * 0.5)
+        xs = WIDTH / 2 + shift + bend * (HEIGHT - ys) ** 2
+        frame = floor.copy()
+        cv2.polylines(frame, [np.stack([xs, ys], axis=1).astype(np.int32)], False, (30, 30, 30), 30)
+        clip.append(frame)
+        truth.append(WIDTH / 2 + shift + bend * (HEIGHT - LINE_BOTTOM_Y) ** 2)
+    return clip, truth
+
+
+def render_mask_clip(frames, seed, classes=4):
+    """Synthetic segmentation outputs: int64 label maps (as np.argmax returns) with moving class blobs"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(40, MASK_SIZE - 40, size=(classes, 2))
+    clip = []
+    for i in range(frames):
+        t = i / 30.0
+        label_map = np.zeros((MASK_SIZE, MASK_SIZE), dtype=np.uint8)
+        for class_id, (cx, cy) in enumerate(centers, start=1):
+            center = (int(cx + 30 * np.sin(t + class_id)), int(cy + 30 * np.cos(t * 0.7 + class_id)))
+            cv2.circle(label_map, center, 35, class_id, -1)
+        clip.append(label_map.astype(np.int64))
+    palette = np.column_stack([rng.integers(0, 256, size=(21, 3)), np.full(21, 255)]).astype(np.uint8)
+    return clip, palette
+
+
+def render_tag_clip(frames, seed):
+    """Grayscale frames with two moving AprilTags (one leaves the view for a while) and the true tag centers"""
+    rng = np.random.default_rng(seed)
+    # Smooth textured floor: low resolution noise scaled up
+    background = cv2.resize(rng.integers(70, 190, size=(HEIGHT // 8, WIDTH // 8), dtype=np.uint8), (WIDTH, HEIGHT))
+    dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_APRILTAG_36h11)
+    markers = {tag_id: cv2.aruco.generateImageMarker(dictionary, tag_id, TAG_SIZE) for tag_id in (3, 7)}
+    pad = TAG_SIZE // 6
+    clip, truth = [], []
+    for i in range(frames):
+        t = i / 30.0
+        frame = background.copy()
+        centers = {3: (int(WIDTH / 2 + 200 * np.sin(t * 0.9)), int(HEIGHT / 2 + 120 * np.sin(t * 0.6 + 1.0)))}
+        if (i // 45) % 3 != 2:
+            centers[7] = (int(WIDTH / 2 - 180 * np.cos(t * 0.7)), int(HEIGHT / 2 + 100 * np.cos(t * 1.1)))
+        for tag_id, (cx, cy) in centers.items():
+            x, y = cx - TAG_SIZE // 2, cy - TAG_SIZE // 2
+            frame[y - pad:y + TAG_SIZE + pad, x - pad:x + TAG_SIZE + pad] = 255  # quiet zone
+            frame[y:y + TAG_SIZE, x:x + TAG_SIZE] = markers[tag_id]
+        clip.append(frame)
+        truth.append(centers)
+    return clip, truth
+
+
+def render_qr_clip(frames, seed):
+    """Grayscale frames (with sensor noise) of a still QR code and one that moves and stops, and their centers"""
+    rng = np.random.default_rng(seed)
+    background = cv2.resize(rng.integers(70, 190, size=(HEIGHT // 8, WIDTH // 8), dtype=np.uint8), (WIDTH, HEIGHT))
+    encoder = cv2.QRCodeEncoder.create()
+    codes = {data: cv2.resize(encoder.encode(data), (QR_SIZE, QR_SIZE), interpolation=cv2.INTER_NEAREST)
+             for data in ("dock-1", "shelf-A")}
+    clip, truth = [], []
+    t = 0.0
+    for i in range(frames):
+        if (i // 60) % 2 == 0:
+            t += 1 / 30.0  # moving for two seconds, then still for two
+        frame = background.copy()
+        centers = {"dock-1": (130, 120),
+                   "shelf-A": (int(WIDTH / 2 + 120 + 60 * np.sin(t)), int(HEIGHT / 2 + 60 * np.sin(t * 0.7)))}
+        for data, (cx, cy) in centers.items():
+            x, y = cx - QR_SIZE // 2, cy - QR_SIZE // 2
+            frame[y:y + QR_SIZE, x:x + QR_SIZE] = codes[data]
+        noise = rng.normal(0, 2, size=frame.shape)
+        clip.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+        truth.append(centers)
+    return clip, truth
+
+
+def render_track_clip(frames, seed):
+    """BGR frames of a textured target moving and changing size (hidden every fourth second), and its boxes"""
+    rng = np.random.default_rng(seed)
+    background = cv2.resize(rng.integers(40, 200, size=(HEIGHT // 8, WIDTH // 8, 3), dtype=np.uint8), (WIDTH, HEIGHT))
+    texture = cv2.resize(rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8), (TRACK_SIZE, TRACK_SIZE),
+                         interpolation=cv2.INTER_NEAREST)
+    clip, truth = [], []
+    for i in range(frames):
+        t = i / 30.0
+        frame = background.copy()
+        size = int(TRACK_SIZE * (1.0 + 0.3 * np.sin(t * 0.8)))
+        x = int(WIDTH / 2 + 180 * np.sin(t * 0.5) - size / 2)
+        y = int(HEIGHT / 2 + 100 * np.sin(t * 0.9) - size / 2)
+        if (i // 30) % 4 == 3 and i >= 30:
+            truth.append(None)  # hidden behind something
+        else:
+            frame[y:y + size, x:x + size] = cv2.resize(texture, (size, size), interpolation=cv2.INTER_LINEAR)
+            truth.append((x, y, size, size))
+        clip.append(frame)
+    return clip, truth
+
+
+def summarize(name, latencies, wall, cpu, extra=None):
+    result = {
+        "case": name,
+        "frames": len(latencies),
+        "fps": len(latencies) / wall if wall > 0 else 0.0,
+        "cpu_pct": 100.0 * cpu / wall if wall > 0 else 0.0,
+        "lat_mean_ms": 1000.0 * statistics.mean(latencies) if latencies else float("nan"),
+        "lat_p95_ms": 1000.0 * sorted(latencies)[int(0.95 * (len(latencies) - 1))] if latencies else float("nan"),
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def accuracy(found, truth):
+    """Detection rate, false positives and mean center error against the script"""
+    errors, hits, false = [], 0, 0
+    for center, expected in zip(found, truth):
+        if expected is None:
+            false += center is not None
+        elif center is not None:
+            hits += 1
+            errors.append(np.hypot(center[0] - expected[0], center[1] - expected[1]))
+    visible = sum(expected is not None for expected in truth)
+    return {
+        "detect_pct": 100.0 * hits / max(1, visible),
+        "false_pos": false,
+        "err_px": statistics.mean(errors) if errors else float("nan"),
+    }
+
+
+def run(name, clip, truth, locate, extra=None):
+    found, latencies = [], []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for i, frame in enumerate(clip):
+        start = time.perf_counter()
+        found.append(locate(frame, i))
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    result = accuracy(found, truth)
+    result.update(extra() if extra else {})
+    return summarize(name, latencies, wall, cpu, result)
+
+
+def full_frame_mask(frame):
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    return cv2.inRange(hsv, HSV_LOWER, HSV_UPPER) | cv2.inRange(hsv, HSV_LOWER_2, HSV_UPPER_2)
+
+
+def full_frame_labels(frame):
+    """Class id per pixel the HSV way: one conversion, one inRange per range"""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    labels = np.zeros(frame.shape[:2], dtype=np.uint8)
+    for class_id in range(len(CLASSES), 0, -1):
+        for lower, upper in CLASSES[class_id - 1]:
+            mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
+            labels[mask > 0] = class_id
+    return labels
+
+
+def run_segmentation(name, clip, segment, reference):
+    """Frame rate of a segmentation function and its pixel agreement with the HSV reference"""
+    outputs, latencies = [], []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for frame in clip:
+        start = time.perf_counter()
+        outputs.append(segment(frame))
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    agree = [np.count_nonzero(out == reference(frame)) / out.size for out, frame in zip(outputs[::10], clip[::10])]
+    return summarize(name, latencies, wall, cpu, {"agree_pct": 100.0 * statistics.mean(agree)})
+
+
+##---------Color tracking cases----------##
+def bench_blob_contours(clip, truth):
+    """Current trackers: full-frame HSV threshold, findContours, largest by contourArea."""
+    def locate(frame, i):
+        contours, _ = cv2.findContours(full_frame_mask(frame), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        largest = sorted(contours, key=cv2.contourArea, reverse=True)[0]
+        if cv2.contourArea(largest) <= MIN_AREA:
+            return None
+        x, y, w, h = cv2.boundingRect(largest)
+        return (x + w // 2, y + h // 2)
+    return run("blob_contours", clip, truth, locate)
+
+
+def bench_blob_tracker(clip, truth):
+    """BlobTracker: predicted ROI while locked, 1/4-scale global search when lost."""
+    from BlobTracker import BlobTracker
+    tracker = BlobTracker(full_frame_mask, min_area=MIN_AREA)
+
+    def locate(frame, i):
+        blob = tracker.update(frame, timestamp_ns=int(i * 1e9 / 30))
+        return None if blob is None else blob.center
+    stats = tracker.stats
+    return run("blob_tracker", clip, truth, locate,
+               lambda: {"roi_hit_pct": stats()["roi_hit_pct"], "px_per_frame": stats()["pixels_per_frame"]})
+
+
+def bench_blob_tracker_lut(clip, truth):
+    """BlobTracker with the ColorLUT mask instead of HSV conversion."""
+    from BlobTracker import BlobTracker
+    from ColorLUT import ColorLUT
+    tracker = BlobTracker(ColorLUT(CLASSES[:1]).mask_fn(), min_area=MIN_AREA)
+
+    def locate(frame, i):
+        blob = tracker.update(frame, timestamp_ns=int(i * 1e9 / 30))
+        return None if blob is None else blob.center
+    stats = tracker.stats
+    return run("blob_tracker_lut", clip, truth, locate,
+               lambda: {"roi_hit_pct": stats()["roi_hit_pct"], "px_per_frame": stats()["pixels_per_frame"]})
+##########################################
+
+
+##---------Segmentation cases------------##
+def bench_seg_hsv(clip, truth):
+    """Current trackers and picker: cvtColor(BGR2HSV) + inRange for one class."""
+    return run_segmentation("seg_hsv", clip, full_frame_mask, full_frame_mask)
+
+
+def bench_seg_lut(clip, truth, bits=5):
+    """ColorLUT mask of one class (no HSV conversion)."""
+    from ColorLUT import ColorLUT
+    lut = ColorLUT(CLASSES[:1], bits=bits)
+    return run_segmentation(f"seg_lut{bits}", clip, lut.mask, full_frame_mask)
+
+
+def bench_seg_lut6(clip, truth):
+    """ColorLUT with a 64^3 table."""
+    return bench_seg_lut(clip, truth, bits=6)
+
+
+def bench_seg_hsv_classes(clip, truth):
+    """Three classes the HSV way: one conversion, one inRange per range, label merge."""
+    return run_segmentation("seg_hsv_3class", clip, full_frame_labels, full_frame_labels)
+
+
+def bench_seg_lut_classes(clip, truth):
+    """Three classes in a single ColorLUT pass."""
+    from ColorLUT import ColorLUT
+    lut = ColorLUT(CLASSES)
+    return run_segmentation("seg_lut_3class", clip, lut.classify, full_frame_labels)
+##########################################
+
+
+##---------Line following cases--------##
+def run_line(name, clip, truth, locate):
+    """Frame rate and error of the line x at the bottom band (pixels)"""
+    found, latencies = [], []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for frame in clip:
+        start = time.perf_counter()
+        found.append(locate(frame))
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    errors = [abs(x - expected) for x, expected in zip(found, truth) if x is not None]
+    return summarize(name, latencies, wall, cpu, {
+        "detect_pct": 100.0 * len(errors) / len(clip),
+        "err_px": statistics.mean(errors) if errors else float("nan"),
+    })
+
+
+def bench_line_contours(line_clip, line_truth):
+    """Current line follower: full-frame inRange, findContours, centroid of the largest contour."""
+    def locate(frame):
+        mask = cv2.inRange(frame, np.array([0, 0, 0]), np.array([179, 255, 118]))
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        m = cv2.moments(max(contours, key=cv2.contourArea))
+        return m["m10"] / m["m00"] if m["m00"] else None
+    return run_line("line_contours", line_clip, line_truth, locate)
+
+
+def bench_line_scanline(line_clip, line_truth):
+    """LineDetector: column histograms of 5 thin bands, quadratic fit."""
+    from LineDetector import LineDetector
+    detector = LineDetector()
+
+    def locate(frame):
+        line = detector.detect(frame)
+        return None if line is None else (line.offset + 1) * WIDTH / 2
+    return run_line("line_scanline", line_clip, line_truth, locate)
+##########################################
+
+##---------Segmentation overlay cases----##
+def run_overlay(name, clip, render):
+    """Frame rate of rendering an overlay from each label map"""
+    latencies = []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for label_map in clip:
+        start = time.perf_counter()
+        render(label_map)
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    return summarize(name, latencies, wall, cpu)
+
+
+def bench_overlay_per_class(mask_clip, palette):
+    """Current segmentation example: one RGBA overlay per class, resized and summed."""
+    def render(mask):
+        overlay = np.zeros((HEIGHT, WIDTH, 4), dtype=np.uint8)
+        for i in np.unique(mask):
+            if i == 0:
+                continue
+            colour = [(0, 0, 0, 0), palette[i]]
+            layer = np.array(colour)[(mask == i).astype(np.uint8)].reshape(
+                (MASK_SIZE, MASK_SIZE, 4)).astype(np.uint8)
+            overlay += cv2.resize(layer, (WIDTH, HEIGHT))
+        overlay[:, :, -1][overlay[:, :, -1] == 255] = 150
+        return overlay
+    return run_overlay("overlay_per_class", mask_clip, render)
+
+
+def bench_overlay_palette(mask_clip, palette):
+    """MaskRenderer: nearest-neighbour resize of the label map, one palette lookup."""
+    from MaskRenderer import MaskRenderer
+    renderer = MaskRenderer(palette, size=(WIDTH, HEIGHT), alpha=150)
+    return run_overlay("overlay_palette", mask_clip, renderer.render)
+
+
+def bench_cutout_mask(mask_clip, palette):
+    """Current background removal with NumPy in place of PIL: 0/255 mask, resize, RGBA composite."""
+    background = np.full((HEIGHT, WIDTH, 3), 90, dtype=np.uint8)
+
+    def render(mask):
+        alpha = np.array([0, 255])[(mask == 0).astype(np.uint8)].astype(np.uint8)
+        alpha = cv2.resize(alpha, (WIDTH, HEIGHT))
+        base = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        rgb = np.where(alpha[..., np.newaxis] > 127, background, base)
+        return np.dstack([rgb, alpha])
+    return run_overlay("cutout_mask", mask_clip, render)
+
+
+def bench_cutout_renderer(mask_clip, palette):
+    """MaskRenderer.cutout: image colour channels copied once, alpha lookup per frame."""
+    from MaskRenderer import MaskRenderer
+    renderer = MaskRenderer(palette, size=(WIDTH, HEIGHT))
+    background = np.full((HEIGHT, WIDTH, 3), 90, dtype=np.uint8)
+    return run_overlay("cutout_renderer", mask_clip, lambda mask: renderer.cutout(mask, background))
+##########################################
+
+##---------AprilTag cases---------------##
+def run_tags(name, clip, truth, detect):
+    """Detections per second and detection rate / center error against the script"""
+    found, latencies = [], []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for i, frame in enumerate(clip):
+        start = time.perf_counter()
+        found.append(detect(frame, i))
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    errors, detections = [], 0
+    for tags, centers in zip(found, truth):
+        for tag_id, center in tags:
+            detections += 1
+            if tag_id in centers:
+                errors.append(np.hypot(center[0] - centers[tag_id][0], center[1] - centers[tag_id][1]))
+    visible = sum(len(centers) for centers in truth)
+    return summarize(name, latencies, wall, cpu, {
+        "detect_pct": 100.0 * len(errors) / max(1, visible),
+        "false_pos": detections - len(errors),
+        "err_px": statistics.mean(errors) if errors else float("nan"),
+        "tags_per_s": detections / wall if wall > 0 else 0.0,
+    })
+
+
+def bench_apriltag_per_frame(tag_clip, tag_truth):
+    """Current script: a new detector for every frame, full resolution, default options."""
+    from AprilTagTracker import make_tag_detector
+
+    def detect(frame, i):
+        detector, _ = make_tag_detector(threads=1, quad_decimate=1.0)
+        return [(tag_id, center) for tag_id, center, _, _ in detector(frame)]
+    return run_tags("apriltag_per_frame", tag_clip, tag_truth, detect)
+
+
+def bench_apriltag_decimated(tag_clip, tag_truth):
+    """One persistent detector, full frame, quad_decimate 2."""
+    from AprilTagTracker import make_tag_detector
+    detector, _ = make_tag_detector(threads=2, quad_decimate=2.0)
+    return run_tags("apriltag_decimated", tag_clip, tag_truth,
+                    lambda frame, i: [(tag_id, center) for tag_id, center, _, _ in detector(frame)])
+
+
+def bench_apriltag_tracker(tag_clip, tag_truth):
+    """AprilTagTracker: ROIs around known tags, full pass every 15 frames or when the ROIs are empty."""
+    from AprilTagTracker import AprilTagTracker
+    tracker = AprilTagTracker(quad_decimate=2.0, threads=2, full_every=15)
+
+    def detect(frame, i):
+        return [(tag.tag_id, tag.center) for tag in tracker.detect(frame, int(i * 1e9 / 30))]
+    return run_tags("apriltag_tracker", tag_clip, tag_truth, detect)
+##########################################
+
+
+##---------Tag localization cases------##
+def render_pose_clip(frames, seed, tags_per_wall=6):
+    """Corners of the map tags in view of a robot driving a loop (with 0.3 px corner noise), and its poses"""
+    from AprilTagTracker import Tag
+    from TagLocalizer import CameraIntrinsics, TagMap, TagLocalizer, pose_matrix
+    rng = np.random.default_rng(seed)
+    intrinsics = CameraIntrinsics([[500, 0, 319.5], [0, 500, 239.5], [0, 0, 1]], [-0.12, 0.05, 0, 0, 0], (WIDTH, HEIGHT))
+    spots = np.linspace(-1.2, 1.2, tags_per_wall)
+    placements = [(2.0, s, 180) for s in spots] + [(-2.0, s, 0) for s in spots] + \
+                 [(s, 2.0, -90) for s in spots] + [(s, -2.0, 90) for s in spots]
+    tag_map = TagMap({i: TagMap.wall(x, y, 0.2, yaw) for i, (x, y, yaw) in enumerate(placements)}, size=0.12)
+    camera_T_robot = TagLocalizer(intrinsics, tag_map, CAMERA_POSE)._camera_T_robot
+    clip, truth = [], []
+    for i in range(frames):
+        t = i / 30.0
+        x, y, yaw = 0.6 * np.cos(t / 4), 0.6 * np.sin(t / 4), np.degrees(t / 4) + 90 + 30 * np.sin(t)
+        camera_T_world = camera_T_robot @ np.linalg.inv(pose_matrix(x, y, 0.0, yaw))
+        rvec = cv2.Rodrigues(camera_T_world[:3, :3])[0]
+        tags = []
+        for tag_id in range(len(placements)):
+            depth = (np.c_[tag_map.corners[tag_id], np.ones(4)] @ camera_T_world.T)[:, 2]
+            if np.any(depth < 0.2):
+                continue
+            corners, _ = cv2.projectPoints(tag_map.corners[tag_id], rvec, camera_T_world[:3, 3],
+                                           intrinsics.camera_matrix, intrinsics.dist_coeffs)
+            corners = corners.reshape(4, 2) + rng.normal(0, 0.3, size=(4, 2))
+            if np.all((corners >= 0) & (corners < (WIDTH, HEIGHT))):
+                tags.append(Tag(tag_id, "tag36h11", corners.mean(axis=0), corners, None, int(i * 1e9 / 30)))
+        clip.append(tags)
+        truth.append((x, y, np.radians(yaw)))
+    return (intrinsics, tag_map, clip), truth
+
+
+def run_pose(name, pose_clip, pose_truth, locate):
+    """Frame rate and position / heading error of a localization function"""
+    _, _, clip = pose_clip
+    found, latencies = [], []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for i, tags in enumerate(clip):
+        start = time.perf_counter()
+        found.append(locate(tags, i))
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    position, heading = [], []
+    for pose, (x, y, yaw) in zip(found, pose_truth):
+        if pose is not None:
+            position.append(100 * np.hypot(pose[0] - x, pose[1] - y))
+            heading.append(abs(np.degrees(np.angle(np.exp(1j * (pose[2] - yaw))))))
+    return summarize(name, latencies, wall, cpu, {
+        "tags_per_frame": statistics.mean(len(tags) for tags in clip),
+        "pos_err_cm": float(statistics.mean(position)) if position else float("nan"),
+        "yaw_err_deg": float(statistics.mean(heading)) if heading else float("nan"),
+    })
+
+
+def bench_pose_per_tag(pose_clip, pose_truth):
+    """Per tag: undistort its corners, solvePnP against the tag, robot pose from it; poses averaged."""
+    from TagLocalizer import TagLocalizer
+    intrinsics, tag_map, _ = pose_clip
+    robot_T_camera = np.linalg.inv(TagLocalizer(intrinsics, tag_map, CAMERA_POSE)._camera_T_robot)
+    h = tag_map.size / 2
+    square = np.array([[-h, -h, 0], [h, -h, 0], [h, h, 0], [-h, h, 0]])
+
+    def locate(tags, i):
+        poses = []
+        for tag in tags:
+            if tag.tag_id not in tag_map.tags:
+                continue
+            points = cv2.undistortPoints(tag.corners.reshape(-1, 1, 2), intrinsics.camera_matrix,
+                                         intrinsics.dist_coeffs)
+            ok, rvec, tvec = cv2.solvePnP(square, points, np.eye(3), None, flags=cv2.SOLVEPNP_IPPE)
+            if not ok:
+                continue
+            camera_T_tag = np.eye(4)
+            camera_T_tag[:3, :3] = cv2.Rodrigues(rvec)[0]
+            camera_T_tag[:3, 3] = tvec.ravel()
+            world_T_robot = tag_map.tags[tag.tag_id] @ np.linalg.inv(camera_T_tag) @ np.linalg.inv(robot_T_camera)
+            poses.append((world_T_robot[0, 3], world_T_robot[1, 3],
+                          np.arctan2(world_T_robot[1, 0], world_T_robot[0, 0])))
+        if not poses:
+            return None
+        poses = np.array(poses)
+        return (poses[:, 0].mean(), poses[:, 1].mean(),
+                np.arctan2(np.sin(poses[:, 2]).mean(), np.cos(poses[:, 2]).mean()))
+    return run_pose("pose_per_tag", pose_clip, pose_truth, locate)
+
+
+def bench_pose_localizer(pose_clip, pose_truth):
+    """TagLocalizer: one undistortion and one PnP solve over all map tags, seeded with the last pose."""
+    from TagLocalizer import TagLocalizer
+    intrinsics, tag_map, _ = pose_clip
+    localizer = TagLocalizer(intrinsics, tag_map, CAMERA_POSE)
+
+    def locate(tags, i):
+        pose = localizer.locate(tags, int(i * 1e9 / 30))
+        return None if pose is None else (pose.x, pose.y, pose.yaw)
+    return run_pose("pose_localizer", pose_clip, pose_truth, locate)
+##########################################
+
+
+##---------QR code cases---------------##
+def run_qr(name, clip, truth, read):
+    """Frame rate and share of the codes in view read with the right data"""
+    found, latencies = [], []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for i, frame in enumerate(clip):
+        start = time.perf_counter()
+        found.append(read(frame, i))
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    errors, wrong = [], 0
+    for codes, centers in zip(found, truth):
+        for data, center in codes:
+            if data in centers:
+                errors.append(np.hypot(center[0] - centers[data][0], center[1] - centers[data][1]))
+            else:
+                wrong += 1
+    visible = sum(len(centers) for centers in truth)
+    return summarize(name, latencies, wall, cpu, {
+        "read_pct": 100.0 * len(errors) / max(1, visible),
+        "false_pos": wrong,
+        "err_px": float(statistics.mean(errors)) if errors else float("nan"),
+    })
+
+
+def bench_qr_full_frame(qr_clip, qr_truth):
+    """Current script: detectAndDecode on every full frame (one code at most)."""
+    detector = cv2.QRCodeDetector()
+
+    def read(frame, i):
+        data, points, _ = detector.detectAndDecode(frame)
+        return [(data, points.reshape(4, 2).mean(axis=0))] if data else []
+    return run_qr("qr_full_frame", qr_clip, qr_truth, read)
+
+
+def bench_qr_multi_full(qr_clip, qr_truth):
+    """detectAndDecodeMulti on every full frame."""
+    detector = cv2.QRCodeDetector()
+
+    def read(frame, i):
+        ok, decoded, points, _ = detector.detectAndDecodeMulti(frame)
+        if not ok:
+            return []
+        return [(data, quad.reshape(4, 2).mean(axis=0)) for data, quad in zip(decoded, points) if data]
+    return run_qr("qr_multi_full", qr_clip, qr_truth, read)
+
+
+def bench_qr_tracker(qr_clip, qr_truth):
+    """QRTracker: half-resolution detectMulti, crop decodes, unchanged codes skipped, ROI search when moved."""
+    from QRTracker import QRTracker
+    tracker = QRTracker(scale=0.5)
+
+    def read(frame, i):
+        return [(code.data, code.center) for code in tracker.detect(frame, int(i * 1e9 / 30)) if code.data]
+    return run_qr("qr_tracker", qr_clip, qr_truth, read)
+##########################################
+
+
+##---------Object tracking cases--------##
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    return w * h / float(aw * ah + bw * bh - w * h)
+
+
+def run_track(name, track_clip, track_truth, track, extra=None):
+    """Frame rate, frames with the target found (IoU > 0.3) and boxes reported while it was hidden"""
+    found, latencies = [], []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for i, frame in enumerate(track_clip[1:], start=1):
+        start = time.perf_counter()
+        found.append(track(frame, i))
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    hits = [box is not None and truth is not None and iou(box, truth) > 0.3
+            for box, truth in zip(found, track_truth[1:])]
+    visible = sum(truth is not None for truth in track_truth[1:])
+    result = {
+        "found_pct": 100.0 * sum(hits) / max(1, visible),
+        "false_pos": sum(box is not None and truth is None for box, truth in zip(found, track_truth[1:])),
+    }
+    result.update(extra() if extra else {})
+    return summarize(name, latencies, wall, cpu, result)
+
+
+def bench_track_full_frame(track_clip, track_truth):
+    """Current script: correlation tracker on the full frame, nothing done after a failure."""
+    from ObjectTracker import make_tracker_factory
+    create, kind = make_tracker_factory("KCF")
+    tracker = create()
+    tracker.init(track_clip[0], track_truth[0])
+
+    def track(frame, i):
+        ok, box = tracker.update(frame)
+        return tuple(int(v) for v in box) if ok else None
+    return run_track(f"track_full_{kind.lower()}", track_clip, track_truth, track)
+
+
+def bench_track_engine(track_clip, track_truth, redetect="template"):
+    """ObjectTracker: half resolution, template confidence and scale checks, re-detection when lost."""
+    from ObjectTracker import ObjectTracker
+    tracker = ObjectTracker(scale=0.5, kind="KCF", redetect=redetect)
+    tracker.init(track_clip[0], track_truth[0], timestamp_ns=0)
+
+    def track(frame, i):
+        target = tracker.update(frame, int(i * 1e9 / 30))
+        return None if target is None else target.bbox
+
+    def extra():
+        stats = tracker.stats()
+        return {key: stats[key] for key in ("reacquire_ms_mean", "rescales")}
+    return run_track(f"track_{redetect}", track_clip, track_truth, track, extra)
+
+
+def bench_track_engine_histogram(track_clip, track_truth):
+    """ObjectTracker with hue/saturation back-projection as the re-detection."""
+    return bench_track_engine(track_clip, track_truth, redetect="histogram")
+##########################################
+
+
+CASES = [
+    bench_blob_contours,
+    bench_blob_tracker,
+    bench_blob_tracker_lut,
+    bench_seg_hsv,
+    bench_seg_lut,
+    bench_seg_lut6,
+    bench_seg_hsv_classes,
+    bench_seg_lut_classes,
+]
+LINE_CASES = [
+    bench_line_contours,
+    bench_line_scanline,
+]
+TAG_CASES = [
+    bench_apriltag_per_frame,
+    bench_apriltag_decimated,
+    bench_apriltag_tracker,
+]
+POSE_CASES = [
+    bench_pose_per_tag,
+    bench_pose_localizer,
+]
+QR_CASES = [
+    bench_qr_full_frame,
+    bench_qr_multi_full,
+    bench_qr_tracker,
+]
+TRACK_CASES = [
+    bench_track_full_frame,
+    bench_track_engine,
+    bench_track_engine_histogram,
+]
+MASK_CASES = [
+    bench_overlay_per_class,
+    bench_overlay_palette,
+    bench_cutout_mask,
+    bench_cutout_renderer,
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=480, help="frames in the synthetic clip")
+    parser.add_argument("--tag-frames", type=int, default=120, help="frames in the AprilTag clip")
+    parser.add_argument("--qr-frames", type=int, default=240, help="frames in the QR code clip")
+    parser.add_argument("--track-frames", type=int, default=240, help="frames in the object tracking clip")
+    parser.add_argument("--seed", type=int, default=0, help="clip random seed")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)  # comparable single-core numbers
+    clip, truth = render_clip(args.frames, args.seed)
+    results = [case(clip, truth) for case in CASES]
+    line_clip, line_truth = render_line_clip(args.frames, args.seed)
+    results += [case(line_clip, line_truth) for case in LINE_CASES]
+    mask_clip, palette = render_mask_clip(args.frames, args.seed)
+    results += [case(mask_clip, palette) for case in MASK_CASES]
+    tag_clip, tag_truth = render_tag_clip(args.tag_frames, args.seed)
+    results += [case(tag_clip, tag_truth) for case in TAG_CASES]
+    pose_clip, pose_truth = render_pose_clip(args.frames, args.seed)
+    results += [case(pose_clip, pose_truth) for case in POSE_CASES]
+    qr_clip, qr_truth = render_qr_clip(args.qr_frames, args.seed)
+    results += [case(qr_clip, qr_truth) for case in QR_CASES]
+    track_clip, track_truth = render_track_clip(args.track_frames, args.seed)
+    results += [case(track_clip, track_truth) for case in TRACK_CASES]
+
+    columns = sorted({key for result in results for key in result} - {"case"})
+    print(f"{'case':<20}" + "".join(f"{column:>14}" for column in columns))
+    for result in results:
+        row = f"{result['case']:<20}"
+        for column in columns:
+            value = result.get(column, "")
+            row += f"{value:>14.2f}" if isinstance(value, float) else f"{value!s:>14}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
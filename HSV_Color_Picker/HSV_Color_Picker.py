@@ -2,18 +2,19 @@
 import cv2
 import numpy as np
 import time
-from picamera2 import Picamera2
-from libcamera import controls, Transform 
+from CameraService import CameraService
+from ColorLUT import ColorLUT
+import os
+
+# The trackers load the bounds from next to this script, wherever it is run from
+HSV_VALUES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hsv_value.npy')
 # A required callback method that goes into the trackbar function.
 def nothing(x):
     pass
 
-# Initializing the webcam feed.
-picam2 = Picamera2()
-config = picam2.create_preview_configuration(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1))
-picam2.configure(config)
-picam2.start() 
-picam2.set_controls({"AfMode": controls.AfModeEnum.Continuous})
+# Initializing the camera feed (the capture service owns the camera).
+camera = CameraService(size=(640, 480), format='RGB888', vflip=True).start()
+frames = camera.reader("picker")
 
 
 # Create a window named trackbars.
@@ -29,14 +30,18 @@ cv2.createTrackbar("L - V", "Trackbars", 0, 255, nothing)
 cv2.createTrackbar("U - H", "Trackbars", 179, 179, nothing)
 cv2.createTrackbar("U - S", "Trackbars", 255, 255, nothing)
 cv2.createTrackbar("U - V", "Trackbars", 255, 255, nothing)
+
+# The HSV range is compiled into a color lookup table only when a trackbar
+# moves, so the frames themselves are never converted to HSV.
+lut, last_range = None, None
  
 while True:
     
-    # Start reading the webcam feed frame by frame.
-    frame = picam2.capture_array()
-    
-    # Convert the BGR image to HSV image.
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    # Start reading the camera feed frame by frame (newest frame, no copy).
+    captured = frames.get(timeout=1)
+    if captured is None:
+        continue
+    frame = captured.array
     
     # Get the new values of the trackbar in real time as the user changes 
     # them
@@ -51,10 +56,13 @@ while True:
     # by the trackbar
     lower_range = np.array([l_h, l_s, l_v])
     upper_range = np.array([u_h, u_s, u_v])
+    if (l_h, l_s, l_v, u_h, u_s, u_v) != last_range:
+        lut = ColorLUT([(lower_range, upper_range)], bits=6)
+        last_range = (l_h, l_s, l_v, u_h, u_s, u_v)
     
     # Filter the image and get the binary mask, where white represents 
     # your target color
-    mask = cv2.inRange(hsv, lower_range, upper_range)
+    mask = lut.mask(frame)
  
     # You can also visualize the real part of the target color (Optional)
     res = cv2.bitwise_and(frame, frame, mask=mask)
@@ -80,10 +88,11 @@ while True:
         thearray = [[l_h,l_s,l_v],[u_h, u_s, u_v]]
         print(thearray)
         
-        # Also save this array as penval.npy
-        np.save('hsv_value',thearray)
+        # Also save this array as hsv_value.npy next to this script
+        np.save(HSV_VALUES,thearray)
+        print("Saved to", HSV_VALUES)
         break
     
 # Release the camera & destroy the windows.
-picam2.stop()
+camera.stop()
 cv2.destroyAllWindows()
\ No newline at end of file
@@ -1,125 +1,100 @@
-import cv2
-import mediapipe as mp
-from picamera2 import Picamera2
-from libcamera import controls
-from libcamera import Transform
+import time
+from CameraService import CameraService
+from Display import Display
+from GesturePipeline import GesturePipeline, GestureSteering, mediapipe_hands
+from MotionGate import MotionGate, encoder_motion
 from RPi_Robot_Hat_Lib import RobotController
 
-  
+CONTROL_HZ = 30          # steering updates per second, independent of the inference rate
+INFERENCE_SIZE = (320, 240)
+motorFreq = 30 # set the speed of the motor to 30
 
-def init(): 
+
+def init():
         """
-        Initialize motor controller, encoder, mediapipe hands and camera 
+        Initialize motor controller, mediapipe hands pipeline and camera
         """
-        global mp_hands, hands, cap, mp_drawing, Motor, enc
+        global cap, pipeline, gate, shown_frames, Motor, display
         Motor = RobotController()
-        # Initialize MediaPipe Hands
-        mp_hands = mp.solutions.hands
-        hands = mp_hands.Hands(static_image_mode=False, max_num_hands=1,
-                                min_detection_confidence=0.5, min_tracking_confidence=0.5)
-        mp_drawing = mp.solutions.drawing_utils
+        # MediaPipe only runs when the view changed, while the wheels turn, or
+        # twice a second; otherwise the last landmarks hold
+        gate = MotionGate(keep_alive_s=0.5, motion=encoder_motion(Motor.get_all_encoder_samples))
 
         # Start video capture
-        cap = Picamera2(0)
-        cap.configure(cap.create_preview_configuration( main={"format": 'XRGB8888', "size": (640, 480)},transform=Transform(vflip=1)))  # Flip both horizontally and vertically
-        cap.start()
-        cap.set_controls({"AfMode": controls.AfModeEnum.Continuous})
+        cap = CameraService(size=(640, 480), format='XRGB8888', vflip=True, camera_num=0).start()
+        # MediaPipe Hands runs on a worker thread on a downscaled RGB copy of the
+        # newest frame; frames that arrive while it is busy are skipped
+        pipeline = GesturePipeline(cap.reader("gesture"), size=INFERENCE_SIZE,
+                                   landmarker=mediapipe_hands(max_num_hands=1, min_detection_confidence=0.5,
+                                                              min_tracking_confidence=0.5),
+                                   gate=gate).start()
+        # ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+        display = Display.from_env("Hand Gesture Control")
+        shown_frames = cap.reader("display") if display.mode != "none" else None
         vertical = 2
         horizontal = 1
         Motor.set_servo(vertical, 40)
         Motor.set_servo(horizontal, 92)
 
-   
-    
-        
-        
-# Define function to control the robot car
-def control_car(hand_landmarks):
-        global mp_hands, hands, cap, mp_drawing, Motor
-        # Extract the position of landmark 9
-        landmark_9 = hand_landmarks.landmark[9]
-            
-        # Get normalized coordinates of landmark 9
-        landmark_9_x = landmark_9.x
-        landmark_9_y = landmark_9.y
-            
-        # Calculate direction and distance based on landmark 9 position
-        # Example: Determine if landmark 9 is to the left, right, or center
-        motorFreq = 30 # set the speed of the motor to 20 
-        if landmark_9_x < 0.3:
-                direction = "right"
-                
-        elif landmark_9_x > 0.7:
-                direction = "left"
 
-        else:
-                direction = "center"
-            
-        # Example: Determine if landmark 9 is closer or farther away
-        if landmark_9_y < 0.4:
-                distance = "close"
-        elif landmark_9_y > 0.6:
-                distance = "far"
-        else:
-                distance = "medium"
-            
-        # Map direction and distance to control commands for the car
-        # Example: Adjust speed and steering based on direction and distance
-        
-        if direction == "left":
+# Define function to control the robot car
+def control_car(command):
+        """Send a steering command to the motors (called only when the command changes)"""
+        if command == "left":
                 print("Turn left")
                 Motor.move(speed= 0 , turn=-30)
-        elif direction == "right":
+        elif command == "right":
                 print("Turn right")
                 Motor.move(speed=0, turn=30)
+        elif command == "forward":
+                print("Move forward")
+                Motor.Forward(motorFreq)
         else:
-                # Move the car forward or stop based on distance
-                if distance == "close":
-                        print("Stop")
-                        Motor.Brake()
-                else:
-                        print("Move forward")
-                        Motor.Forward(motorFreq)
+                print("Stop")
+                Motor.Brake()
 
 
 def main():
         init()
-        global mp_hands, hands, cap, mp_drawing, Motor, enc 
-        # Main loop for robot car control
-        while True:
-                # Read frame from video capture
-                frame = cap.capture_array()
+        # Landmark 9 (base of the middle finger) is smoothed and classified with
+        # hysteresis: left/right beyond x 0.7/0.3, stop when closer than y 0.4
+        steering = GestureSteering(left=0.7, right=0.3, near=0.4, hysteresis=0.05, alpha=0.5, hold=3)
+        Motor.Brake()
+        period = 1.0 / CONTROL_HZ
+        next_tick = time.monotonic()
+        # Main loop for robot car control: a fixed rate, whatever the inference speed
+        while display.running:
+                # Landmarks predicted for now from the last inference results
+                hand = pipeline.predict(time.monotonic_ns())
+                command, changed = steering.update(hand)
+                if changed:
+                        control_car(command)
 
-                # Convert the BGR frame to RGB 
-                frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                # Detect hand landmarks using MediaPipe Hands
-                results = hands.process(frame_bgr)
-                # enc.encoder()
+                # Display the newest frame with the hand landmarks
+                if display.wants_frame():
+                        shown = shown_frames.get(timeout=0)
+                        if shown is not None:
+                                # The ring buffer is shared with other consumers; draw on a copy
+                                frame = shown.array.copy()
+                                pipeline.draw(frame, hand)
+                                display.show(frame)
 
-                # Draw hand landmarks on the frame
-                if results.multi_hand_landmarks:
-                        for hand_landmarks in results.multi_hand_landmarks:
-                            # Draw landmarks on the frame
-                            mp_drawing.draw_landmarks(frame_bgr, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-                            
-                            # Control the car based on hand landmarks
-                            control_car(hand_landmarks)
-                            frame = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                        time.sleep(delay)
                 else:
-                        Motor.Brake()
-
-                # Display the frame with hand landmarks
-                cv2.imshow('Hand Gesture Control', frame)
-
-                    # Exit loop on 'q' key press
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                        break
+                        next_tick = time.monotonic()  # fell behind: do not try to catch up
+        display.close()
 try:
         if __name__ == '__main__':
                 main()
 except KeyboardInterrupt:
-        cv2.destroyAllWindows()
+        pass
+finally:
+        pipeline.stop()
+        cap.stop()
         Motor.cleanup()
-        # enc.stop()
-
-
+        for name, s in pipeline.stats().items():
+                print(f"{name:<11} {s['items']:>6} items {s['fps']:>6.1f} fps latency {s['ms_mean']:>6.1f} ms")
+        print(gate.stats())
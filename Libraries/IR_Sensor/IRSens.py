@@ -1,58 +1,185 @@
-import RPi.GPIO as GPIO 
-import time 
+import RPi.GPIO as GPIO
+import time
+import queue
+import threading
+from SensorSample import Sample
 
 __version__ = "1.0.4"
 
+
 class IRsens:
-    __init_check = False 
+    """
+    Active-low IR obstacle sensor.
+    The pin is configured once and watched with edge detection, so status()
+    returns a cached, debounced state without touching the GPIO.
+    """
+    __init_check = False
 
-    def __init__(self, IrPin = 24, debug=False): 
+    def __init__(self, IrPin = 24, debug=False, debounce_ms=5, edge_detect=True, queue_size=64):
+        """
+        :param IrPin: IR sensor GPIO pin (default 24)
+        :param debug: Enable debug mode (default False)
+        :param debounce_ms: Software debounce window in milliseconds (default 5)
+        :param edge_detect: Use edge detection; if False (or unavailable) status() polls the pin
+        :param queue_size: Maximum number of pending transition events kept in the queue
+        """
         self.Irsensor = IrPin
-        self.debug = debug 
-        if not IRsens.__init_check: 
+        self.sensor_id = f"ir/{IrPin}"
+        self.debug = debug
+        self.debounce = debounce_ms / 1000.0
+        self.events = queue.Queue(maxsize=queue_size)
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._lockout = None
+        self.edge_detect = False
+        if not IRsens.__init_check:
             GPIO.setmode(GPIO.BCM)
             IRsens.__init_check = True
+        GPIO.setup(self.Irsensor, GPIO.IN)
+        self.state = self._read()
+        self.last_change_ns = time.monotonic_ns()
+        if edge_detect:
+            try:
+                GPIO.add_event_detect(self.Irsensor, GPIO.BOTH, callback=self._on_edge)
+                self.edge_detect = True
+            except Exception as e:
+                print(f"IR Sensor: edge detection unavailable, falling back to polling: {e}")
         if debug == True:
-            print("IR Sensor Initialized")  
-            
-
-    def status(self): 
-        GPIO.setup(self.Irsensor, GPIO.IN )
-        stat = None
-        if GPIO.input(self.Irsensor) == 1: 
-            stat = 0 
-        elif GPIO.input(self.Irsensor) == 0: 
-            stat = 1 
-        if stat == None:
-            if self.debug == True:
-                print("IR Sensor: Error reading sensor")
-            raise ValueError("Error reading IR sensor")    
+            print("IR Sensor Initialized")
+
+
+    def _read(self):
+        """Single GPIO read: 1 if an obstacle is present (pin LOW), else 0"""
+        return 1 if GPIO.input(self.Irsensor) == 0 else 0
+
+    def _on_edge(self, channel):
+        """
+        Edge callback (runs on the GPIO event thread).
+        Leading-edge debounce: the first edge after a quiet period flips the
+        state immediately, further edges are ignored for the debounce window,
+        and the pin is then re-read once so the settled level is never missed.
+        """
+        with self._lock:
+            if self._lockout is not None:
+                return
+            self._lockout = threading.Timer(self.debounce, self._end_lockout)
+            self._lockout.daemon = True
+            self._lockout.start()
+            stat = 1 - self.state
+        self._commit(stat)
+
+    def _end_lockout(self):
+        with self._lock:
+            self._lockout = None
+        self._commit(self._read())
+
+    def _commit(self, stat):
+        """Record a transition and notify queue consumers and callbacks"""
+        with self._lock:
+            if stat == self.state:
+                return
+            self.state = stat
+            self.last_change_ns = time.monotonic_ns()
+            event = Sample(stat, self.sensor_id, self.last_change_ns)
+            try:
+                self.events.put_nowait(event)
+            except queue.Full:
+                # Drop the oldest event so the queue always holds the latest transitions
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+                self.events.put_nowait(event)
+            self._changed.notify_all()
+            callbacks = list(self._callbacks)
+        if self.debug == True:
+            print(f"IR Sensor: {stat}")
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"IR Sensor: on_change callback error: {e}")
+
+    def status(self):
+        """Return 1 if an obstacle is detected, else 0"""
+        if not self.edge_detect:
+            self._commit(self._read())
+        stat = self.state
         if self.debug == True:
             print(f"IR Sensor: {stat}")
         return stat
-    
+
+    def sample(self):
+        """Current state as a timestamped Sample (value 1 for obstacle, 0 for clear)"""
+        return Sample(self.status(), self.sensor_id)
+
+    def age(self):
+        """Seconds since the last debounced transition"""
+        return (time.monotonic_ns() - self.last_change_ns) / 1e9
+
+    def on_change(self, callback):
+        """
+        Register callback(event) to run on every debounced transition.
+        event is a Sample whose timestamp_ns is the time of the transition.
+        Callbacks run on the GPIO event thread, so keep them short.
+        Returns the callback so it can be used as a decorator.
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+        return callback
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def get_event(self, timeout=None):
+        """Pop the next transition Sample from the queue, or None on timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def wait_for_change(self, timeout=None):
+        """Block until the next transition; returns the new state, or None on timeout"""
+        with self._lock:
+            seen = self.last_change_ns
+            if not self._changed.wait_for(lambda: self.last_change_ns != seen, timeout):
+                return None
+            return self.state
+
 
     def cleanup(self):
         if self.debug == True:
             print("IR Sensor Cleanup")
+        with self._lock:
+            if self._lockout is not None:
+                self._lockout.cancel()
+                self._lockout = None
         try:
+            if self.edge_detect:
+                GPIO.remove_event_detect(self.Irsensor)
+                self.edge_detect = False
             GPIO.cleanup(self.Irsensor)
         except Exception as e:
             print(f"GPIO cleanup error: {e}")
         IRsens.__init_check = False
-            
+
 
 if __name__ == "__main__":
     IR = IRsens(debug = True)
+    IR.on_change(lambda event: print(f"Transition -> {'Obstacle' if event.value else 'Clear'}"))
     try:
-        while True: 
-            print(IR.status())
-            time.sleep(0.5)
+        while True:
+            state = IR.wait_for_change(timeout=5)
+            if state is None:
+                print(f"No change for 5s (state: {IR.status()})")
     except KeyboardInterrupt:
         IR.cleanup()
         print("Program stopped by User")
     except Exception as e:
         print(f"An error occurred: {e}")
         IR.cleanup()
-            
-           
+
+
@@ -7,7 +7,7 @@ A library for controlling infrared sensors on Raspberry Pi robots.
 Features:
 - Obstacle detection
 - Proximity sensing
-- Digital signal processing
+- Edge-triggered, debounced state with on_change callbacks and an event queue
 - Simple API
 
 Example usage:
@@ -15,6 +15,7 @@ Example usage:
     >>> sensor = IRsens()
     >>> status = sensor.status()
     >>> print(f"IR sensor status: {status}")
+    >>> sensor.on_change(lambda event: print(event.value, event.timestamp_ns))
 """
 
 from .IRSens import IRsens
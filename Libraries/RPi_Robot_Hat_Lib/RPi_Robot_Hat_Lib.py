@@ -3,6 +3,7 @@ import time
 import math
 import RPi.GPIO as GPIO
 import os, json
+from SensorSample import Sample
 
 class RobotController:
     def load_motor_calibration(self, motor):
@@ -84,14 +85,14 @@ class RobotController:
 
 
     ##---------Communication section--------##
-    def _read_byte(self, reg):
-        """Read a byte from an I2C register"""
+    def _read_byte(self, reg, default=0):
+        """Read a byte from an I2C register, returning `default` on error"""
         try:
             value = self.bus.read_byte_data(self.address, reg)
             return value
         except Exception as e:
             print(f"Error reading from register {reg}: {e}")
-            return 0
+            return default
 
     def _write_byte(self, reg, value):
         """Write a byte to an I2C register"""
@@ -418,6 +419,29 @@ class RobotController:
             print(f"Error calculating distance for {motor}: {e}")
             return 0
     
+    def get_encoder_sample(self, motor):
+        """Get the raw encoder count for a motor as a timestamped Sample
+        Parms:
+            motor: 'RF', 'RB', 'LF', 'LB'
+        Returns:
+            Sample with sensor_id "encoder/<motor>" (valid=False if the I2C read failed)
+        """
+        sensor_id = f"encoder/{motor}"
+        if motor not in self.ENCODER_REGS:
+            print("Invalid motor. Choose from 'RF', 'RB', 'LF', 'LB'.")
+            return Sample.invalid(sensor_id)
+        timestamp_ns = time.monotonic_ns()
+        reg_low, reg_high = self.ENCODER_REGS[motor]
+        low = self._read_byte(reg_low, None)
+        high = self._read_byte(reg_high, None)
+        if low is None or high is None:
+            return Sample.invalid(sensor_id, timestamp_ns)
+        return Sample((high << 8) | low, sensor_id, timestamp_ns)
+
+    def get_all_encoder_samples(self):
+        """Get all encoder counts as timestamped Samples"""
+        return {motor: self.get_encoder_sample(motor) for motor in ['RF', 'RB', 'LF', 'LB']}
+
     def get_all_encoders(self):
         """Get all encoder values at once"""
         return {
@@ -555,6 +579,11 @@ class RobotController:
             print(f"Error reading analog line sensor: {e}")
             return 0
     
+    def get_line_sample(self):
+        """Read the digital line sensors (5 bits) as a timestamped Sample"""
+        timestamp_ns = time.monotonic_ns()
+        return Sample(self._read_byte(self.REG_LINE_SENSOR, None), "line/digital", timestamp_ns)
+
     ##########################################
 
 
@@ -569,6 +598,12 @@ class RobotController:
             print(f"Error reading voltage: {e}")
             return 0
     
+    def get_battery_sample(self):
+        """Read battery voltage as a timestamped Sample"""
+        timestamp_ns = time.monotonic_ns()
+        value = self._read_byte(self.REG_VOLTAGE, None)
+        return Sample(None if value is None else value / 10.0, "battery/voltage", timestamp_ns)
+
     ##########################################
 
 
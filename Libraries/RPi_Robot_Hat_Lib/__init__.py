@@ -15,14 +15,14 @@ Example usage:
     >>> robot = RobotController()
     >>> robot.Forward(50)  # Move forward at 50% speed
     >>> robot.stop()       # Stop all motors
-"""
-
-from .RPi_Robot_Hat_Lib import RobotController
+    >>> robot.get_battery_sample()  # Timestamped Sample reading
 
 Author: JIaLeChye
 GitHub: https://github.com/JIaLeChye/MobileRobot
 """
 
+from .RPi_Robot_Hat_Lib import RobotController
+
 __version__ = "1.2.14"
 __author__ = "JIaLeChye"
 __email__ = "jialecjl2016@outlook.com"
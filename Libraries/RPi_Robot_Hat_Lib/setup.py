@@ -14,6 +14,7 @@ setup(
     install_requires=[
         "smbus2>=0.4.0",
         "rpi-lgpio>=0.4",
+        "robot-core-lib>=1.0.0",
     ],
     python_requires=">=3.7",
     classifiers=[
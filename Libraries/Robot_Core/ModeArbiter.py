@@ -0,0 +1,271 @@
+import time
+import threading
+
+IDLE = "IDLE"
+TRACKING = "TRACKING"
+AVOIDING = "AVOIDING"
+FOUND = "FOUND"
+MODES = (IDLE, TRACKING, AVOIDING, FOUND)
+
+
+class _ModeStats:
+    def __init__(self):
+        self.entries = 0
+        self.time_ns = 0           # wall time spent in the mode
+        self.cpu_ns = 0            # process CPU time used while in the mode
+        self.steps = 0
+        self.step_ns = 0
+        self.step_max_ns = 0
+        self.switch_ns = 0         # evidence -> switch delay added by hysteresis
+        self.switch_max_ns = 0
+        self.rejected = 0          # motor commands refused because the mode was not active
+
+
+class OwnedMotor:
+    """
+    Motor controller proxy for one behavior. Commands are forwarded only
+    while the behavior's mode is active, and under the arbiter's lock, so a
+    command can never land after the arbiter has handed the motors over.
+    """
+
+    def __init__(self, arbiter, mode):
+        self._arbiter = arbiter
+        self._mode = mode
+
+    def __getattr__(self, name):
+        attr = getattr(self._arbiter.motor_controller, name)
+        if not callable(attr):
+            return attr
+
+        def command(*args, **kwargs):
+            arbiter = self._arbiter
+            with arbiter._cond:
+                if arbiter._mode != self._mode:
+                    arbiter._stats[self._mode].rejected += 1
+                    return None
+                return attr(*args, **kwargs)
+        return command
+
+
+class ModeArbiter:
+    """
+    Event-driven behavior arbiter (IDLE, TRACKING, AVOIDING, FOUND).
+
+    Perception calls propose(mode) with the mode its latest evidence asks
+    for; the switch only happens once the proposal has persisted for
+    enter_after[mode] seconds and the current mode has lasted min_dwell
+    seconds, so single noisy frames don't flip behaviors. Behavior threads
+    block in wait_for()/sleep() instead of polling, and drive the motors
+    through motor(mode), which only the active mode may use. The motors are
+    braked on every switch.
+
+    Example usage:
+        >>> arbiter = ModeArbiter(RobotController(), enter_after={AVOIDING: 0.5})
+        >>> motor = arbiter.motor(AVOIDING)
+        >>> while arbiter.wait_for(AVOIDING) is not None:
+        ...     with arbiter.work(AVOIDING):
+        ...         motor.Forward(40)
+        ...     arbiter.sleep(AVOIDING, 0.5)
+    """
+
+    def __init__(self, motor_controller=None, initial=IDLE, enter_after=None, min_dwell=0.0, on_change=None):
+        """
+        :param motor_controller: RobotController (or compatible) shared by the behaviors
+        :param initial: Starting mode (default IDLE)
+        :param enter_after: Seconds a proposal must persist before switching, per target mode
+        :param min_dwell: Minimum seconds to stay in a mode before leaving it
+        :param on_change: Optional callback(old_mode, new_mode), called with the lock released
+        """
+        if initial not in MODES:
+            raise ValueError(f"Unknown mode: {initial}")
+        self.motor_controller = motor_controller
+        self.enter_after = dict(enter_after or {})
+        self.min_dwell = min_dwell
+        self.on_change = on_change
+        self._cond = threading.Condition()
+        self._mode = initial
+        self._stats = {mode: _ModeStats() for mode in MODES}
+        self._stats[initial].entries = 1
+        self._entered_ns = time.monotonic_ns()
+        self._entered_cpu_ns = time.process_time_ns()
+        self._candidate = None
+        self._candidate_ns = 0
+        self.closed = False
+
+    @property
+    def mode(self):
+        return self._mode
+
+    ##---------Transition section-----------##
+    def propose(self, mode, now_ns=None):
+        """Report the mode the latest evidence asks for; returns the (possibly new) active mode"""
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        with self._cond:
+            if mode == self._mode:
+                self._candidate = None
+                return self._mode
+            if mode != self._candidate:
+                self._candidate = mode
+                self._candidate_ns = now_ns
+            held = now_ns - self._candidate_ns >= self.enter_after.get(mode, 0) * 1e9
+            dwelled = now_ns - self._entered_ns >= self.min_dwell * 1e9
+            if not (held and dwelled):
+                return self._mode
+            old = self._switch(mode, now_ns, now_ns - self._candidate_ns)
+        self._notify(old, mode)
+        return mode
+
+    def set_mode(self, mode):
+        """Switch immediately, bypassing hysteresis (start-up, shutdown, operator override)"""
+        with self._cond:
+            if mode == self._mode:
+                return
+            old = self._switch(mode, time.monotonic_ns(), 0)
+        self._notify(old, mode)
+
+    def _switch(self, mode, now_ns, delay_ns):
+        # Called with the lock held
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        old = self._mode
+        cpu_ns = time.process_time_ns()
+        stats = self._stats[old]
+        stats.time_ns += now_ns - self._entered_ns
+        stats.cpu_ns += cpu_ns - self._entered_cpu_ns
+        new = self._stats[mode]
+        new.entries += 1
+        new.switch_ns += delay_ns
+        new.switch_max_ns = max(new.switch_max_ns, delay_ns)
+        self._mode = mode
+        self._candidate = None
+        self._entered_ns = now_ns
+        self._entered_cpu_ns = cpu_ns
+        if self.motor_controller is not None:
+            try:
+                self.motor_controller.Brake()  # hand the motors over stopped
+            except Exception as e:
+                print(f"ModeArbiter: brake error: {e}")
+        self._cond.notify_all()
+        return old
+
+    def _notify(self, old, new):
+        if self.on_change is not None:
+            try:
+                self.on_change(old, new)
+            except Exception as e:
+                print(f"ModeArbiter: on_change callback error: {e}")
+    ##########################################
+
+    ##---------Behavior section-------------##
+    def wait_for(self, modes, timeout=None):
+        """
+        Block until one of the given modes is active.
+        Returns the active mode, or None on timeout or after close().
+        """
+        if isinstance(modes, str):
+            modes = (modes,)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.closed or self._mode in modes, timeout):
+                return None
+            return None if self.closed else self._mode
+
+    def sleep(self, mode, seconds):
+        """Sleep up to seconds; returns False early if mode stops being active"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.closed or self._mode != mode, seconds)
+            return not self.closed and self._mode == mode
+
+    def motor(self, mode):
+        """Motor proxy that only forwards commands while mode is active"""
+        return OwnedMotor(self, mode)
+
+    def work(self, mode):
+        """Context manager timing one iteration of a behavior (step latency per mode)"""
+        return _Step(self._stats[mode], self._cond)
+
+    def close(self):
+        """Wake up every waiting behavior; wait_for() returns None from now on"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+    ##########################################
+
+    ##---------Statistics section-----------##
+    def stats(self):
+        """Per-mode entries, time share, CPU use, step latency and switch delay"""
+        with self._cond:
+            now_ns = time.monotonic_ns()
+            cpu_ns = time.process_time_ns()
+            result = {}
+            for mode, s in self._stats.items():
+                time_ns, mode_cpu_ns = s.time_ns, s.cpu_ns
+                if mode == self._mode:
+                    time_ns += now_ns - self._entered_ns
+                    mode_cpu_ns += cpu_ns - self._entered_cpu_ns
+                result[mode] = {
+                    "entries": s.entries,
+                    "time_s": time_ns / 1e9,
+                    "cpu_pct": 100.0 * mode_cpu_ns / time_ns if time_ns else 0.0,
+                    "steps": s.steps,
+                    "step_ms_mean": s.step_ns / s.steps / 1e6 if s.steps else 0.0,
+                    "step_ms_max": s.step_max_ns / 1e6,
+                    "switch_ms_mean": s.switch_ns / s.entries / 1e6 if s.entries else 0.0,
+                    "switch_ms_max": s.switch_max_ns / 1e6,
+                    "rejected": s.rejected,
+                }
+            return result
+
+    def print_stats(self):
+        for mode, s in self.stats().items():
+            print(f"{mode:<9} {s['entries']:>4} entries {s['time_s']:>8.1f} s cpu {s['cpu_pct']:>5.1f}% "
+                  f"step {s['step_ms_mean']:>6.2f}/{s['step_ms_max']:.2f} ms "
+                  f"switch {s['switch_ms_mean']:>6.1f}/{s['switch_ms_max']:.1f} ms rejected {s['rejected']}")
+    ##########################################
+
+
+class _Step:
+    def __init__(self, stats, lock):
+        self.stats = stats
+        self.lock = lock
+
+    def __enter__(self):
+        self.start_ns = time.monotonic_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.monotonic_ns() - self.start_ns
+        with self.lock:
+            self.stats.steps += 1
+            self.stats.step_ns += elapsed
+            self.stats.step_max_ns = max(self.stats.step_max_ns, elapsed)
+
+
+if __name__ == "__main__":
+    class PrintMotor:
+        def Brake(self):
+            pass
+
+        def Forward(self, speed):
+            pass
+
+    arbiter = ModeArbiter(PrintMotor(), enter_after={AVOIDING: 0.2, TRACKING: 0.05}, min_dwell=0.1,
+                          on_change=lambda old, new: print(f"{old} -> {new}"))
+
+    def avoid():
+        motor = arbiter.motor(AVOIDING)
+        while arbiter.wait_for(AVOIDING) is not None:
+            with arbiter.work(AVOIDING):
+                motor.Forward(40)
+            arbiter.sleep(AVOIDING, 0.05)
+
+    thread = threading.Thread(target=avoid)
+    thread.start()
+    arbiter.set_mode(TRACKING)
+    # Object visible for 0.5 s, lost for 0.5 s (with one spurious detection), visible again
+    for visible in [True] * 17 + [False] * 8 + [True] + [False] * 8 + [True] * 10:
+        arbiter.propose(TRACKING if visible else AVOIDING)
+        time.sleep(1 / 30)
+    arbiter.set_mode(IDLE)
+    arbiter.close()
+    thread.join()
+    arbiter.print_stats()
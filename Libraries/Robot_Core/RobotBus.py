@@ -0,0 +1,302 @@
+import time
+import threading
+from collections import deque
+
+LATEST = "latest"
+QUEUE = "queue"
+
+
+class Message:
+    """
+    One published value.
+    timestamp_ns is the data timestamp (the Sample's timestamp_ns when the
+    value carries one, otherwise the publish time); publish_ns is when it
+    entered the bus. Values are passed by reference, never copied.
+    """
+    __slots__ = ("topic", "value", "seq", "timestamp_ns", "publish_ns")
+
+    def __init__(self, topic, value, seq, timestamp_ns, publish_ns):
+        self.topic = topic
+        self.value = value
+        self.seq = seq
+        self.timestamp_ns = timestamp_ns
+        self.publish_ns = publish_ns
+
+    def __repr__(self):
+        return f"Message(topic={self.topic!r}, seq={self.seq}, value={self.value!r})"
+
+
+class Topic:
+    """
+    A named channel. LATEST topics keep only the newest message (consumers
+    always see the freshest value, e.g. camera frames); QUEUE topics give
+    every subscriber its own bounded queue that drops the oldest entry when
+    full (e.g. IR transitions, where every event matters).
+    """
+
+    def __init__(self, name, kind=LATEST, queue_size=16, rate_window=50):
+        if kind not in (LATEST, QUEUE):
+            raise ValueError(f"Unknown topic kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.queue_size = queue_size
+        self.cond = threading.Condition()
+        self.latest = None
+        self.seq = 0
+        self.subscribers = []
+        # Metrics
+        self._publish_times = deque(maxlen=rate_window)
+        self.dropped = 0
+        self.throttled = 0
+        self.delivered = 0
+        self._latency_ns = 0
+        self._latency_max_ns = 0
+        self._age_ns = 0
+
+    def publish(self, value, timestamp_ns=None):
+        publish_ns = time.monotonic_ns()
+        if timestamp_ns is None:
+            timestamp_ns = getattr(value, "timestamp_ns", publish_ns)
+        with self.cond:
+            self.seq += 1
+            message = Message(self.name, value, self.seq, timestamp_ns, publish_ns)
+            self.latest = message
+            self._publish_times.append(publish_ns)
+            callbacks = []
+            for subscription in self.subscribers:
+                if subscription.callback is not None:
+                    callbacks.append(subscription)
+                elif self.kind == QUEUE:
+                    subscription._enqueue(message)
+            self.cond.notify_all()
+        for subscription in callbacks:
+            subscription._dispatch(message)
+        return message
+
+    def _record(self, message, now_ns):
+        """Account one delivery (called with or without the condition held)"""
+        latency = now_ns - message.publish_ns
+        self.delivered += 1
+        self._latency_ns += latency
+        self._latency_max_ns = max(self._latency_max_ns, latency)
+        self._age_ns += now_ns - message.timestamp_ns
+
+    def stats(self):
+        with self.cond:
+            times = self._publish_times
+            rate = 0.0
+            if len(times) > 1 and times[-1] > times[0]:
+                rate = (len(times) - 1) * 1e9 / (times[-1] - times[0])
+            delivered = max(1, self.delivered)
+            return {
+                "kind": self.kind,
+                "published": self.seq,
+                "rate_hz": rate,
+                "subscribers": len(self.subscribers),
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "throttled": self.throttled,
+                "latency_ms_mean": self._latency_ns / delivered / 1e6,
+                "latency_ms_max": self._latency_max_ns / 1e6,
+                "age_ms_mean": self._age_ns / delivered / 1e6,
+            }
+
+
+class Subscription:
+    """
+    A consumer's handle on a topic. Either push (callback runs in the
+    publisher's thread) or pull (get()/latest()). max_rate caps how often
+    this consumer receives messages; excess messages are skipped for it.
+    """
+
+    def __init__(self, topic, callback=None, max_rate=None, queue_size=None):
+        self.topic = topic
+        self.callback = callback
+        self.min_interval_ns = int(1e9 / max_rate) if max_rate else 0
+        self.queue = deque(maxlen=queue_size or topic.queue_size)
+        self.last_seq = 0
+        self.last_delivery_ns = 0
+
+    def _throttled(self, now_ns):
+        return self.min_interval_ns and now_ns - self.last_delivery_ns < self.min_interval_ns
+
+    def _enqueue(self, message):
+        # Called with topic.cond held
+        if self._throttled(message.publish_ns):
+            self.topic.throttled += 1
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.topic.dropped += 1
+        self.queue.append(message)
+        self.last_delivery_ns = message.publish_ns
+
+    def _dispatch(self, message):
+        now_ns = time.monotonic_ns()
+        with self.topic.cond:
+            if self._throttled(now_ns):
+                self.topic.throttled += 1
+                return
+            self.last_delivery_ns = now_ns
+            self.last_seq = message.seq
+            self.topic._record(message, now_ns)
+        try:
+            self.callback(message)
+        except Exception as e:
+            print(f"RobotBus: callback error on topic {self.topic.name}: {e}")
+
+    def get(self, timeout=None):
+        """
+        Block for the next message, or return None on timeout.
+        QUEUE topics: pops this subscriber's queue in order.
+        LATEST topics: returns the newest message not yet seen by this subscriber.
+        """
+        topic = self.topic
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with topic.cond:
+            while True:
+                if topic.kind == QUEUE:
+                    ready = bool(self.queue)
+                else:
+                    ready = topic.latest is not None and topic.latest.seq > self.last_seq
+                now_ns = time.monotonic_ns()
+                wait = None
+                if ready and self._throttled(now_ns) and topic.kind == LATEST:
+                    wait = (self.min_interval_ns - (now_ns - self.last_delivery_ns)) / 1e9
+                elif ready:
+                    message = self.queue.popleft() if topic.kind == QUEUE else topic.latest
+                    self.last_seq = message.seq
+                    if topic.kind == LATEST:
+                        self.last_delivery_ns = now_ns
+                    topic._record(message, now_ns)
+                    return message
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                if wait is None or (remaining is not None and remaining < wait):
+                    wait = remaining
+                topic.cond.wait(wait)
+
+    def latest(self):
+        """Non-blocking: the topic's newest message (seen or not), or None"""
+        with self.topic.cond:
+            message = self.topic.latest
+            if message is not None:
+                self.last_seq = message.seq
+            return message
+
+    def close(self):
+        with self.topic.cond:
+            if self in self.topic.subscribers:
+                self.topic.subscribers.remove(self)
+
+
+class Bus:
+    """
+    In-process publish/subscribe bus shared by sensors, camera and controllers.
+
+    Example usage:
+        >>> bus = Bus()
+        >>> bus.topic("sensor/ir", kind=QUEUE)
+        >>> sub = bus.subscribe("sensor/ir")
+        >>> bus.publish("sensor/ir", ir.sample())
+        >>> message = sub.get(timeout=1)
+    """
+
+    def __init__(self):
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def topic(self, name, kind=LATEST, queue_size=16):
+        """Return the topic `name`, creating it with the given kind if needed"""
+        with self._lock:
+            topic = self._topics.get(name)
+            if topic is None:
+                topic = self._topics[name] = Topic(name, kind, queue_size)
+            return topic
+
+    def publish(self, name, value, timestamp_ns=None):
+        """Publish a value (by reference) to a topic; returns the Message"""
+        return self.topic(name).publish(value, timestamp_ns)
+
+    def subscribe(self, name, callback=None, max_rate=None, queue_size=None):
+        """
+        Subscribe to a topic.
+        :param callback: Optional callback(message), run in the publisher's thread
+        :param max_rate: Maximum deliveries per second for this subscriber
+        :param queue_size: Per-subscriber queue length (QUEUE topics)
+        """
+        topic = self.topic(name)
+        subscription = Subscription(topic, callback, max_rate, queue_size)
+        with topic.cond:
+            topic.subscribers.append(subscription)
+        return subscription
+
+    def latest(self, name):
+        """The newest message on a topic, or None"""
+        with self._lock:
+            topic = self._topics.get(name)
+        return None if topic is None else topic.latest
+
+    def stats(self):
+        """Per-topic publish-rate, delivery and latency metrics"""
+        with self._lock:
+            topics = list(self._topics.values())
+        return {topic.name: topic.stats() for topic in topics}
+
+    def print_stats(self):
+        for name, stats in self.stats().items():
+            print(f"{name:<24} {stats['published']:>7} msgs {stats['rate_hz']:>7.1f} Hz "
+                  f"latency {stats['latency_ms_mean']:>6.2f}/{stats['latency_ms_max']:.2f} ms "
+                  f"age {stats['age_ms_mean']:>6.2f} ms dropped {stats['dropped']} throttled {stats['throttled']}")
+
+
+class Poller(threading.Thread):
+    """
+    Producer thread that calls read() at a fixed rate and publishes the
+    result, e.g. Poller(bus, "sensor/battery", robot.get_battery_sample, 1).
+    """
+
+    def __init__(self, bus, topic, read, rate_hz, name=None):
+        super().__init__(name=name or f"Poller-{topic}", daemon=True)
+        self.bus = bus
+        self.topic = topic
+        self.read = read
+        self.period = 1.0 / rate_hz
+        self._stop_event = threading.Event()
+
+    def run(self):
+        deadline = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self.bus.publish(self.topic, self.read())
+            except Exception as e:
+                print(f"RobotBus: poller {self.topic} read error: {e}")
+            deadline += self.period
+            delay = deadline - time.monotonic()
+            if delay < 0:
+                deadline = time.monotonic()  # overran; don't try to catch up
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+
+if __name__ == "__main__":
+    bus = Bus()
+    bus.topic("sensor/counter", kind=QUEUE, queue_size=8)
+    counter = iter(range(1000000))
+    poller = Poller(bus, "sensor/counter", lambda: next(counter), rate_hz=200)
+    fast = bus.subscribe("sensor/counter")
+    slow = bus.subscribe("sensor/counter", max_rate=10)
+    poller.start()
+    end = time.monotonic() + 1
+    received = 0
+    while time.monotonic() < end:
+        if fast.get(timeout=0.1) is not None:
+            received += 1
+    poller.stop()
+    print(f"fast subscriber received {received} messages, slow queued {len(slow.queue)}")
+    bus.print_stats()
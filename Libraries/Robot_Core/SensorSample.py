@@ -0,0 +1,166 @@
+import math
+import time
+import array
+import bisect
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; as_numpy() needs it
+    np = None
+
+
+class Sample:
+    """
+    One timestamped sensor reading, shared by all robot libraries.
+    timestamp_ns is time.monotonic_ns() at the moment the reading was taken,
+    so samples from different sensors (and camera frames) can be lined up.
+    """
+    __slots__ = ("value", "timestamp_ns", "sensor_id", "valid")
+
+    def __init__(self, value, sensor_id, timestamp_ns=None, valid=True):
+        """
+        :param value: The reading (float, int, ...); None if it could not be read
+        :param sensor_id: Sensor identifier, e.g. "ultrasonic/front", "ir/24", "encoder/LF"
+        :param timestamp_ns: time.monotonic_ns() of the reading (default: now)
+        :param valid: False if the reading failed or is out of range
+        """
+        self.value = value
+        self.sensor_id = sensor_id
+        self.timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        self.valid = valid and value is not None
+
+    @classmethod
+    def invalid(cls, sensor_id, timestamp_ns=None):
+        """A sample recording a failed reading"""
+        return cls(None, sensor_id, timestamp_ns, valid=False)
+
+    def age(self, now_ns=None):
+        """Seconds elapsed since the reading was taken"""
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        return (now_ns - self.timestamp_ns) / 1e9
+
+    def __iter__(self):
+        # Allows `value, timestamp_ns, sensor_id, valid = sample`
+        return iter((self.value, self.timestamp_ns, self.sensor_id, self.valid))
+
+    def __eq__(self, other):
+        if not isinstance(other, Sample):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return (f"Sample(value={self.value!r}, sensor_id={self.sensor_id!r}, "
+                f"timestamp_ns={self.timestamp_ns}, valid={self.valid})")
+
+
+class SampleBatch:
+    """
+    Fixed-capacity history of one sensor's samples, stored as flat columns
+    (timestamps, values, validity) instead of one object per reading.
+
+    Every sample is written twice, at i and i + capacity, so the latest n
+    samples are always contiguous and values()/timestamps()/valid() can
+    return memoryview slices without copying. Views are only stable until
+    the writer wraps around; copy them if they must outlive that.
+    """
+
+    def __init__(self, sensor_id, capacity=1024, typecode="d"):
+        """
+        :param sensor_id: Sensor identifier stored with every sample
+        :param capacity: Number of most recent samples kept
+        :param typecode: array typecode of the value column ("d" float, "q" int, ...)
+        """
+        self.sensor_id = sensor_id
+        self.capacity = capacity
+        self.typecode = typecode
+        self._invalid = math.nan if typecode in "fd" else 0
+        self._values = array.array(typecode, [self._invalid]) * (2 * capacity)
+        self._timestamps = array.array("q", [0]) * (2 * capacity)
+        self._valid = array.array("b", [0]) * (2 * capacity)
+        self._head = 0   # next write position in [0, capacity)
+        self.count = 0   # total samples ever appended
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, sample):
+        """Append a Sample (its sensor_id is not checked)"""
+        self.append_value(sample.value, sample.timestamp_ns, sample.valid)
+
+    def append_value(self, value, timestamp_ns=None, valid=True):
+        """Append a raw reading without building a Sample object"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        if value is None:
+            value, valid = self._invalid, False
+        for i in (self._head, self._head + self.capacity):
+            self._values[i] = value
+            self._timestamps[i] = timestamp_ns
+            self._valid[i] = 1 if valid else 0
+        self._head = (self._head + 1) % self.capacity
+        self.count += 1
+
+    def _window(self, n):
+        size = len(self)
+        n = size if n is None else max(0, min(n, size))
+        end = self._head + self.capacity
+        return end - n, end
+
+    def values(self, n=None):
+        """Zero-copy memoryview of the latest n values, oldest first"""
+        start, end = self._window(n)
+        return memoryview(self._values)[start:end]
+
+    def timestamps(self, n=None):
+        """Zero-copy memoryview of the latest n timestamps (monotonic_ns), oldest first"""
+        start, end = self._window(n)
+        return memoryview(self._timestamps)[start:end]
+
+    def valid(self, n=None):
+        """Zero-copy memoryview of the latest n validity flags (1/0), oldest first"""
+        start, end = self._window(n)
+        return memoryview(self._valid)[start:end]
+
+    def latest(self):
+        """The most recent Sample, or None if the batch is empty"""
+        if not self.count:
+            return None
+        i = self._head + self.capacity - 1
+        valid = bool(self._valid[i])
+        return Sample(self._values[i] if valid else None, self.sensor_id, self._timestamps[i], valid)
+
+    def since(self, timestamp_ns):
+        """Number of stored samples taken at or after timestamp_ns"""
+        timestamps = self.timestamps()
+        return len(timestamps) - bisect.bisect_left(timestamps, timestamp_ns)
+
+    def at(self, timestamp_ns):
+        """The stored Sample closest in time to timestamp_ns, or None if empty"""
+        timestamps = self.timestamps()
+        if not len(timestamps):
+            return None
+        i = bisect.bisect_left(timestamps, timestamp_ns)
+        if i == len(timestamps) or (i > 0 and timestamp_ns - timestamps[i - 1] <= timestamps[i] - timestamp_ns):
+            i -= 1
+        j = self._window(None)[0] + i
+        valid = bool(self._valid[j])
+        return Sample(self._values[j] if valid else None, self.sensor_id, self._timestamps[j], valid)
+
+    def as_numpy(self, n=None):
+        """
+        Zero-copy NumPy views of the latest n samples.
+        Returns (timestamps int64, values, valid bool) arrays; requires NumPy.
+        """
+        if np is None:
+            raise ImportError("as_numpy() requires NumPy")
+        return (np.frombuffer(self.timestamps(n), dtype=np.int64),
+                np.frombuffer(self.values(n), dtype=np.dtype(self.typecode)),
+                np.frombuffer(self.valid(n), dtype=np.int8).view(np.bool_))
+
+
+if __name__ == "__main__":
+    history = SampleBatch("ultrasonic/front", capacity=4)
+    for distance in (42.0, None, 40.5, 39.8, 38.1):
+        history.append(Sample(distance, "ultrasonic/front"))
+    print("Latest:", history.latest())
+    print("Values:", history.values().tolist())
+    print("Valid :", history.valid().tolist())
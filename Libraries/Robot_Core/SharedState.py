@@ -0,0 +1,197 @@
+import os
+import math
+import time
+import struct
+from multiprocessing import shared_memory
+
+from SensorSample import Sample
+
+DEFAULT_NAME = "mobile_robot_state"
+MAGIC = b"MRST"
+LAYOUT_VERSION = 1
+
+# Each group is written as one unit and protected by its own seqlock.
+# name: (value struct format, field names)
+GROUPS = (
+    ("encoders", "4i", ("RF", "RB", "LF", "LB")),
+    ("battery", "d", ("voltage",)),
+    ("line", "B", ("bits",)),
+    ("ultrasonic", "3d", ("left", "front", "right")),
+    ("ir", "B", ("obstacle",)),
+)
+
+_HEADER = struct.Struct("<4sIqq")  # magic, layout version, owner pid, created monotonic_ns
+
+
+class _Group:
+    """Layout of one group: [seq Q][timestamp_ns q][valid B][values ...], 8-byte aligned"""
+
+    def __init__(self, name, value_format, fields, offset):
+        self.name = name
+        self.fields = fields
+        self.seq = struct.Struct("<Q")
+        self.payload = struct.Struct("<qB" + value_format)
+        self.offset = offset
+        self.payload_offset = offset + self.seq.size
+        self.size = (self.seq.size + self.payload.size + 7) // 8 * 8
+
+
+def _layout():
+    groups, offset = {}, (_HEADER.size + 7) // 8 * 8
+    for name, value_format, fields in GROUPS:
+        group = _Group(name, value_format, fields, offset)
+        groups[name] = group
+        offset += group.size
+    return groups, offset
+
+
+class SharedState:
+    """
+    Shared-memory table of the latest robot sensor state.
+
+    One owner process creates the table and writes it; any number of other
+    processes attach and read it without locks. Every group (encoders,
+    battery, line, ultrasonic, ir) is guarded by a seqlock: the writer makes
+    the sequence odd, writes, then makes it even again, and a reader retries
+    whenever the sequence was odd or changed while it copied the payload.
+    Only one writer per table is supported.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, create=False):
+        """
+        :param name: Shared memory block name (default "mobile_robot_state")
+        :param create: True in the owner process; replaces a stale block of the same name
+        """
+        self.groups, size = _layout()
+        self.name = name
+        self.owner = create
+        if create:
+            try:
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.shm.buf[:size] = bytes(size)
+            _HEADER.pack_into(self.shm.buf, 0, MAGIC, LAYOUT_VERSION, os.getpid(), time.monotonic_ns())
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Readers must not unlink the owner's block when they exit
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+            except Exception:
+                pass
+            magic, version, _, _ = _HEADER.unpack_from(self.shm.buf, 0)
+            if magic != MAGIC or version != LAYOUT_VERSION:
+                self.shm.close()
+                raise RuntimeError(f"Shared state '{name}' has an incompatible layout")
+        self.buf = self.shm.buf
+
+    @classmethod
+    def attach(cls, name=DEFAULT_NAME):
+        """Attach as a reader; returns None if no owner has created the table"""
+        try:
+            return cls(name)
+        except (FileNotFoundError, RuntimeError):
+            return None
+
+    @property
+    def owner_pid(self):
+        return _HEADER.unpack_from(self.buf, 0)[2]
+
+    ##---------Writer section---------------##
+    def write(self, group, values, timestamp_ns=None, valid=True):
+        """
+        Owner only: store the latest values of a group.
+        :param values: Tuple matching the group's fields (a scalar for single-field groups)
+        """
+        g = self.groups[group]
+        if not isinstance(values, (tuple, list)):
+            values = (values,)
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        seq = g.seq.unpack_from(self.buf, g.offset)[0]
+        g.seq.pack_into(self.buf, g.offset, seq + 1)  # odd: write in progress
+        g.payload.pack_into(self.buf, g.payload_offset, timestamp_ns, 1 if valid else 0, *values)
+        g.seq.pack_into(self.buf, g.offset, seq + 2)  # even: consistent
+
+    def write_sample(self, group, sample):
+        """
+        Owner only: store a Sample, a tuple of Samples (e.g. Ultrasonic.samples(),
+        failed readings become NaN) or a dict of Samples keyed by field name
+        (e.g. RobotController.get_all_encoder_samples()).
+        """
+        if isinstance(sample, (tuple, list)):
+            values = tuple(math.nan if not s.valid else s.value for s in sample)
+            timestamp_ns = min(s.timestamp_ns for s in sample)
+            self.write(group, values, timestamp_ns, any(s.valid for s in sample))
+        elif isinstance(sample, dict):
+            g = self.groups[group]
+            ordered = [sample[field] for field in g.fields]
+            values = tuple(s.value if s.valid else 0 for s in ordered)
+            timestamp_ns = min(s.timestamp_ns for s in ordered)
+            self.write(group, values, timestamp_ns, all(s.valid for s in ordered))
+        else:
+            self.write(group, sample.value if sample.valid else 0, sample.timestamp_ns, sample.valid)
+    ##########################################
+
+    ##---------Reader section---------------##
+    def read(self, group, max_retries=1000):
+        """
+        Lock-free consistent read of a group.
+        Returns (values tuple, timestamp_ns, valid, seq); seq 0 means never written.
+        """
+        g = self.groups[group]
+        for _ in range(max_retries):
+            seq1 = g.seq.unpack_from(self.buf, g.offset)[0]
+            if seq1 & 1:
+                continue
+            data = g.payload.unpack_from(self.buf, g.payload_offset)
+            if g.seq.unpack_from(self.buf, g.offset)[0] == seq1:
+                return data[2:], data[0], bool(data[1]) and seq1 > 0, seq1
+        raise RuntimeError(f"Shared state group '{group}' kept changing during read")
+
+    def read_sample(self, group):
+        """The group's latest values as a Sample (value is a scalar for single-field groups)"""
+        values, timestamp_ns, valid, _ = self.read(group)
+        # Per-field failures inside a multi-field group are stored as NaN
+        values = tuple(None if isinstance(v, float) and math.isnan(v) else v for v in values)
+        value = values[0] if len(values) == 1 else dict(zip(self.groups[group].fields, values))
+        return Sample(value if valid else None, f"state/{group}", timestamp_ns, valid)
+
+    def snapshot(self):
+        """Samples for every group"""
+        return {name: self.read_sample(name) for name in self.groups}
+    ##########################################
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+if __name__ == "__main__":
+    # Monitor: print the shared state published by the owner process
+    state = SharedState.attach()
+    if state is None:
+        print(f"No shared state '{DEFAULT_NAME}' found; is the state server running?")
+    else:
+        try:
+            print(f"Attached to shared state of owner pid {state.owner_pid}")
+            while True:
+                start = time.perf_counter()
+                snapshot = state.snapshot()
+                elapsed_us = (time.perf_counter() - start) * 1e6
+                for name, sample in snapshot.items():
+                    print(f"{name:<11} valid={sample.valid!s:<5} age={sample.age():7.3f}s value={sample.value}")
+                print(f"(snapshot read in {elapsed_us:.1f} us)\n")
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            state.close()
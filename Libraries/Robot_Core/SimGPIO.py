@@ -0,0 +1,445 @@
+import sys
+import time
+import types
+import random
+import bisect
+import threading
+
+__version__ = "1.0.0"
+
+
+class EchoScript:
+    """
+    Scripted response of a single-pin ultrasonic sensor (HC-SR04 style).
+    The echo is launched on the falling edge of the trigger pulse.
+    """
+    SOUND_SPEED = 34300  # Speed of sound in cm/s at 20C
+
+    def __init__(self, distance, noise=0.0, dropout=0.0, latency=0.00045):
+        """
+        :param distance: Distance in cm, or a callable f(t) -> cm where t is the scene time in seconds
+        :param noise: Standard deviation of the gaussian noise added to each echo (cm)
+        :param dropout: Probability (0-1) that a trigger gets no echo at all
+        :param latency: Delay between the trigger and the start of the echo pulse (s)
+        """
+        self.distance = distance
+        self.noise = noise
+        self.dropout = dropout
+        self.latency = latency
+
+    def distance_at(self, t):
+        """Return the scripted (noise free) distance at scene time t."""
+        if callable(self.distance):
+            return self.distance(t)
+        return self.distance
+
+    def launch(self, t, now, rng):
+        """
+        Compute the echo window for a trigger fired at scene time t.
+        Returns (echo_start, echo_end) in perf_counter time, or None on dropout.
+        """
+        if self.dropout and rng.random() < self.dropout:
+            return None
+        distance = self.distance_at(t)
+        if distance is None:
+            return None
+        if self.noise:
+            distance += rng.gauss(0, self.noise)
+        distance = max(0.0, distance)
+        echo_start = now + self.latency
+        return echo_start, echo_start + 2 * distance / self.SOUND_SPEED
+
+
+class IRScript:
+    """
+    Scripted obstacle pattern of an active-low IR obstacle sensor.
+    The pin reads LOW while an obstacle is present.
+    """
+    EPSILON = 1e-9  # Guards edge lookups against float rounding of t % period
+
+    def __init__(self, pattern, period=None, chatter=0, chatter_interval=0.0005):
+        """
+        :param pattern: List of (start, end) scene times in seconds during which an obstacle is present
+        :param period: Repeat the pattern every `period` seconds (None plays it once)
+        :param chatter: Number of extra bounce pulses generated on every edge
+        :param chatter_interval: Spacing between bounce pulses (s)
+        """
+        self.period = period
+        self.pattern = sorted(pattern)
+        edges = []
+        for start, end in pattern:
+            for edge in (start, end):
+                edges.append(edge)
+                for i in range(1, 2 * chatter + 1):
+                    edges.append(edge + i * chatter_interval)
+        self.edges = sorted(edges)
+
+    def _local(self, t):
+        if self.period:
+            return t % self.period
+        return t
+
+    def obstacle_at(self, t):
+        """Return True if an obstacle is present at scene time t."""
+        return bisect.bisect_right(self.edges, self._local(t)) % 2 == 1
+
+    def next_edge(self, t):
+        """Return the scene time of the first transition after t, or None."""
+        if not self.edges:
+            return None
+        cycle = 0.0
+        if self.period:
+            cycle = (t // self.period) * self.period
+        index = bisect.bisect_right(self.edges, t - cycle + self.EPSILON)
+        if index < len(self.edges):
+            return cycle + self.edges[index]
+        if self.period:
+            return cycle + self.period + self.edges[0]
+        return None
+
+    def transitions(self, duration):
+        """
+        List the settled (scene time, obstacle) transitions within the first
+        `duration` seconds, i.e. the scripted pattern without the chatter.
+        """
+        result = []
+        cycle = 0.0
+        while True:
+            for start, end in self.pattern:
+                for t, obstacle in ((cycle + start, True), (cycle + end, False)):
+                    if t > duration:
+                        return result
+                    result.append((t, obstacle))
+            if not self.period or not self.pattern:
+                return result
+            cycle += self.period
+
+
+class Scene:
+    """
+    A repeatable set of scripted pin behaviours.
+    Scene time starts at zero when the scene is started by SimGPIO.
+    """
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.echoes = {}
+        self.ir = {}
+        self.t0 = None
+
+    def add_echo(self, pin, distance, noise=0.0, dropout=0.0, latency=0.00045):
+        """Script an ultrasonic echo on `pin`. See EchoScript."""
+        self.echoes[pin] = EchoScript(distance, noise, dropout, latency)
+        return self
+
+    def add_ir(self, pin, pattern, period=None, chatter=0, chatter_interval=0.0005):
+        """Script an IR obstacle pattern on `pin`. See IRScript."""
+        self.ir[pin] = IRScript(pattern, period, chatter, chatter_interval)
+        return self
+
+    def start(self):
+        self.t0 = time.perf_counter()
+
+    def now(self):
+        """Return the current scene time in seconds."""
+        if self.t0 is None:
+            self.start()
+        return time.perf_counter() - self.t0
+
+
+class PWM:
+    """Minimal stand-in for RPi.GPIO.PWM that records the requested output."""
+
+    def __init__(self, gpio, pin, frequency):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0
+        self.running = False
+
+    def start(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.running = True
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+
+    def stop(self):
+        self.running = False
+
+
+class SimGPIO:
+    """
+    Simulated backend implementing the subset of the RPi.GPIO API used by the
+    robot libraries. Pin levels come from a Scene, so sensor classes written
+    against RPi.GPIO run on it unchanged (see install()).
+    """
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+    VERSION = "sim-" + __version__
+    RPI_INFO = {"TYPE": "Simulated", "P1_REVISION": 3}
+
+    def __init__(self, scene=None):
+        self.scene = scene if scene is not None else Scene()
+        self.mode = None
+        self.warnings = True
+        self.directions = {}
+        self.pulls = {}
+        self.levels = {}
+        self.pending_echo = {}
+        self.stats = {"setup": 0, "input": 0, "output": 0}
+        self._events = {}
+        self._lock = threading.RLock()
+        self._wake = threading.Condition(self._lock)
+        self._dispatcher = None
+
+    ##---------Core RPi.GPIO API------------##
+    def setmode(self, mode):
+        self.mode = mode
+        if self.scene.t0 is None:
+            self.scene.start()
+
+    def getmode(self):
+        return self.mode
+
+    def setwarnings(self, flag):
+        self.warnings = flag
+
+    def setup(self, channel, direction, pull_up_down=None, initial=None):
+        if self.mode is None:
+            raise RuntimeError("Please set pin numbering mode using GPIO.setmode(GPIO.BOARD) or GPIO.setmode(GPIO.BCM)")
+        with self._lock:
+            self.stats["setup"] += 1
+            for pin in self._channels(channel):
+                self.directions[pin] = direction
+                self.pulls[pin] = pull_up_down if pull_up_down is not None else self.PUD_OFF
+                if direction == self.OUT and initial is not None:
+                    self.levels[pin] = int(bool(initial))
+
+    def output(self, channel, value):
+        with self._lock:
+            self.stats["output"] += 1
+            for pin in self._channels(channel):
+                if self.directions.get(pin) != self.OUT:
+                    raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+                previous = self.levels.get(pin, 0)
+                level = int(bool(value))
+                self.levels[pin] = level
+                if previous == 1 and level == 0 and pin in self.scene.echoes:
+                    now = time.perf_counter()
+                    self.pending_echo[pin] = self.scene.echoes[pin].launch(
+                        now - self.scene.t0, now, self.scene.rng)
+
+    def input(self, channel):
+        with self._lock:
+            self.stats["input"] += 1
+            if channel not in self.directions:
+                raise RuntimeError("You must setup() the GPIO channel first")
+            return self._level(channel)
+
+    def cleanup(self, channel=None):
+        with self._lock:
+            pins = list(self.directions) if channel is None else self._channels(channel)
+            for pin in pins:
+                self.directions.pop(pin, None)
+                self.pulls.pop(pin, None)
+                self.levels.pop(pin, None)
+                self.pending_echo.pop(pin, None)
+                self._events.pop(pin, None)
+            if channel is None:
+                self.mode = None
+            self._wake.notify_all()
+
+    def PWM(self, channel, frequency):
+        return PWM(self, channel, frequency)
+    ##########################################
+
+    ##---------Edge detection section-------##
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        with self._lock:
+            if self.directions.get(channel) != self.IN:
+                raise RuntimeError("You must setup() the GPIO channel as an input first")
+            if channel in self._events:
+                raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+            self._events[channel] = {
+                "edge": edge,
+                "bouncetime": (bouncetime or 0) / 1000.0,
+                "callbacks": [callback] if callback is not None else [],
+                "detected": False,
+                "last_fire": None,
+                "level": self._level(channel),
+            }
+            self._start_dispatcher()
+            self._wake.notify_all()
+
+    def add_event_callback(self, channel, callback):
+        with self._lock:
+            if channel not in self._events:
+                raise RuntimeError("Add event detection using add_event_detect first before adding a callback")
+            self._events[channel]["callbacks"].append(callback)
+
+    def remove_event_detect(self, channel):
+        with self._lock:
+            self._events.pop(channel, None)
+            self._wake.notify_all()
+
+    def event_detected(self, channel):
+        with self._lock:
+            event = self._events.get(channel)
+            if event is None or not event["detected"]:
+                return False
+            event["detected"] = False
+            return True
+
+    def wait_for_edge(self, channel, edge, bouncetime=None, timeout=None):
+        """Block until `edge` is seen on `channel`. Returns the channel, or None on timeout."""
+        seen = threading.Event()
+        own = channel not in self._events
+        if own:
+            self.add_event_detect(channel, edge, lambda pin: seen.set(), bouncetime)
+        else:
+            self.add_event_callback(channel, lambda pin: seen.set())
+        try:
+            got = seen.wait(None if timeout is None else timeout / 1000.0)
+        finally:
+            if own:
+                self.remove_event_detect(channel)
+        return channel if got else None
+    ##########################################
+
+    ##---------Internal helpers-------------##
+    @staticmethod
+    def _channels(channel):
+        if isinstance(channel, (list, tuple)):
+            return list(channel)
+        return [channel]
+
+    def _level(self, pin):
+        if self.directions.get(pin) == self.OUT:
+            return self.levels.get(pin, 0)
+        if pin in self.scene.ir:
+            return 0 if self.scene.ir[pin].obstacle_at(self.scene.now()) else 1
+        if pin in self.scene.echoes:
+            window = self.pending_echo.get(pin)
+            if window is None:
+                return 0
+            now = time.perf_counter()
+            if now < window[0]:
+                return 0
+            if now < window[1]:
+                return 1
+            self.pending_echo[pin] = None
+            return 0
+        if pin in self.levels:
+            return self.levels[pin]
+        return 1 if self.pulls.get(pin) == self.PUD_UP else 0
+
+    def _start_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch, name="SimGPIO-events", daemon=True)
+            self._dispatcher.start()
+
+    def _next_edge(self):
+        """Scene time of the next scripted transition on any watched pin."""
+        now = self.scene.now()
+        times = [self.scene.ir[pin].next_edge(now) for pin in self._events if pin in self.scene.ir]
+        times = [t for t in times if t is not None]
+        return min(times) if times else None
+
+    def _dispatch(self):
+        """Edge-detection thread: sleeps until the next scripted edge, then fires callbacks."""
+        while True:
+            with self._lock:
+                if not self._events:
+                    self._dispatcher = None
+                    return
+                next_edge = self._next_edge()
+                timeout = None if next_edge is None else max(0.0, next_edge - self.scene.now())
+                if timeout is None or timeout > 0:
+                    self._wake.wait(timeout)
+                fired = self._poll_edges()
+            for callback, pin in fired:
+                try:
+                    callback(pin)
+                except Exception as e:
+                    print(f"SimGPIO: callback error on pin {pin}: {e}")
+
+    def _poll_edges(self):
+        fired = []
+        now = time.perf_counter()
+        for pin, event in self._events.items():
+            level = self._level(pin)
+            if level == event["level"]:
+                continue
+            event["level"] = level
+            if level == 1 and event["edge"] == self.FALLING:
+                continue
+            if level == 0 and event["edge"] == self.RISING:
+                continue
+            if event["last_fire"] is not None and now - event["last_fire"] < event["bouncetime"]:
+                continue
+            event["last_fire"] = now
+            event["detected"] = True
+            fired.extend((callback, pin) for callback in event["callbacks"])
+        return fired
+    ##########################################
+
+
+_saved_modules = None
+
+
+def install(scene=None):
+    """
+    Register a SimGPIO instance as the `RPi.GPIO` module so that libraries doing
+    `import RPi.GPIO as GPIO` pick it up. Must be called before those libraries
+    are imported. Returns the SimGPIO instance.
+    """
+    global _saved_modules
+    gpio = SimGPIO(scene)
+    if _saved_modules is None:
+        _saved_modules = {name: sys.modules.get(name) for name in ("RPi", "RPi.GPIO")}
+    package = types.ModuleType("RPi")
+    package.__path__ = []
+    package.GPIO = gpio
+    sys.modules["RPi"] = package
+    sys.modules["RPi.GPIO"] = gpio
+    return gpio
+
+
+def uninstall():
+    """Restore whatever `RPi` / `RPi.GPIO` modules were registered before install()."""
+    global _saved_modules
+    if _saved_modules is None:
+        return
+    for name, module in _saved_modules.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+    _saved_modules = None
+
+
+if __name__ == "__main__":
+    scene = Scene(seed=1)
+    scene.add_echo(16, 50.0, noise=0.5, dropout=0.1)
+    scene.add_ir(24, [(0.2, 0.4)], period=1.0)
+    GPIO = install(scene)
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(24, GPIO.IN)
+    for i in range(10):
+        print(f"t={scene.now():.2f}s IR pin 24: {GPIO.input(24)}")
+        time.sleep(0.1)
+    print("IR transitions in the first 2s:", scene.ir[24].transitions(2.0))
@@ -0,0 +1,37 @@
+"""
+Robot Core Library
+==================
+
+Shared infrastructure for the MobileRobot libraries and examples.
+
+Features:
+- Simulated RPi.GPIO backend with scripted scenes (ultrasonic echoes, IR obstacles)
+- Run and benchmark the sensor libraries on machines without GPIO hardware
+- Sample: compact timestamped reading emitted by every sensor library
+- SampleBatch: zero-copy columnar history of samples
+- RobotBus: in-process publish/subscribe bus with latest-value and queue topics
+- SharedState: seqlock-protected shared-memory table of the latest sensor state
+- ModeArbiter: event-driven behavior state machine with hysteresis, motor ownership and per-mode stats
+
+Example usage:
+    >>> import SimGPIO
+    >>> scene = SimGPIO.Scene(seed=1).add_echo(16, 50.0, noise=0.5)
+    >>> SimGPIO.install(scene)
+    >>> from Ultrasonic_sens import Ultrasonic
+    >>> print(Ultrasonic().get_distance(16))
+"""
+
+from .SimGPIO import SimGPIO, Scene, EchoScript, IRScript, install, uninstall
+from .SensorSample import Sample, SampleBatch
+from .RobotBus import Bus, Topic, Subscription, Message, Poller, LATEST, QUEUE
+from .SharedState import SharedState
+from .ModeArbiter import ModeArbiter, OwnedMotor, IDLE, TRACKING, AVOIDING, FOUND
+
+__version__ = "1.0.0"
+__author__ = "JIaLeChye"
+__email__ = "jialecjl2016@outlook.com"
+__license__ = "MIT"
+
+__all__ = ["SimGPIO", "Scene", "EchoScript", "IRScript", "install", "uninstall", "Sample", "SampleBatch",
+           "Bus", "Topic", "Subscription", "Message", "Poller", "LATEST", "QUEUE",
+           "SharedState", "ModeArbiter", "OwnedMotor", "IDLE", "TRACKING", "AVOIDING", "FOUND"]
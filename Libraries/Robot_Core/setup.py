@@ -0,0 +1,32 @@
+from setuptools import setup, find_packages
+
+setup(
+    name="robot-core-lib",
+    version="1.0.0",
+    description="Shared infrastructure for the MobileRobot libraries",
+    long_description="Shared infrastructure for the MobileRobot libraries, including a simulated GPIO backend for running and benchmarking the sensor libraries without hardware, the timestamped sensor sample model and an in-process publish/subscribe bus.",
+    long_description_content_type="text/plain",
+    author="JIaLeChye",
+    author_email="jialecjl2016@outlook.com",
+    url="https://github.com/JIaLeChye/MobileRobot",
+    packages=find_packages(),
+    py_modules=["SimGPIO", "SensorSample", "RobotBus", "SharedState", "ModeArbiter"],
+    install_requires=[],
+    python_requires=">=3.8",
+    classifiers=[
+        "Development Status :: 4 - Beta",
+        "Intended Audience :: Developers",
+        "Intended Audience :: Education",
+        "License :: OSI Approved :: MIT License",
+        "Operating System :: POSIX :: Linux",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Topic :: System :: Hardware",
+        "Topic :: Education",
+        "Topic :: Scientific/Engineering",
+    ],
+    keywords="raspberry-pi, robotics, gpio, simulation, benchmark",
+)
@@ -0,0 +1,249 @@
+import time
+
+import cv2
+import numpy as np
+
+# Tag families of OpenCV's AprilTag dictionaries (fallback backend)
+OPENCV_FAMILIES = {
+    "tag16h5": "DICT_APRILTAG_16h5",
+    "tag25h9": "DICT_APRILTAG_25h9",
+    "tag36h10": "DICT_APRILTAG_36h10",
+    "tag36h11": "DICT_APRILTAG_36h11",
+}
+
+
+class Tag:
+    """
+    One detected AprilTag in full-frame pixel coordinates.
+
+    corners: (4, 2) float array in AprilTag order, counter-clockwise from the
+    tag's bottom-left corner (bottom-left, bottom-right, top-right, top-left
+    for an upright tag)
+    """
+    __slots__ = ("tag_id", "family", "center", "corners", "decision_margin", "timestamp_ns")
+
+    def __init__(self, tag_id, family, center, corners, decision_margin, timestamp_ns):
+        self.tag_id = tag_id
+        self.family = family
+        self.center = center
+        self.corners = corners
+        self.decision_margin = decision_margin  # decoding confidence (None on the OpenCV backend)
+        self.timestamp_ns = timestamp_ns
+
+    @property
+    def bbox(self):
+        """(x, y, w, h) of the corners"""
+        x0, y0 = self.corners.min(axis=0)
+        x1, y1 = self.corners.max(axis=0)
+        return (int(x0), int(y0), int(np.ceil(x1 - x0)), int(np.ceil(y1 - y0)))
+
+    def __repr__(self):
+        return f"Tag(id={self.tag_id}, center=({self.center[0]:.1f}, {self.center[1]:.1f}), family={self.family})"
+
+
+def make_tag_detector(family="tag36h11", threads=2, quad_decimate=2.0, backend=None):
+    """
+    Detector callable(gray) -> [(tag_id, center, corners, decision_margin), ...]
+    from the apriltag package (as used by the examples), pupil_apriltags, or
+    OpenCV's aruco module when neither is installed. The detector is built
+    once; calling it allocates nothing but the results.
+
+    :param family: Tag family, e.g. "tag36h11"
+    :param threads: Detector worker threads
+    :param quad_decimate: Quad detection on a 1/quad_decimate image (decoding stays full resolution)
+    :param backend: "apriltag", "pupil_apriltags" or "opencv" (default: first one available)
+    :return: (detect, backend name)
+    """
+    backends = [backend] if backend else ["apriltag", "pupil_apriltags", "opencv"]
+    for name in backends:
+        if name == "apriltag":
+            try:
+                import apriltag
+            except ImportError:
+                continue
+            detector = apriltag.Detector(apriltag.DetectorOptions(families=family, nthreads=threads,
+                                                                  quad_decimate=quad_decimate))
+
+            def detect(gray):
+                return [(d.tag_id, d.center, d.corners, d.decision_margin) for d in detector.detect(gray)]
+            return detect, name
+        if name == "pupil_apriltags":
+            try:
+                import pupil_apriltags
+            except ImportError:
+                continue
+            detector = pupil_apriltags.Detector(families=family, nthreads=threads, quad_decimate=quad_decimate)
+
+            def detect(gray):
+                return [(d.tag_id, d.center, d.corners, d.decision_margin)
+                        for d in detector.detect(np.ascontiguousarray(gray))]
+            return detect, name
+        if name == "opencv":
+            dictionary = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, OPENCV_FAMILIES[family]))
+            params = cv2.aruco.DetectorParameters()
+            params.aprilTagQuadDecimate = quad_decimate
+            params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_APRILTAG
+            detector = cv2.aruco.ArucoDetector(dictionary, params)
+
+            def detect(gray):
+                corners, ids, _ = detector.detectMarkers(gray)
+                if ids is None:
+                    return []
+                # OpenCV corners run clockwise from top-left; reorder to AprilTag's
+                return [(int(i), c[0].mean(axis=0), c[0][[3, 2, 1, 0]].astype(np.float64), None)
+                        for i, c in zip(ids.ravel(), corners)]
+            return detect, name
+    raise ImportError("No AprilTag backend: install apriltag or pupil_apriltags, or OpenCV with aruco")
+
+
+class AprilTagTracker:
+    """
+    AprilTag detection that keeps one detector and searches where tags are.
+
+    A full-frame pass runs with quad decimation (quads are found on a
+    downscaled image, decoding stays at full resolution). Once tags are
+    known, following frames only search regions of interest around their
+    last corners, grown by margin; ROIs that overlap are merged. A full
+    pass still runs every full_every frames (to pick up new tags) and
+    whenever the ROIs come back empty.
+
+    Example usage:
+        >>> tracker = AprilTagTracker(family="tag36h11", quad_decimate=2.0, threads=2)
+        >>> for tag in tracker.detect(gray, timestamp_ns):
+        ...     print(tag.tag_id, tag.center, tag.corners)
+    """
+
+    def __init__(self, family="tag36h11", quad_decimate=2.0, threads=2, full_every=15, margin=0.5, min_roi=64,
+                 roi_decimate=None, backend=None):
+        """
+        :param family: Tag family, e.g. "tag36h11"
+        :param quad_decimate: Quad decimation of the full-frame pass
+        :param threads: Detector worker threads
+        :param full_every: Frames between full-frame passes while tags are tracked
+        :param margin: ROI growth on each side as a fraction of the tag size
+        :param min_roi: Minimum ROI side in pixels
+        :param roi_decimate: Quad decimation inside ROIs (default: quad_decimate; 1.0 for small, far tags)
+        :param backend: Detector backend (see make_tag_detector)
+        """
+        self.family = family
+        self.full_every = full_every
+        self.margin = margin
+        self.min_roi = min_roi
+        self._detect_full, self.backend = make_tag_detector(family, threads, quad_decimate, backend)
+        if roi_decimate is None or roi_decimate == quad_decimate:
+            self._detect_roi = self._detect_full
+        else:
+            self._detect_roi, _ = make_tag_detector(family, threads, roi_decimate, self.backend)
+        self.tags = []           # tags of the last frame
+        self.rois = []           # (x, y, w, h) searched in the last frame, empty after a full pass
+        self._since_full = 0
+        # Statistics
+        self.frames = 0
+        self.full_passes = 0
+        self.roi_passes = 0
+        self.detections = 0
+        self.pixels = 0
+        self.detect_ns = 0
+
+    def reset(self):
+        self.tags = []
+        self.rois = []
+
+    def _rois(self, height, width):
+        """Search windows around the last tags, overlapping ones merged"""
+        boxes = []
+        for tag in self.tags:
+            x, y, w, h = tag.bbox
+            grow_w = max(self.min_roi, w * (1 + 2 * self.margin)) / 2
+            grow_h = max(self.min_roi, h * (1 + 2 * self.margin)) / 2
+            cx, cy = x + w / 2, y + h / 2
+            boxes.append([max(0, int(cx - grow_w)), max(0, int(cy - grow_h)),
+                          min(width, int(cx + grow_w) + 1), min(height, int(cy + grow_h) + 1)])
+        merged = []
+        while boxes:
+            box = boxes.pop()
+            for other in boxes:
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    boxes.remove(other)
+                    boxes.append([min(box[0], other[0]), min(box[1], other[1]),
+                                  max(box[2], other[2]), max(box[3], other[3])])
+                    break
+            else:
+                merged.append(box)
+        return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in merged if x1 > x0 and y1 > y0]
+
+    def _tags(self, hits, dx, dy, timestamp_ns):
+        return [Tag(int(tag_id), self.family, np.asarray(center, dtype=np.float64) + (dx, dy),
+                    np.asarray(corners, dtype=np.float64) + (dx, dy), margin, timestamp_ns)
+                for tag_id, center, corners, margin in hits]
+
+    def detect(self, gray, timestamp_ns=None):
+        """Tags in a grayscale frame (list of Tag, one per id)"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        start = time.perf_counter_ns()
+        self.frames += 1
+        height, width = gray.shape[:2]
+        tags = []
+        self.rois = []
+        if self.tags and self._since_full < self.full_every:
+            self.rois = self._rois(height, width)
+            for x, y, w, h in self.rois:
+                self.pixels += w * h
+                tags += self._tags(self._detect_roi(gray[y:y + h, x:x + w]), x, y, timestamp_ns)
+            self.roi_passes += 1
+            self._since_full += 1
+        if not tags:
+            self.rois = []
+            self.pixels += width * height
+            tags = self._tags(self._detect_full(gray), 0, 0, timestamp_ns)
+            self.full_passes += 1
+            self._since_full = 0
+        # One tag per id (merged ROIs can see a tag twice)
+        best = {}
+        for tag in tags:
+            kept = best.get(tag.tag_id)
+            if kept is None or (tag.decision_margin or 0) > (kept.decision_margin or 0):
+                best[tag.tag_id] = tag
+        self.tags = list(best.values())
+        self.detections += len(self.tags)
+        self.detect_ns += time.perf_counter_ns() - start
+        return self.tags
+
+    def draw(self, image, tags=None):
+        """Overlay tag outlines and ids (for display only)"""
+        for tag in self.tags if tags is None else tags:
+            cv2.polylines(image, [tag.corners.astype(np.int32)], True, (0, 255, 0), 2)
+            cv2.putText(image, str(tag.tag_id), (int(tag.center[0]) - 8, int(tag.center[1]) + 8),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        for x, y, w, h in self.rois:
+            cv2.rectangle(image, (x, y), (x + w, y + h), (255, 0, 0), 1)
+        return image
+
+    def stats(self):
+        frames = max(1, self.frames)
+        seconds = self.detect_ns / 1e9
+        return {
+            "frames": self.frames,
+            "full_passes": self.full_passes,
+            "roi_passes": self.roi_passes,
+            "tags_per_frame": self.detections / frames,
+            "detections_per_s": self.detections / seconds if seconds > 0 else 0.0,
+            "detect_ms_mean": self.detect_ns / frames / 1e6,
+            "pixels_per_frame": self.pixels / frames,
+        }
+
+
+if __name__ == "__main__":
+    # Two synthetic tags drifting over a noisy background
+    dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_APRILTAG_36h11)
+    tracker = AprilTagTracker()
+    rng = np.random.default_rng(0)
+    background = rng.integers(60, 180, size=(480, 640), dtype=np.uint8)
+    for i in range(60):
+        gray = background.copy()
+        for tag_id, (x, y) in ((3, (100 + 2 * i, 120)), (7, (400, 260 + i))):
+            gray[y - 20:y + 140, x - 20:x + 140] = 255  # quiet zone
+            gray[y:y + 120, x:x + 120] = cv2.aruco.generateImageMarker(dictionary, tag_id, 120)
+        tags = tracker.detect(gray, timestamp_ns=int(i * 1e9 / 30))
+    print(f"backend {tracker.backend}: {tags}")
+    print(tracker.stats())
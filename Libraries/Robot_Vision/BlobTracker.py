@@ -0,0 +1,187 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class Blob:
+    """The tracked color blob in full-frame pixel coordinates"""
+    __slots__ = ("x", "y", "w", "h", "area", "cx", "cy", "timestamp_ns")
+
+    def __init__(self, x, y, w, h, area, cx, cy, timestamp_ns):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.area = area
+        self.cx = cx
+        self.cy = cy
+        self.timestamp_ns = timestamp_ns
+
+    @property
+    def center(self):
+        return (int(self.cx), int(self.cy))
+
+    @property
+    def bbox(self):
+        return (self.x, self.y, self.w, self.h)
+
+    def __repr__(self):
+        return f"Blob(center={self.center}, bbox={self.bbox}, area={self.area})"
+
+
+def hsv_mask(lower, upper, conversion=cv2.COLOR_BGR2HSV):
+    """Mask function thresholding an image in HSV between lower and upper"""
+    lower = np.asarray(lower, dtype=np.uint8)
+    upper = np.asarray(upper, dtype=np.uint8)
+
+    def mask(image):
+        return cv2.inRange(cv2.cvtColor(image, conversion), lower, upper)
+    return mask
+
+
+def largest_component(mask):
+    """
+    Largest connected blob of a binary mask in one labelling pass.
+    Returns (x, y, w, h, area, cx, cy) in mask coordinates, or None.
+    """
+    count, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count <= 1:
+        return None
+    i = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))  # label 0 is the background
+    x, y, w, h, area = (int(v) for v in stats[i])
+    cx, cy = centroids[i]
+    return x, y, w, h, area, float(cx), float(cy)
+
+
+class BlobTracker:
+    """
+    Color blob tracker that only segments where the target can be.
+
+    While locked, each frame is thresholded inside a region of interest around
+    the position predicted by a constant-velocity model (the last box grown by
+    margin on every side plus the predicted motion). When the target is not
+    found there, a global search runs on a 1/scale nearest-neighbour
+    downscaled frame and the hit is refined at full resolution. The largest
+    blob is picked from connected-component statistics instead of sorting
+    contours.
+
+    Example usage:
+        >>> tracker = BlobTracker(hsv_mask(lower_bound, upper_bound), min_area=1500)
+        >>> blob = tracker.update(frame)
+        >>> if blob is not None:
+        ...     print(blob.center, blob.area)
+    """
+
+    def __init__(self, mask, min_area=1500, scale=4, margin=0.25, min_roi=48, velocity_smoothing=0.5):
+        """
+        :param mask: Callable(image) -> uint8 binary mask (e.g. hsv_mask(lower, upper))
+        :param min_area: Minimum blob area in full-resolution pixels
+        :param scale: Downscale factor of the global search (default 4: 1/4 width and height)
+        :param margin: ROI growth on each side as a fraction of the blob size (default 0.25)
+        :param min_roi: Minimum ROI side in pixels
+        :param velocity_smoothing: Weight of the newest velocity measurement (0..1)
+        """
+        self.mask = mask
+        self.min_area = min_area
+        self.scale = scale
+        self.margin = margin
+        self.min_roi = min_roi
+        self.alpha = velocity_smoothing
+        self.blob = None         # last detection
+        self.velocity = (0.0, 0.0)  # pixels per second
+        self.roi = None          # (x, y, w, h) searched in the last update, None for a global search
+        # Statistics
+        self.frames = 0
+        self.roi_hits = 0
+        self.global_searches = 0
+        self.lost = 0
+        self.pixels = 0          # full-resolution pixels segmented
+
+    def reset(self):
+        self.blob = None
+        self.velocity = (0.0, 0.0)
+        self.roi = None
+
+    def predict(self, timestamp_ns):
+        """Predicted (cx, cy) of the target at timestamp_ns, or None if not locked"""
+        if self.blob is None:
+            return None
+        dt = (timestamp_ns - self.blob.timestamp_ns) / 1e9
+        return (self.blob.cx + self.velocity[0] * dt, self.blob.cy + self.velocity[1] * dt)
+
+    def _roi(self, frame, timestamp_ns):
+        height, width = frame.shape[:2]
+        cx, cy = self.predict(timestamp_ns)
+        blob = self.blob
+        half_w = max(self.min_roi, blob.w * (1 + 2 * self.margin)) / 2 + abs(cx - blob.cx)
+        half_h = max(self.min_roi, blob.h * (1 + 2 * self.margin)) / 2 + abs(cy - blob.cy)
+        x0, y0 = max(0, int(cx - half_w)), max(0, int(cy - half_h))
+        x1, y1 = min(width, int(cx + half_w) + 1), min(height, int(cy + half_h) + 1)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _search_roi(self, frame, roi, timestamp_ns):
+        x0, y0, w, h = roi
+        self.pixels += w * h
+        hit = largest_component(self.mask(frame[y0:y0 + h, x0:x0 + w]))
+        if hit is None or hit[4] < self.min_area:
+            return None
+        x, y, bw, bh, area, cx, cy = hit
+        return Blob(x0 + x, y0 + y, bw, bh, area, x0 + cx, y0 + cy, timestamp_ns)
+
+    def _search_global(self, frame, timestamp_ns):
+        height, width = frame.shape[:2]
+        s = self.scale
+        small = cv2.resize(frame, (width // s, height // s), interpolation=cv2.INTER_NEAREST)
+        self.pixels += small.shape[0] * small.shape[1]
+        hit = largest_component(self.mask(small))
+        if hit is None or hit[4] * s * s < self.min_area:
+            return None
+        x, y, w, h, area, cx, cy = hit
+        coarse = Blob(x * s, y * s, w * s, h * s, area * s * s, cx * s, cy * s, timestamp_ns)
+        # Refine at full resolution around the coarse hit
+        pad = s * 2
+        roi = (max(0, coarse.x - pad), max(0, coarse.y - pad),
+               min(width, coarse.x + coarse.w + pad) - max(0, coarse.x - pad),
+               min(height, coarse.y + coarse.h + pad) - max(0, coarse.y - pad))
+        return self._search_roi(frame, roi, timestamp_ns) or coarse
+
+    def update(self, frame, timestamp_ns=None):
+        """Locate the target in a new frame; returns a Blob, or None if it is not visible"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        self.frames += 1
+        blob = None
+        self.roi = self._roi(frame, timestamp_ns) if self.blob is not None else None
+        if self.roi is not None:
+            blob = self._search_roi(frame, self.roi, timestamp_ns)
+            if blob is not None:
+                self.roi_hits += 1
+        if blob is None:
+            self.global_searches += 1
+            self.roi = None
+            blob = self._search_global(frame, timestamp_ns)
+        if blob is None:
+            self.lost += 1
+            self.reset()
+            return None
+        if self.blob is not None:
+            dt = (timestamp_ns - self.blob.timestamp_ns) / 1e9
+            if dt > 0:
+                vx = (blob.cx - self.blob.cx) / dt
+                vy = (blob.cy - self.blob.cy) / dt
+                a = self.alpha
+                self.velocity = (a * vx + (1 - a) * self.velocity[0], a * vy + (1 - a) * self.velocity[1])
+        self.blob = blob
+        return blob
+
+    def stats(self):
+        frames = max(1, self.frames)
+        return {
+            "frames": self.frames,
+            "roi_hit_pct": 100.0 * self.roi_hits / frames,
+            "global_searches": self.global_searches,
+            "lost": self.lost,
+            "pixels_per_frame": self.pixels / frames,
+        }
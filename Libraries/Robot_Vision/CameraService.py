@@ -0,0 +1,456 @@
+import time
+import threading
+
+import numpy as np
+
+# Frame layout of the Picamera2 formats used by the examples: format -> channels
+# (None for planar YUV420, which is stored as a (height * 3 // 2, width) array)
+FORMATS = {
+    "RGB888": 3,
+    "BGR888": 3,
+    "XRGB8888": 4,
+    "XBGR8888": 4,
+    "YUV420": None,
+}
+
+
+def frame_shape(format, size):
+    """NumPy shape of a frame of the given Picamera2 format and (width, height) size"""
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported frame format: {format}")
+    width, height = size
+    channels = FORMATS[format]
+    if channels is None:
+        return (height * 3 // 2, width)
+    return (height, width, channels)
+
+
+def capture_config(picam2, size=(640, 480), format="RGB888", lores=None, vflip=False, hflip=False):
+    """
+    Picamera2 preview configuration shared by the examples: the main stream in
+    the given format and, if lores (width, height) is given, a YUV420 lores
+    stream whose Y plane is the grayscale image at that size.
+    """
+    from libcamera import Transform
+
+    streams = {"main": {"format": format, "size": tuple(size)}}
+    if lores is not None:
+        streams["lores"] = {"format": "YUV420", "size": tuple(lores)}
+    return picam2.create_preview_configuration(
+        transform=Transform(vflip=int(vflip), hflip=int(hflip)), **streams)
+
+
+def y_plane(array, size):
+    """
+    Grayscale view (no copy, no conversion) of the Y plane of a YUV420 buffer
+    mapped as a (height * 3 // 2, stride) array.
+    """
+    width, height = size
+    return array[:height, :width]
+
+
+class Frame:
+    """
+    A consumer's pinned, read-only view of one ring slot.
+    The slot is not overwritten while the frame is held; call release() (or
+    let FrameReader.get() do it) as soon as the pixels are no longer needed.
+    Copy the array before drawing on it: other consumers share the buffer.
+    """
+    __slots__ = ("array", "seq", "timestamp_ns", "_ring", "_slot")
+
+    def __init__(self, array, seq, timestamp_ns, ring, slot):
+        self.array = array
+        self.seq = seq
+        self.timestamp_ns = timestamp_ns
+        self._ring = ring
+        self._slot = slot
+
+    def age(self, now_ns=None):
+        """Seconds elapsed since the frame was captured"""
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        return (now_ns - self.timestamp_ns) / 1e9
+
+    def release(self):
+        if self._ring is not None:
+            self._ring._unpin(self._slot)
+            self._ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def __repr__(self):
+        return f"Frame(seq={self.seq}, shape={self.array.shape}, timestamp_ns={self.timestamp_ns})"
+
+
+class FrameRing:
+    """
+    Fixed ring of preallocated frame buffers with one writer and many readers.
+
+    The writer fills a free slot outside the lock and then publishes it with
+    a new sequence number. Readers pin the newest slot and read it in place;
+    the writer never touches the newest slot or a pinned one, and if every
+    other slot is pinned the frame is dropped (counted in overruns) instead
+    of waiting for slow readers. Use at least readers + 2 slots.
+    """
+
+    def __init__(self, shape, dtype=np.uint8, slots=6):
+        """
+        :param shape: NumPy shape of one frame
+        :param dtype: NumPy dtype of one frame (default uint8)
+        :param slots: Number of preallocated buffers (default 6)
+        """
+        if slots < 3:
+            raise ValueError("FrameRing needs at least 3 slots")
+        self.shape = tuple(shape)
+        self.buffers = [np.zeros(shape, dtype) for _ in range(slots)]
+        self._views = []
+        for buffer in self.buffers:
+            view = buffer.view()
+            view.flags.writeable = False
+            self._views.append(view)
+        self._seqs = [0] * slots
+        self._timestamps = [0] * slots
+        self._pins = [0] * slots
+        self.cond = threading.Condition()
+        self.head = None  # slot holding the newest frame
+        self.seq = 0      # sequence number of the newest frame
+        self.overruns = 0
+        self.closed = False
+
+    ##---------Writer section---------------##
+    def begin_write(self):
+        """
+        Reserve a slot for the next frame; returns (slot, buffer), or
+        (None, None) if every slot is pinned or newest (the frame is dropped).
+        """
+        with self.cond:
+            slots = len(self.buffers)
+            start = 0 if self.head is None else self.head + 1
+            for i in range(slots):
+                slot = (start + i) % slots
+                if slot != self.head and not self._pins[slot]:
+                    return slot, self.buffers[slot]
+            self.overruns += 1
+            return None, None
+
+    def commit(self, slot, timestamp_ns=None):
+        """Publish the slot filled after begin_write() as the newest frame"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        with self.cond:
+            self.seq += 1
+            self._seqs[slot] = self.seq
+            self._timestamps[slot] = timestamp_ns
+            self.head = slot
+            self.cond.notify_all()
+        return self.seq
+
+    def write(self, array, timestamp_ns=None):
+        """Copy an array into the ring (one memcpy); returns its seq, or None if dropped"""
+        slot, buffer = self.begin_write()
+        if slot is None:
+            return None
+        np.copyto(buffer, array)
+        return self.commit(slot, timestamp_ns)
+    ##########################################
+
+    ##---------Reader section---------------##
+    def acquire(self, after_seq=0, timeout=None):
+        """
+        Pin and return the newest Frame with seq > after_seq, waiting up to
+        timeout seconds for one; returns None on timeout or once closed.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > after_seq or self.closed, timeout):
+                return None
+            if self.head is None or self.seq <= after_seq:
+                return None
+            slot = self.head
+            self._pins[slot] += 1
+            return Frame(self._views[slot], self._seqs[slot], self._timestamps[slot], self, slot)
+
+    def _unpin(self, slot):
+        with self.cond:
+            self._pins[slot] -= 1
+
+    def close(self):
+        """Wake up all waiting readers; acquire() returns None from now on"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+    ##########################################
+
+
+class FrameReader:
+    """
+    One consumer of a FrameRing (detector, tracker, display, recorder...).
+    get() always returns the newest frame this reader has not seen yet and
+    releases the frame it returned last time, so a reader holds at most one
+    slot. Frames published while the reader was busy are skipped and counted.
+    """
+
+    def __init__(self, ring, name="reader"):
+        self.ring = ring
+        self.name = name
+        self.last_seq = 0
+        self.received = 0
+        self.skipped = 0
+        self._frame = None
+
+    def get(self, timeout=None):
+        """The next newest Frame, or None on timeout"""
+        self.release()
+        frame = self.ring.acquire(self.last_seq, timeout)
+        if frame is None:
+            return None
+        if self.last_seq:
+            self.skipped += frame.seq - self.last_seq - 1
+        self.last_seq = frame.seq
+        self.received += 1
+        self._frame = frame
+        return frame
+
+    def release(self):
+        """Release the frame returned by the last get()"""
+        if self._frame is not None:
+            self._frame.release()
+            self._frame = None
+
+    def stats(self):
+        return {"received": self.received, "skipped": self.skipped}
+
+
+class CameraService:
+    """
+    Single owner of the camera.
+
+    A capture thread takes every frame from Picamera2, copies it once from the
+    camera's DMA buffer into a preallocated FrameRing slot and returns the
+    camera buffer straight away, so capture never waits for a consumer. Any
+    number of FrameReaders read the same slot without copying.
+
+    With lores=(width, height) the camera also produces a YUV420 lores stream
+    and its Y plane (the grayscale image, no color conversion) is copied into
+    a second ring for grayscale consumers (reader(name, stream="gray")). The
+    main stream is then only copied while it has a reader, e.g. a display.
+
+    Example usage:
+        >>> camera = CameraService(size=(640, 480), vflip=True).start()
+        >>> reader = camera.reader("detector")
+        >>> frame = reader.get(timeout=1)
+        >>> camera.stop()
+
+        >>> camera = CameraService(size=(640, 480), lores=(320, 240), vflip=True).start()
+        >>> gray = camera.reader("line", stream="gray").get(timeout=1).array  # (240, 320) uint8
+    """
+
+    def __init__(self, size=(640, 480), format="RGB888", vflip=False, hflip=False, slots=6,
+                 autofocus=True, camera_num=0, controls=None, source=None, lores=None):
+        """
+        :param size: Frame size (width, height) (default (640, 480))
+        :param format: Picamera2 pixel format (default "RGB888")
+        :param vflip: Flip the image vertically (camera mounted upside down)
+        :param hflip: Flip the image horizontally
+        :param slots: Number of ring buffers; use at least number of readers + 2
+        :param autofocus: Enable continuous autofocus when the camera supports it
+        :param camera_num: Picamera2 camera index
+        :param controls: Extra Picamera2 controls applied after start
+        :param source: Optional callable(buffer) -> bool that fills a buffer in
+                       place instead of the camera (recorded video, synthetic frames)
+        :param lores: Optional grayscale stream size (width, height), at most size
+        """
+        self.size = tuple(size)
+        self.format = format
+        self.vflip = vflip
+        self.hflip = hflip
+        self.autofocus = autofocus
+        self.camera_num = camera_num
+        self.controls = controls or {}
+        self.source = source
+        self.ring = FrameRing(frame_shape(format, size), slots=slots)
+        self.lores = tuple(lores) if lores is not None else None
+        self.gray_ring = FrameRing((self.lores[1], self.lores[0]), slots=slots) if lores is not None else None
+        self._main_readers = 0
+        self.picam2 = None
+        self.captured = 0
+        self.errors = 0
+        self._started_ns = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def frame_center(self):
+        return (self.size[0] // 2, self.size[1] // 2)
+
+    def start(self):
+        """Open the camera (unless a source was given) and start the capture thread"""
+        if self._thread is not None:
+            return self
+        if self.source is None:
+            self._open_camera()
+        self._stop_event.clear()
+        self._started_ns = time.monotonic_ns()
+        self._thread = threading.Thread(target=self._run, name="CameraService", daemon=True)
+        self._thread.start()
+        return self
+
+    def _open_camera(self):
+        from picamera2 import Picamera2
+        from libcamera import controls
+
+        self.picam2 = Picamera2(self.camera_num)
+        self.picam2.configure(capture_config(self.picam2, self.size, self.format, self.lores,
+                                             self.vflip, self.hflip))
+        self.picam2.start()
+        settings = dict(self.controls)
+        if self.autofocus:
+            settings.setdefault("AfMode", controls.AfModeEnum.Continuous)
+        if settings:
+            try:
+                self.picam2.set_controls(settings)
+            except Exception as e:
+                print(f"CameraService: could not apply controls {settings}: {e}")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                if self.source is None:
+                    self._capture_camera()
+                else:
+                    self._capture_source()
+            except Exception as e:
+                self.errors += 1
+                print(f"CameraService: capture error: {e}")
+                self._stop_event.wait(0.1)
+        self.ring.close()
+        if self.gray_ring is not None:
+            self.gray_ring.close()
+
+    def _capture_camera(self):
+        from picamera2 import MappedArray
+
+        request = self.picam2.capture_request()
+        try:
+            timestamp_ns = time.monotonic_ns()
+            if self.gray_ring is not None:
+                slot, buffer = self.gray_ring.begin_write()
+                if slot is not None:
+                    with MappedArray(request, "lores") as mapped:
+                        np.copyto(buffer, y_plane(mapped.array, self.lores))
+                    self.gray_ring.commit(slot, timestamp_ns)
+            if self.gray_ring is None or self._main_readers:
+                slot, buffer = self.ring.begin_write()
+                if slot is not None:
+                    with MappedArray(request, "main") as mapped:
+                        np.copyto(buffer, mapped.array)
+                    self.ring.commit(slot, timestamp_ns)
+            self.captured += 1
+        finally:
+            request.release()
+
+    def _capture_source(self):
+        slot, buffer = self.ring.begin_write()
+        if slot is None:
+            # Every free slot is pinned; don't spin while readers catch up
+            self._stop_event.wait(0.001)
+            return
+        timestamp_ns = time.monotonic_ns()
+        if not self.source(buffer):
+            self._stop_event.set()
+            return
+        if self.gray_ring is not None:
+            self._source_gray(buffer, timestamp_ns)
+        self.ring.commit(slot, timestamp_ns)
+        self.captured += 1
+
+    def _source_gray(self, buffer, timestamp_ns):
+        # Sources only produce the main format; derive the grayscale stream from it
+        import cv2
+
+        slot, gray = self.gray_ring.begin_write()
+        if slot is None:
+            return
+        if buffer.ndim == 2:  # YUV420
+            small = y_plane(buffer, self.size)
+        else:
+            small = cv2.cvtColor(buffer, cv2.COLOR_BGRA2GRAY if buffer.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        cv2.resize(small, self.lores, dst=gray, interpolation=cv2.INTER_AREA)
+        self.gray_ring.commit(slot, timestamp_ns)
+
+    def reader(self, name="reader", stream="main"):
+        """
+        Create a new consumer of the frame ring.
+
+        :param name: Name shown in the statistics
+        :param stream: "main" for the main format, "gray" for the lores Y plane
+        """
+        if stream == "gray":
+            if self.gray_ring is None:
+                raise ValueError("CameraService was created without a lores size; no gray stream")
+            return FrameReader(self.gray_ring, name)
+        if stream != "main":
+            raise ValueError(f"Unknown stream: {stream}")
+        self._main_readers += 1
+        return FrameReader(self.ring, name)
+
+    def stats(self):
+        elapsed = (time.monotonic_ns() - self._started_ns) / 1e9 if self._started_ns else 0
+        return {
+            "captured": self.captured,
+            "fps": self.captured / elapsed if elapsed > 0 else 0.0,
+            "overruns": self.ring.overruns + (self.gray_ring.overruns if self.gray_ring is not None else 0),
+            "errors": self.errors,
+        }
+
+    def print_stats(self, *readers):
+        stats = self.stats()
+        print(f"Camera: {stats['captured']} frames at {stats['fps']:.1f} fps, "
+              f"{stats['overruns']} dropped (no free slot), {stats['errors']} errors")
+        for reader in readers:
+            print(f"  {reader.name:<10} received {reader.received}, skipped {reader.skipped}")
+
+    def stop(self, timeout=2):
+        """Stop capturing and release the camera"""
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        self.ring.close()
+        if self.gray_ring is not None:
+            self.gray_ring.close()
+        if self.picam2 is not None:
+            try:
+                self.picam2.stop()
+                self.picam2.close()
+            except Exception as e:
+                print(f"CameraService: camera close error: {e}")
+            self.picam2 = None
+
+
+if __name__ == "__main__":
+    # Demo without a camera: a synthetic 30 fps source, a fast and a slow consumer
+    def synthetic(buffer, period=1 / 30):
+        time.sleep(period)
+        buffer[...] = int(time.monotonic() * 100) % 256
+        return True
+
+    camera = CameraService(source=synthetic).start()
+    fast, slow = camera.reader("fast"), camera.reader("slow")
+
+    def consume(reader, work):
+        end = time.monotonic() + 2
+        while time.monotonic() < end:
+            if reader.get(timeout=0.5) is not None:
+                time.sleep(work)
+        reader.release()
+
+    threads = [threading.Thread(target=consume, args=(fast, 0.001)),
+               threading.Thread(target=consume, args=(slow, 0.2))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    camera.stop()
+    camera.print_stats(fast, slow)
@@ -0,0 +1,128 @@
+import cv2
+import numpy as np
+
+BACKGROUND = 0
+
+
+def _ranges(bounds):
+    """Normalise one class to a list of (lower, upper) HSV arrays"""
+    bounds = np.asarray(bounds, dtype=np.int32)
+    if bounds.shape == (2, 3):
+        bounds = bounds[np.newaxis]
+    if bounds.ndim != 3 or bounds.shape[1:] != (2, 3):
+        raise ValueError(f"HSV bounds must be [lower, upper] triples, got shape {bounds.shape}")
+    return [(lower, upper) for lower, upper in bounds]
+
+
+class ColorLUT:
+    """
+    Color segmentation through a quantized color -> class lookup table.
+
+    HSV threshold boxes (as chosen with the HSV color picker) are evaluated
+    once, offline, for the center color of every cell of a 2^bits per
+    channel color grid (32^3 cells for bits=5, 64^3 for bits=6). Segmenting a
+    frame then needs no HSV conversion: each pixel's cell index is built from
+    three per-channel cv2.LUT passes into reused buffers (uint16 up to
+    bits=5, int32 for bits=6) and the class is read from the table with one
+    NumPy take, for any number of classes at once. Class ids start
+    at 1 in the order given; 0 is background and the first class wins where
+    boxes overlap.
+
+    Example usage:
+        >>> lut = ColorLUT.from_file("hsv_value.npy")
+        >>> mask = lut.mask(frame)           # 0/255 mask of class 1
+        >>> labels = lut.classify(frame)     # class id per pixel
+    """
+
+    def __init__(self, classes, bits=5, order="BGR", names=None):
+        """
+        :param classes: One entry per class: [lower, upper] HSV bounds (OpenCV ranges,
+                        H 0-179) or a list of them (e.g. red wrapping around hue 0)
+        :param bits: Quantization bits per channel, 4, 5 or 6 (16^3, 32^3 or 64^3 table)
+        :param order: Channel order of the frames, "BGR" (OpenCV, Picamera2 RGB888
+                      and XRGB8888) or "RGB"
+        :param names: Optional class names, e.g. ["ball", "line"]
+        """
+        if bits not in (4, 5, 6):
+            raise ValueError("bits must be 4, 5 or 6")
+        if order not in ("BGR", "RGB"):
+            raise ValueError(f"Unknown channel order: {order}")
+        if len(classes) > 254:
+            raise ValueError("At most 254 classes are supported")
+        self.bits = bits
+        self.order = order
+        self.classes = [_ranges(bounds) for bounds in classes]
+        self.names = list(names) if names is not None else [f"class{i + 1}" for i in range(len(self.classes))]
+        self.table = self._compile()
+        self._mask_tables = {}
+        # Per-channel partial cell indices: pixel index = lut0[c0] | lut1[c1] | lut2[c2];
+        # up to 15 index bits fit in uint16, half the memory traffic of int32
+        shift = 8 - bits
+        cell = np.arange(256, dtype=np.int32) >> shift
+        dtype = np.uint16 if bits <= 5 else np.int32
+        self._luts = [(cell << (bits * (2 - c))).astype(dtype).reshape(1, 256) for c in range(3)]
+        self._planes = None   # split channels, reused while the image shape stays the same
+        self._buffers = None  # index and partial index images
+
+    @classmethod
+    def from_file(cls, path="hsv_value.npy", **kwargs):
+        """
+        Build from bounds saved by HSV_Color_Picker: a [[lower], [upper]]
+        array for one class, or an (n, 2, 3) array for n classes.
+        """
+        bounds = np.load(path)
+        classes = [bounds] if bounds.ndim == 2 else list(bounds)
+        return cls(classes, **kwargs)
+
+    def _compile(self):
+        """Class id of every grid cell, evaluated at the cell's center color"""
+        bits = self.bits
+        size = 1 << bits
+        centers = ((np.arange(size, dtype=np.int32) << (8 - bits)) + (1 << (7 - bits))).astype(np.uint8)
+        c0, c1, c2 = np.meshgrid(centers, centers, centers, indexing="ij")
+        grid = np.stack([c0.ravel(), c1.ravel(), c2.ravel()], axis=1).reshape(-1, 1, 3)
+        conversion = cv2.COLOR_BGR2HSV if self.order == "BGR" else cv2.COLOR_RGB2HSV
+        hsv = cv2.cvtColor(grid, conversion)
+        table = np.zeros(size ** 3, dtype=np.uint8)
+        # Assign in reverse so earlier classes win overlaps
+        for class_id in range(len(self.classes), 0, -1):
+            for lower, upper in self.classes[class_id - 1]:
+                inside = cv2.inRange(hsv, lower, upper).ravel() > 0
+                table[inside] = class_id
+        return table
+
+    def index(self, image):
+        """
+        Grid cell index of every pixel (uint16 image, int32 for bits=6).
+        The result is a reused buffer, overwritten by the next call.
+        """
+        shape = image.shape[:2]
+        if self._planes is None or self._planes[0].shape != shape or len(self._planes) != image.shape[2]:
+            self._planes = [np.empty(shape, dtype=np.uint8) for _ in range(image.shape[2])]
+            self._buffers = [np.empty(shape, dtype=self._luts[0].dtype) for _ in range(2)]
+        planes = cv2.split(image, self._planes)
+        index, partial = self._buffers
+        cv2.LUT(planes[0], self._luts[0], index)
+        cv2.LUT(planes[1], self._luts[1], partial)
+        cv2.bitwise_or(index, partial, index)
+        cv2.LUT(planes[2], self._luts[2], partial)
+        cv2.bitwise_or(index, partial, index)
+        return index
+
+    def classify(self, image):
+        """Class id per pixel (uint8, 0 = background) for a 3 or 4 channel image"""
+        return self.table.take(self.index(image))
+
+    def mask(self, image, class_id=1):
+        """0/255 mask of one class, ready for connected components or contours"""
+        table = self._mask_tables.get(class_id)
+        if table is None:
+            table = self._mask_tables[class_id] = np.where(self.table == class_id, 255, 0).astype(np.uint8)
+        return table.take(self.index(image))
+
+    def mask_fn(self, class_id=1):
+        """Mask function for BlobTracker"""
+        return lambda image: self.mask(image, class_id)
+
+    def class_id(self, name):
+        return self.names.index(name) + 1
@@ -0,0 +1,186 @@
+import time
+import queue
+import threading
+from collections import deque, namedtuple
+
+# Result of one frame: capture seq and timestamp, detections, and the end-to-end latency
+Result = namedtuple("Result", ["seq", "timestamp_ns", "detections", "latency_ns"])
+
+
+class StageStats:
+    """Items, busy time and per-item latency of one pipeline stage"""
+
+    def __init__(self, name, window=1000):
+        self.name = name
+        self.items = 0
+        self.busy_ns = 0
+        self.latencies = deque(maxlen=window)  # recent per-item latencies (ns)
+        self.started_ns = time.monotonic_ns()
+        self.stopped_ns = None
+        self._lock = threading.Lock()
+
+    def add(self, elapsed_ns):
+        with self._lock:
+            self.items += 1
+            self.busy_ns += elapsed_ns
+            self.latencies.append(elapsed_ns)
+
+    def summary(self):
+        with self._lock:
+            wall = ((self.stopped_ns or time.monotonic_ns()) - self.started_ns) / 1e9
+            latencies = sorted(self.latencies)
+            return {
+                "items": self.items,
+                "fps": self.items / wall if wall > 0 else 0.0,
+                "busy_pct": 100.0 * self.busy_ns / 1e9 / wall if wall > 0 else 0.0,
+                "ms_mean": sum(latencies) / len(latencies) / 1e6 if latencies else 0.0,
+                "ms_p95": latencies[int(0.95 * (len(latencies) - 1))] / 1e6 if latencies else 0.0,
+            }
+
+
+class DetectionPipeline:
+    """
+    Capture, preprocessing and inference in overlapping stages.
+
+    The CameraService capture thread is the first stage. A preprocess thread
+    takes the newest frame from its reader and resizes it into one of a few
+    recycled input buffers; an inference thread feeds those buffers to the
+    detector. Stages are connected by bounded queues, so while the model runs
+    on frame N the next frame is already captured and preprocessed. The queue
+    into inference holds one frame and a newer frame replaces a waiting one,
+    so a slow model skips frames instead of working through stale ones.
+    Rendering and control read the newest Result from any other thread.
+    With a MotionGate, frames of an unchanged scene are dropped before
+    preprocessing and the newest Result stays current.
+
+    Example usage:
+        >>> detector = TFLiteDetector("mobilenet_v2.tflite", num_threads=3)
+        >>> pipeline = DetectionPipeline(camera.reader("detector"), detector).start()
+        >>> result = pipeline.wait(after_seq=0, timeout=1)
+        >>> pipeline.print_stats()
+    """
+
+    def __init__(self, reader, detector, gate=None):
+        """
+        :param reader: CameraService FrameReader the frames come from
+        :param detector: Object with new_input(), preprocess(frame, out) and infer(buffer)
+        :param gate: MotionGate deciding which frames are worth inferring (None: every frame)
+        """
+        self.reader = reader
+        self.detector = detector
+        self.gate = gate
+        # Input buffers: one in inference, one waiting, one being preprocessed
+        self._free = queue.Queue()
+        for _ in range(3):
+            self._free.put(detector.new_input())
+        self._ready = queue.Queue(maxsize=1)
+        self._cond = threading.Condition()
+        self._result = None
+        self._stop = threading.Event()
+        self._threads = []
+        self.stages = {name: StageStats(name) for name in ("preprocess", "inference", "end_to_end")}
+        self.replaced = 0   # preprocessed frames superseded by a newer one before inference
+        self.gated = 0      # frames skipped by the gate (unchanged scene)
+        self.errors = 0
+
+    def start(self):
+        self._stop.clear()
+        for stage in self.stages.values():
+            stage.started_ns, stage.stopped_ns = time.monotonic_ns(), None
+        self._threads = [threading.Thread(target=self._preprocess, name="Preprocess", daemon=True),
+                         threading.Thread(target=self._inference, name="Inference", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    ##---------Stage section----------------##
+    def _preprocess(self):
+        stats = self.stages["preprocess"]
+        while not self._stop.is_set():
+            frame = self.reader.get(timeout=0.5)
+            if frame is None:
+                continue
+            if self.gate is not None and not self.gate.should_run(frame.array, frame.timestamp_ns):
+                self.gated += 1
+                self.reader.release()
+                continue
+            try:
+                buffer = self._free.get(timeout=0.5)  # all buffers busy: inference is the bottleneck
+            except queue.Empty:
+                continue
+            start = time.monotonic_ns()
+            try:
+                self.detector.preprocess(frame.array, buffer)
+            except Exception as e:
+                self.errors += 1
+                print(f"DetectionPipeline: preprocess error: {e}")
+                self._free.put(buffer)
+                continue
+            finally:
+                self.reader.release()  # the camera slot is free again once resized
+            stats.add(time.monotonic_ns() - start)
+            try:
+                _, _, stale = self._ready.get_nowait()  # inference is busy: keep only the newest
+                self._free.put(stale)
+                self.replaced += 1
+            except queue.Empty:
+                pass
+            self._ready.put((frame.seq, frame.timestamp_ns, buffer))  # only this thread adds
+
+    def _inference(self):
+        stats, end_to_end = self.stages["inference"], self.stages["end_to_end"]
+        while not self._stop.is_set():
+            try:
+                seq, timestamp_ns, buffer = self._ready.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            start = time.monotonic_ns()
+            try:
+                detections = self.detector.infer(buffer)
+            except Exception as e:
+                self.errors += 1
+                print(f"DetectionPipeline: inference error: {e}")
+                continue
+            finally:
+                self._free.put(buffer)
+            done = time.monotonic_ns()
+            stats.add(done - start)
+            end_to_end.add(done - timestamp_ns)
+            with self._cond:
+                self._result = Result(seq, timestamp_ns, detections, done - timestamp_ns)
+                self._cond.notify_all()
+    ##########################################
+
+    ##---------Result section---------------##
+    def latest(self):
+        """Newest Result, or None before the first inference"""
+        return self._result
+
+    def wait(self, after_seq=0, timeout=None):
+        """Block until a Result newer than after_seq exists; returns it, or None on timeout"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._stop.is_set() or
+                                (self._result is not None and self._result.seq > after_seq), timeout)
+            result = self._result
+        return result if result is not None and result.seq > after_seq else None
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        for stage in self.stages.values():
+            stage.stopped_ns = time.monotonic_ns()
+    ##########################################
+
+    def stats(self):
+        return {name: stage.summary() for name, stage in self.stages.items()}
+
+    def print_stats(self):
+        for name, s in self.stats().items():
+            busy = f"busy {s['busy_pct']:>5.1f}%" if name != "end_to_end" else " " * 11
+            print(f"{name:<11} {s['items']:>6} items {s['fps']:>6.1f} fps {busy} "
+                  f"latency {s['ms_mean']:>6.1f} ms (p95 {s['ms_p95']:.1f} ms)")
+        print(f"replaced before inference: {self.replaced}, skipped by the gate: {self.gated}, errors: {self.errors}")
@@ -0,0 +1,237 @@
+import os
+import time
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+MODES = ("none", "window", "mjpeg")
+
+
+class Display:
+    """
+    Debug display for the vision demos, chosen at run time.
+
+    none: nothing is rendered (headless robot, best frame rate)
+    window: local OpenCV window, 'q' or ESC quits
+    mjpeg: downscaled JPEG stream on http://host:port/ served from background
+           threads at a capped rate; nothing is encoded while no viewer is
+           connected
+
+    Callers ask wants_frame() before drawing overlays so the drawing work is
+    skipped whenever nobody would see it. Quitting is driven by SIGINT and
+    SIGTERM (Ctrl+C, kill, systemd stop) setting a flag that ends the loop,
+    not by waitKey.
+
+    Example usage:
+        >>> display = Display.from_env("Line Following")  # ROBOT_DISPLAY=none|window|mjpeg
+        >>> while display.running:
+        ...     frame = ...
+        ...     if display.wants_frame():
+        ...         image = frame.copy()
+        ...         cv2.putText(image, "debug", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        ...         display.show(image)
+        >>> display.close()
+    """
+
+    def __init__(self, name="Robot", mode="window", host="127.0.0.1", port=8080, max_fps=10, scale=0.5,
+                 quality=70, handle_signals=True):
+        """
+        :param name: Window title / stream name
+        :param mode: "none", "window" or "mjpeg"
+        :param host: MJPEG server address (default localhost only; use an SSH tunnel to view)
+        :param port: MJPEG server port
+        :param max_fps: Frame rate cap of the MJPEG stream
+        :param scale: Downscale factor of the MJPEG stream
+        :param quality: JPEG quality (0-100)
+        :param handle_signals: Quit on SIGINT/SIGTERM (main thread only)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown display mode: {mode} (use one of {MODES})")
+        self.name = name
+        self.mode = mode
+        self.max_fps = max_fps
+        self.scale = scale
+        self.quality = quality
+        self.key = -1               # last key pressed in window mode
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._pending = None        # downscaled frame waiting to be encoded
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._clients = 0
+        self._last_ns = 0
+        self._server = None
+        self._threads = []
+        # Statistics
+        self.shown = 0
+        self.encoded = 0
+        if handle_signals and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self._on_signal)
+            signal.signal(signal.SIGTERM, self._on_signal)
+        if mode == "mjpeg":
+            self._start_server(host, port)
+
+    @staticmethod
+    def mode_from_env():
+        """
+        Mode from the ROBOT_DISPLAY environment variable; defaults to a window
+        when a desktop is available ($DISPLAY set) and none otherwise.
+        """
+        mode = os.environ.get("ROBOT_DISPLAY") or ("window" if os.environ.get("DISPLAY") else "none")
+        return mode.lower()
+
+    @classmethod
+    def from_env(cls, name="Robot", **kwargs):
+        """Display in the mode given by mode_from_env(); ROBOT_DISPLAY_PORT sets the MJPEG port"""
+        port = int(os.environ.get("ROBOT_DISPLAY_PORT", kwargs.pop("port", 8080)))
+        return cls(name, mode=cls.mode_from_env(), port=port, **kwargs)
+
+    ##---------Control section--------------##
+    def _on_signal(self, signum, frame):
+        if self._stop.is_set() and signum == signal.SIGINT:
+            raise KeyboardInterrupt  # second Ctrl+C: the loop is not exiting, interrupt it
+        print(f"\nDisplay: received signal {signum}, stopping")
+        self._stop.set()
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def stop(self):
+        """Ask the main loop to finish (same as a quit key or signal)"""
+        self._stop.set()
+
+    def sleep(self, seconds):
+        """Sleep that ends early on quit; returns running"""
+        return not self._stop.wait(seconds)
+    ##########################################
+
+    ##---------Frame section----------------##
+    def wants_frame(self):
+        """True if a frame shown now would be seen; draw overlays only then"""
+        if self.mode == "window":
+            return True
+        if self.mode == "mjpeg":
+            return self._clients > 0 and time.monotonic_ns() - self._last_ns >= 1e9 / self.max_fps
+        return False
+
+    def show(self, image):
+        """Show a BGR image (the caller keeps ownership; it is not modified)"""
+        if self.mode == "window":
+            cv2.imshow(self.name, image)
+            self.key = cv2.waitKey(1) & 0xFF  # keeps the window responsive
+            if self.key in (ord('q'), 27):
+                self._stop.set()
+            self.shown += 1
+        elif self.mode == "mjpeg" and self.wants_frame():
+            self._last_ns = time.monotonic_ns()
+            if self.scale != 1:
+                small = cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            else:
+                small = image.copy()
+            with self._cond:
+                self._pending = small
+                self._cond.notify_all()
+            self.shown += 1
+
+    def close(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self.mode == "window":
+            cv2.destroyAllWindows()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join(timeout=1)
+
+    def stats(self):
+        return {"mode": self.mode, "shown": self.shown, "encoded": self.encoded, "clients": self._clients}
+    ##########################################
+
+    ##---------MJPEG section----------------##
+    def _start_server(self, host, port):
+        display = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/stream.mjpg"):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.end_headers()
+                display._stream(self.wfile)
+
+            def log_message(self, format, *args):
+                pass  # no per-request logging on the console
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._threads = [threading.Thread(target=self._server.serve_forever, name="DisplayServer", daemon=True),
+                         threading.Thread(target=self._encode, name="DisplayEncoder", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        print(f"Display: MJPEG stream on http://{host}:{port}/")
+
+    def _encode(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while self.running:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self.running)
+                image, self._pending = self._pending, None
+            if image is None:
+                continue
+            ok, jpeg = cv2.imencode(".jpg", image, params)
+            if not ok:
+                continue
+            with self._cond:
+                self._jpeg = jpeg.tobytes()
+                self._jpeg_seq += 1
+                self._cond.notify_all()
+            self.encoded += 1
+
+    def _stream(self, wfile):
+        with self._cond:
+            self._clients += 1
+        seq = 0
+        try:
+            while self.running:
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._jpeg_seq > seq or not self.running, timeout=1):
+                        continue
+                    jpeg, seq = self._jpeg, self._jpeg_seq
+                if jpeg is None:
+                    continue
+                wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                wfile.write(jpeg)
+                wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # viewer closed the page
+        finally:
+            with self._cond:
+                self._clients -= 1
+    ##########################################
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    display = Display.from_env("Display demo")
+    print(f"Display mode: {display.mode} (Ctrl+C to quit)")
+    t = 0
+    while display.running:
+        if display.wants_frame():
+            image = np.zeros((480, 640, 3), dtype=np.uint8)
+            cv2.circle(image, (320 + int(200 * np.sin(t)), 240), 40, (0, 0, 255), -1)
+            display.show(image)
+        t += 0.05
+        display.sleep(1 / 30)
+    display.close()
+    print(display.stats())
@@ -0,0 +1,110 @@
+import time
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+# A frame handed to the consumer; array stays valid until its next wait_newer_than()
+ExchangedFrame = namedtuple("ExchangedFrame", ["array", "seq", "timestamp_ns"])
+
+
+class FrameExchange:
+    """
+    Sequence-numbered frame handoff between one producer and one consumer.
+
+    The producer fills the back buffer outside any lock and publish() swaps
+    it with the ready buffer; the consumer's wait_newer_than() swaps the
+    ready buffer with its front buffer. Only buffer references change hands
+    under the lock, so no frame is ever copied and the producer never waits
+    for the consumer. Three buffers are used so the frame the consumer is
+    working on is never the one being overwritten.
+    """
+
+    def __init__(self, shape, dtype=np.uint8):
+        """
+        :param shape: NumPy shape of one frame, e.g. (480, 640, 3)
+        :param dtype: NumPy dtype of one frame (default uint8)
+        """
+        self._back = np.zeros(shape, dtype)
+        self._ready = np.zeros(shape, dtype)
+        self._front = np.zeros(shape, dtype)
+        self._ready_seq = 0
+        self._ready_timestamp_ns = 0
+        self._cond = threading.Condition()
+        self.seq = 0       # sequence number of the newest published frame
+        self.skipped = 0   # frames published but never seen by the consumer
+        self.closed = False
+
+    ##---------Producer section-------------##
+    def back(self):
+        """The buffer to fill with the next frame (producer only)"""
+        return self._back
+
+    def publish(self, timestamp_ns=None):
+        """Publish the filled back buffer as the newest frame; returns its seq"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        with self._cond:
+            if self._ready_seq:
+                self.skipped += 1  # previous frame was never taken
+            self.seq += 1
+            self._back, self._ready = self._ready, self._back
+            self._ready_seq = self.seq
+            self._ready_timestamp_ns = timestamp_ns
+            self._cond.notify_all()
+        return self.seq
+
+    def write(self, array, timestamp_ns=None):
+        """Copy an array into the back buffer and publish it"""
+        np.copyto(self._back, array)
+        return self.publish(timestamp_ns)
+    ##########################################
+
+    ##---------Consumer section-------------##
+    def wait_newer_than(self, seq, timeout=None):
+        """
+        Block until a frame newer than seq is published and take it.
+        Returns an ExchangedFrame, or None on timeout or after close().
+        The consumer owns the returned array (it may draw on it) until its
+        next call.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.closed or (self._ready_seq and self._ready_seq > seq),
+                                       timeout):
+                return None
+            if not self._ready_seq or self._ready_seq <= seq:
+                return None
+            self._front, self._ready = self._ready, self._front
+            frame = ExchangedFrame(self._front, self._ready_seq, self._ready_timestamp_ns)
+            self._ready_seq = 0
+            return frame
+
+    def close(self):
+        """Wake up a waiting consumer; wait_newer_than() returns None from now on"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+    ##########################################
+
+
+if __name__ == "__main__":
+    exchange = FrameExchange((480, 640, 3))
+
+    def producer():
+        for value in range(100):
+            exchange.back()[...] = value
+            exchange.publish()
+            time.sleep(0.002)
+        exchange.close()
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    seq, received = 0, 0
+    while True:
+        frame = exchange.wait_newer_than(seq, timeout=1)
+        if frame is None:
+            break
+        seq = frame.seq
+        received += 1
+        time.sleep(0.005)  # slower consumer: older frames are skipped, never queued
+    thread.join()
+    print(f"published {exchange.seq}, received {received}, skipped {exchange.skipped}")
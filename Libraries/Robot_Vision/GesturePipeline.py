@@ -0,0 +1,307 @@
+import time
+import threading
+
+import cv2
+import numpy as np
+
+from DetectionPipeline import StageStats
+from TFLiteDetector import resize_rgb
+
+# Landmark pairs drawn as the hand skeleton (MediaPipe HAND_CONNECTIONS)
+HAND_CONNECTIONS = ((0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8), (5, 9), (9, 10), (10, 11),
+                    (11, 12), (9, 13), (13, 14), (14, 15), (15, 16), (13, 17), (0, 17), (17, 18), (18, 19), (19, 20))
+MIDDLE_MCP = 9          # landmark used for steering (base of the middle finger)
+
+
+class Hand:
+    """21 hand landmarks (x, y normalized to the frame, z relative depth) at one capture time"""
+    __slots__ = ("points", "seq", "timestamp_ns", "interpolated")
+
+    def __init__(self, points, seq, timestamp_ns, interpolated=False):
+        self.points = points              # (21, 3) float array
+        self.seq = seq                    # capture seq of the newest inference result it comes from
+        self.timestamp_ns = timestamp_ns
+        self.interpolated = interpolated  # True when predicted between/after inference results
+
+    def __repr__(self):
+        x, y = self.points[MIDDLE_MCP, :2]
+        return f"Hand(seq={self.seq}, landmark9=({x:.3f}, {y:.3f}), interpolated={self.interpolated})"
+
+
+def mediapipe_hands(max_num_hands=1, min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                    model_complexity=0):
+    """Landmarker callable(rgb) -> (21, 3) landmarks of the first hand, or None, from MediaPipe Hands"""
+    import mediapipe as mp
+    hands = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=max_num_hands,
+                                     model_complexity=model_complexity,
+                                     min_detection_confidence=min_detection_confidence,
+                                     min_tracking_confidence=min_tracking_confidence)
+
+    def landmarks(rgb):
+        results = hands.process(rgb)
+        if not results.multi_hand_landmarks:
+            return None
+        return np.array([(p.x, p.y, p.z) for p in results.multi_hand_landmarks[0].landmark], dtype=np.float64)
+    return landmarks
+
+
+class GesturePipeline:
+    """
+    Hand landmarks from a worker thread, predicted at any time.
+
+    The worker takes the newest frame from its reader, resizes it and
+    converts it to RGB in one step into a reused buffer (no full-size color
+    conversion), releases the camera slot and runs the landmarker. Frames
+    that arrive while it is busy are skipped. Callers never wait for
+    inference: predict() returns the landmarks at a given time, linearly
+    interpolated between the last two results (or extrapolated past the
+    newest one, for at most max_extrapolation_s), so a control loop can run
+    at its own steady rate. With a MotionGate, frames of an unchanged scene
+    are not inferred and the newest landmarks stay current.
+
+    Example usage:
+        >>> pipeline = GesturePipeline(camera.reader("gesture"), size=(320, 240)).start()
+        >>> hand = pipeline.predict(time.monotonic_ns())
+        >>> if hand is not None:
+        ...     print(hand.points[9])
+        >>> pipeline.stop()
+    """
+
+    def __init__(self, reader, size=(320, 240), order="BGR", landmarker=None, max_extrapolation_s=0.2,
+                 lost_s=0.5, gate=None):
+        """
+        :param reader: CameraService FrameReader the frames come from
+        :param size: (width, height) the frames are resized to before inference
+        :param order: Channel order of the frames, "BGR" (Picamera2 RGB888/XRGB8888) or "RGB"
+        :param landmarker: callable(rgb) -> (21, 3) landmarks or None (default: MediaPipe Hands)
+        :param max_extrapolation_s: Longest prediction past the newest result
+        :param lost_s: Age of the newest result after which no hand is reported
+        :param gate: MotionGate deciding which frames are worth inferring (None: every frame)
+        """
+        self.reader = reader
+        self.width, self.height = size
+        self.order = order
+        self.landmarker = mediapipe_hands() if landmarker is None else landmarker
+        self.max_extrapolation_ns = int(max_extrapolation_s * 1e9)
+        self.lost_ns = int(lost_s * 1e9)
+        self.gate = gate
+        self._rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._resized = {}
+        self._lock = threading.Lock()
+        self._previous = None    # the two newest results, while a hand stays in view
+        self._latest = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.stages = {name: StageStats(name) for name in ("inference", "end_to_end")}
+        self.frames = 0
+        self.gated = 0
+        self.errors = 0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="Gesture", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        inference, end_to_end = self.stages["inference"], self.stages["end_to_end"]
+        while not self._stop.is_set():
+            frame = self.reader.get(timeout=0.5)
+            if frame is None:
+                continue
+            if self.gate is not None and not self.gate.should_run(frame.array, frame.timestamp_ns):
+                self.reader.release()
+                self.gated += 1
+                with self._lock:
+                    if self._latest is not None:
+                        # Nothing changed: the last landmarks hold, still (no motion to extrapolate)
+                        self._previous = None
+                        self._latest = Hand(self._latest.points, self._latest.seq, frame.timestamp_ns)
+                continue
+            start = time.monotonic_ns()
+            try:
+                resize_rgb(frame.array, self._rgb, self.order, self._resized)
+            finally:
+                self.reader.release()  # the camera slot is free again once resized
+            try:
+                points = self.landmarker(self._rgb)
+            except Exception as e:
+                self.errors += 1
+                print(f"GesturePipeline: inference error: {e}")
+                continue
+            done = time.monotonic_ns()
+            inference.add(done - start)
+            end_to_end.add(done - frame.timestamp_ns)
+            self.frames += 1
+            with self._lock:
+                if points is None:
+                    self._previous = self._latest = None
+                else:
+                    self._previous = self._latest
+                    self._latest = Hand(points, frame.seq, frame.timestamp_ns)
+
+    def latest(self):
+        """Newest inference result with a hand, or None"""
+        return self._latest
+
+    def predict(self, timestamp_ns=None):
+        """Landmarks at timestamp_ns (default now) from the last two results, or None when no hand is in view"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        with self._lock:
+            previous, latest = self._previous, self._latest
+        if latest is None or timestamp_ns - latest.timestamp_ns > self.lost_ns:
+            return None
+        if previous is None or latest.timestamp_ns <= previous.timestamp_ns or timestamp_ns == latest.timestamp_ns:
+            return latest
+        # Past the newest result: extrapolate along the last motion, for a bounded time
+        target = min(timestamp_ns, latest.timestamp_ns + self.max_extrapolation_ns)
+        t = (target - previous.timestamp_ns) / (latest.timestamp_ns - previous.timestamp_ns)
+        points = previous.points + (latest.points - previous.points) * t
+        return Hand(points, latest.seq, timestamp_ns, interpolated=True)
+
+    def draw(self, image, hand):
+        """Overlay the hand skeleton on an image of any size (for display only)"""
+        if hand is None:
+            return image
+        height, width = image.shape[:2]
+        points = (hand.points[:, :2] * (width, height)).astype(np.int32)
+        for a, b in HAND_CONNECTIONS:
+            cv2.line(image, tuple(points[a]), tuple(points[b]), (255, 255, 255), 2)
+        for x, y in points:
+            cv2.circle(image, (x, y), 3, (0, 0, 255), -1)
+        return image
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        for stage in self.stages.values():
+            stage.stopped_ns = time.monotonic_ns()
+
+    def stats(self):
+        return {name: stage.summary() for name, stage in self.stages.items()}
+
+
+class GestureSteering:
+    """
+    Landmark 9 position to a steering command, smoothed and with hysteresis.
+
+    The landmark is low-pass filtered; the left/right and near/far zone
+    borders move outwards by hysteresis once a zone is entered, so a hand
+    resting on a border does not flip the command every frame. A new command
+    is only reported after it has held for hold updates.
+
+    Commands: "left", "right", "forward", "stop".
+
+    Example usage:
+        >>> steering = GestureSteering()
+        >>> command, changed = steering.update(pipeline.predict())
+        >>> if changed:
+        ...     print(command)
+    """
+
+    def __init__(self, left=0.7, right=0.3, near=0.4, hysteresis=0.05, alpha=0.5, hold=3):
+        """
+        :param left: x above which the hand means turn left (the camera image is mirrored)
+        :param right: x below which the hand means turn right
+        :param near: y below which the hand is close to the camera (stop)
+        :param hysteresis: Zone border shift once a zone is entered
+        :param alpha: Smoothing of the landmark (1: none)
+        :param hold: Consecutive updates a new command must hold before it is reported
+        """
+        self.left = left
+        self.right = right
+        self.near = near
+        self.hysteresis = hysteresis
+        self.alpha = alpha
+        self.hold = hold
+        self.reset()
+
+    def reset(self):
+        self.command = "stop"
+        self._position = None
+        self._candidate = None
+        self._count = 0
+        self._zone_x = "center"
+        self._near = False
+
+    def _classify(self, x, y):
+        h = self.hysteresis
+        if self._zone_x == "left":
+            self._zone_x = "left" if x > self.left - h else ("right" if x < self.right else "center")
+        elif self._zone_x == "right":
+            self._zone_x = "right" if x < self.right + h else ("left" if x > self.left else "center")
+        else:
+            self._zone_x = "left" if x > self.left else ("right" if x < self.right else "center")
+        self._near = y < self.near + h if self._near else y < self.near
+        if self._zone_x != "center":
+            return self._zone_x
+        return "stop" if self._near else "forward"
+
+    def update(self, hand):
+        """(command, changed) for the latest Hand (None: no hand in view, stop at once)"""
+        if hand is None:
+            self._position = None
+            self._candidate, self._count = None, 0
+            changed = self.command != "stop"
+            self.command = "stop"
+            return self.command, changed
+        position = hand.points[MIDDLE_MCP, :2]
+        if self._position is None:
+            self._position = position.copy()
+        else:
+            self._position += self.alpha * (position - self._position)
+        command = self._classify(*self._position)
+        if command == self.command:
+            self._candidate, self._count = None, 0
+            return self.command, False
+        if command != self._candidate:
+            self._candidate, self._count = command, 0
+        self._count += 1
+        if self._count < self.hold:
+            return self.command, False
+        self.command = command
+        self._candidate, self._count = None, 0
+        return self.command, True
+
+
+if __name__ == "__main__":
+    from collections import namedtuple
+
+    # A synthetic hand moving across the view, "seen" by a slow fake landmarker
+    Captured = namedtuple("Captured", ["array", "seq", "timestamp_ns"])
+
+    class FakeReader:
+        def __init__(self):
+            self.seq = 0
+
+        def get(self, timeout=None):
+            time.sleep(1 / 30)
+            self.seq += 1
+            return Captured(np.zeros((480, 640, 4), np.uint8), self.seq, time.monotonic_ns())
+
+        def release(self):
+            pass
+
+    start_ns = time.monotonic_ns()
+
+    def landmarker(rgb):
+        time.sleep(0.08)  # ~12 inferences per second
+        t = (time.monotonic_ns() - start_ns) / 1e9
+        points = np.zeros((21, 3))
+        points[:, 0], points[:, 1] = 0.5 + 0.4 * np.sin(t), 0.55
+        return points
+
+    pipeline = GesturePipeline(FakeReader(), landmarker=landmarker).start()
+    steering = GestureSteering()
+    changes, steps = [], 0
+    while time.monotonic_ns() - start_ns < 3e9:
+        command, changed = steering.update(pipeline.predict())
+        steps += 1
+        if changed:
+            changes.append(command)
+        time.sleep(1 / 50)
+    pipeline.stop()
+    print(f"{steps} control steps, commands sent: {changes}")
+    print(pipeline.stats())
@@ -0,0 +1,227 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class LineEstimate:
+    """
+    Line geometry fitted through the band centers.
+
+    offset: line position at the bottom band, -1 (left edge) .. 1 (right edge)
+    heading: line angle in radians relative to straight ahead, positive leaning right
+    curvature: 1/pixels, positive bending right
+    """
+    __slots__ = ("offset", "heading", "curvature", "points", "bands", "timestamp_ns")
+
+    def __init__(self, offset, heading, curvature, points, bands, timestamp_ns):
+        self.offset = offset
+        self.heading = heading
+        self.curvature = curvature
+        self.points = points          # [(x, y), ...] band centers in frame pixels, bottom first
+        self.bands = bands            # bands that saw the line
+        self.timestamp_ns = timestamp_ns
+
+    def __repr__(self):
+        return (f"LineEstimate(offset={self.offset:+.3f}, heading={np.degrees(self.heading):+.1f} deg, "
+                f"curvature={self.curvature:+.5f}, bands={self.bands})")
+
+
+class LineDetector:
+    """
+    Scanline line detector for line following.
+
+    Instead of thresholding the whole frame, a few thin horizontal bands
+    spread over the bottom region of the frame are sampled. For every band a
+    column histogram (dark pixels per column) is computed in one vectorized
+    pass; the line center is the weighted centroid around the histogram peak.
+    A quadratic fitted through the band centers gives the offset at the
+    bottom band, the heading and the curvature of the line ahead.
+
+    Example usage:
+        >>> detector = LineDetector(bands=5, threshold=118)
+        >>> line = detector.detect(frame)
+        >>> if line is not None:
+        ...     print(line.offset, line.heading, line.curvature)
+    """
+
+    def __init__(self, bands=5, band_height=4, roi=(0.5, 0.95), threshold=118, dark_line=True,
+                 line_width=40, min_pixels=None, min_bands=2):
+        """
+        :param bands: Number of horizontal bands sampled in the ROI
+        :param band_height: Rows per band
+        :param roi: Vertical extent of the bands as fractions of the frame height (top, bottom)
+        :param threshold: Gray level separating line and floor
+        :param dark_line: True for a dark line on a light floor, False for the opposite
+        :param line_width: Expected line width in pixels (histogram smoothing and centroid window)
+        :param min_pixels: Line pixels a band needs to count (default: a quarter of line_width * band_height)
+        :param min_bands: Bands that must see the line for an estimate
+        """
+        if bands < 2:
+            raise ValueError("At least 2 bands are needed")
+        self.bands = bands
+        self.band_height = band_height
+        self.roi = roi
+        self.threshold = threshold
+        self.dark_line = dark_line
+        self.line_width = line_width
+        self.min_pixels = min_pixels if min_pixels is not None else max(1, line_width * band_height // 4)
+        self.min_bands = min_bands
+        self._shape = None
+        self.last = None          # last LineEstimate
+        # Statistics
+        self.frames = 0
+        self.found = 0
+        self.detect_ns = 0
+
+    def _layout(self, height, width):
+        """Row indices of every band (bottom band first) and the band center rows"""
+        top, bottom = int(self.roi[0] * height), int(self.roi[1] * height) - self.band_height
+        starts = np.linspace(bottom, top, self.bands).astype(np.int32)
+        self._rows = (starts[:, np.newaxis] + np.arange(self.band_height)).ravel()
+        self._band_y = starts + self.band_height / 2.0
+        self._columns = np.arange(width, dtype=np.float32)
+        self._smooth = max(1, self.line_width // 2)
+        self._shape = (height, width)
+
+    def histograms(self, frame):
+        """Line pixels per column for every band, shape (bands, width)"""
+        height, width = frame.shape[:2]
+        if self._shape != (height, width):
+            self._layout(height, width)
+        rows = frame[self._rows]  # only the band rows are touched
+        if rows.ndim == 3:
+            rows = cv2.cvtColor(rows, cv2.COLOR_BGRA2GRAY if rows.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        line = rows < self.threshold if self.dark_line else rows > self.threshold
+        return line.reshape(self.bands, self.band_height, width).sum(axis=1, dtype=np.int32)
+
+    def centers(self, hist):
+        """Line center column of every band (NaN where the band does not see the line)"""
+        width = hist.shape[1]
+        # Box-smoothed histogram so the peak lands on the line, not on a noise column
+        csum = np.cumsum(hist, axis=1, dtype=np.float32)
+        k = self._smooth
+        smooth = np.empty_like(csum)
+        smooth[:, :k] = csum[:, :k]
+        smooth[:, k:] = csum[:, k:] - csum[:, :-k]
+        peak = np.argmax(smooth, axis=1) - (k - 1) / 2.0
+        window = np.abs(self._columns[np.newaxis, :width] - peak[:, np.newaxis]) <= self.line_width
+        weights = np.where(window, hist, 0).astype(np.float32)
+        mass = weights.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            centers = (weights @ self._columns[:width]) / mass
+        centers[mass < self.min_pixels] = np.nan
+        return centers
+
+    def detect(self, frame, timestamp_ns=None):
+        """Line estimate for a BGR/XBGR or grayscale frame, or None if the line is not visible"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        start = time.perf_counter_ns()
+        self.frames += 1
+        centers = self.centers(self.histograms(frame))
+        valid = ~np.isnan(centers)
+        count = int(valid.sum())
+        estimate = None
+        if count >= self.min_bands:
+            height, width = self._shape
+            xs = centers[valid]
+            ahead = self._band_y[0] - self._band_y[valid]  # distance ahead of the bottom band
+            coeffs = np.polyfit(ahead, xs, 2 if count >= 3 else 1)
+            c, b, a = (coeffs if count >= 3 else np.concatenate(([0.0], coeffs)))
+            offset = (a - width / 2.0) / (width / 2.0)
+            heading = float(np.arctan(b))
+            curvature = float(2 * c / (1 + b * b) ** 1.5)
+            points = [(float(x), float(y)) for x, y in zip(xs, self._band_y[valid])]
+            estimate = LineEstimate(float(offset), heading, curvature, points, count, timestamp_ns)
+            self.found += 1
+        self.last = estimate
+        self.detect_ns += time.perf_counter_ns() - start
+        return estimate
+
+    def draw(self, image, estimate=None):
+        """Overlay the bands and the fitted centers (for display only), scaled to the image size"""
+        estimate = self.last if estimate is None else estimate
+        if self._shape is None:
+            return image
+        scale = image.shape[1] / self._shape[1]
+        for y in self._band_y:
+            cv2.line(image, (0, int(y * scale)), (image.shape[1] - 1, int(y * scale)), (80, 80, 80), 1)
+        if estimate is not None:
+            for x, y in estimate.points:
+                cv2.circle(image, (int(x * scale), int(y * scale)), 5, (0, 0, 255), -1)
+            cv2.putText(image, f"offset {estimate.offset:+.2f} heading {np.degrees(estimate.heading):+.0f} deg",
+                        (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+        return image
+
+    def stats(self):
+        frames = max(1, self.frames)
+        return {
+            "frames": self.frames,
+            "found_pct": 100.0 * self.found / frames,
+            "detect_ms_mean": self.detect_ns / frames / 1e6,
+        }
+
+
+class PDSteering:
+    """
+    Proportional-derivative steering on a LineEstimate.
+
+    The error is the line offset plus a heading lookahead term; the output is
+    a turn value for RobotController.move() (negative turns right), and the
+    forward speed is reduced on sharp curves.
+
+    Example usage:
+        >>> steering = PDSteering(kp=40, kd=6, k_heading=20)
+        >>> speed, turn = steering.update(line)
+        >>> Motor.move(speed=speed, turn=turn)
+    """
+
+    def __init__(self, kp=40.0, kd=6.0, k_heading=20.0, base_speed=40, max_turn=60, curve_slowdown=200.0):
+        """
+        :param kp: Turn per unit offset (offset is -1..1 across the frame)
+        :param kd: Turn per unit offset change per second
+        :param k_heading: Turn per radian of line heading
+        :param base_speed: Forward speed on a straight line (0-100)
+        :param max_turn: Turn output limit
+        :param curve_slowdown: Speed reduction factor per unit curvature (1/pixels)
+        """
+        self.kp = kp
+        self.kd = kd
+        self.k_heading = k_heading
+        self.base_speed = base_speed
+        self.max_turn = max_turn
+        self.curve_slowdown = curve_slowdown
+        self.reset()
+
+    def reset(self):
+        self._error = None
+        self._timestamp_ns = None
+        self._derivative = 0.0
+
+    def update(self, estimate):
+        """(speed, turn) for the latest estimate"""
+        error = estimate.offset
+        if self._error is not None and estimate.timestamp_ns > self._timestamp_ns:
+            dt = (estimate.timestamp_ns - self._timestamp_ns) / 1e9
+            # Light low-pass on the derivative: frame-to-frame offsets are noisy
+            self._derivative = 0.5 * self._derivative + 0.5 * (error - self._error) / dt
+        self._error, self._timestamp_ns = error, estimate.timestamp_ns
+        correction = self.kp * error + self.kd * self._derivative + self.k_heading * estimate.heading
+        turn = -max(-self.max_turn, min(self.max_turn, correction))  # line to the right -> turn right (negative)
+        speed = self.base_speed / (1.0 + self.curve_slowdown * abs(estimate.curvature))
+        return int(round(speed)), int(round(turn))
+
+
+if __name__ == "__main__":
+    # Synthetic curved dark line on a light floor
+    height, width = 480, 640
+    detector = LineDetector()
+    steering = PDSteering()
+    for i, shift in enumerate(range(-120, 121, 40)):
+        frame = np.full((height, width, 3), 200, dtype=np.uint8)
+        ys = np.arange(height // 3, height)
+        xs = width / 2 + shift + 0.0015 * (height - ys) ** 2
+        cv2.polylines(frame, [np.stack([xs, ys], axis=1).astype(np.int32)], False, (20, 20, 20), 30)
+        line = detector.detect(frame, timestamp_ns=int(i * 1e9 / 60))
+        print(line, steering.update(line))
+    print(detector.stats())
@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+BACKGROUND = 0
+
+
+class MaskRenderer:
+    """
+    Renders segmentation label maps as RGBA overlays.
+
+    The label map is resized once with nearest-neighbour interpolation (class
+    ids must not be blended) into a reused buffer, and the overlay is a single
+    lookup into a precomputed 256-entry RGBA palette, written in place into
+    one of two reused output buffers. Two buffers alternate so the overlay
+    handed to the preview last frame is not overwritten while it is still
+    being shown.
+
+    cutout() renders the other kind of overlay the examples use: a fixed
+    image shown only where the label map has some classes. The image colour
+    channels are copied into the output buffers once; per frame only the
+    alpha channel is looked up.
+
+    Example usage:
+        >>> renderer = MaskRenderer(registry.palette("colours.txt"), size=(640, 480), alpha=150)
+        >>> labels = np.argmax(output, axis=-1)
+        >>> picam2.set_overlay(renderer.render(labels))
+        >>> print(renderer.classes())
+    """
+
+    def __init__(self, palette, size=(640, 480), alpha=None):
+        """
+        :param palette: One colour per class id, rows of "r g b" or "r g b a"
+        :param size: Overlay size (width, height)
+        :param alpha: Alpha of every non-background class (default: the palette's, or opaque)
+        """
+        palette = np.asarray(palette, dtype=np.uint8)
+        if palette.ndim != 2 or palette.shape[1] not in (3, 4) or len(palette) > 256:
+            raise ValueError("Palette must have up to 256 rows of 3 or 4 values")
+        # Unknown class ids (past the palette) stay transparent
+        self.palette = np.zeros((256, 4), dtype=np.uint8)
+        self.palette[:len(palette), :palette.shape[1]] = palette
+        if palette.shape[1] == 3:
+            self.palette[:len(palette), 3] = 255
+        if alpha is not None:
+            self.palette[:len(palette), 3] = alpha
+        self.palette[BACKGROUND] = 0
+        self.size = size
+        width, height = size
+        self._labels = np.zeros((height, width), dtype=np.uint8)
+        self._small = None
+        self._buffers = [np.zeros((height, width, 4), dtype=np.uint8) for _ in range(2)]
+        self._next = 0
+        self._alpha = np.zeros((height, width), dtype=np.uint8)
+        self._cutout_image = None
+
+    def _output(self):
+        out = self._buffers[self._next]
+        self._next ^= 1
+        return out
+
+    def resize(self, label_map):
+        """Label map (any integer dtype, model resolution) -> uint8 class ids at the overlay size"""
+        if self._small is None or self._small.shape != label_map.shape:
+            self._small = np.empty(label_map.shape, dtype=np.uint8)
+        np.copyto(self._small, label_map, casting="unsafe")
+        cv2.resize(self._small, self.size, dst=self._labels, interpolation=cv2.INTER_NEAREST)
+        return self._labels
+
+    def render(self, label_map):
+        """RGBA overlay of a label map: palette colour per class, background transparent"""
+        labels = self.resize(label_map)
+        out = self._output()
+        # Palette rows as uint32 make the lookup one contiguous take
+        np.take(self.palette.view(np.uint32).ravel(), labels, out=out.view(np.uint32)[..., 0], mode="clip")
+        return out
+
+    def cutout(self, label_map, image, classes=(BACKGROUND,)):
+        """
+        RGBA overlay showing image (RGB, overlay size) where the label map has
+        one of classes and transparent elsewhere.
+        """
+        if image is not self._cutout_image:
+            for buffer in self._buffers:
+                buffer[..., :3] = image
+            self._cutout_image = image
+        labels = self.resize(label_map)
+        lut = np.zeros(256, dtype=np.uint8)
+        lut[list(classes)] = 255
+        cv2.LUT(labels, lut, dst=self._alpha)
+        out = self._output()
+        out[..., 3] = self._alpha
+        return out
+
+    def classes(self, label_map=None):
+        """Class ids present (background excluded) in a label map, or in the last one rendered"""
+        labels = self._small if label_map is None else label_map
+        if labels is None:
+            return []
+        counts = np.bincount(labels.ravel(), minlength=1)
+        return [int(i) for i in np.flatnonzero(counts) if i != BACKGROUND]
+
+    def mask(self, class_id):
+        """0/255 mask of one class in the last label map, at the overlay size"""
+        return np.where(self._labels == class_id, np.uint8(255), np.uint8(0))
+
+
+if __name__ == "__main__":
+    import time
+
+    palette = np.array([[0, 0, 0, 255], [128, 0, 0, 255], [0, 128, 0, 255], [128, 128, 0, 255]])
+    renderer = MaskRenderer(palette, size=(640, 480), alpha=150)
+    yy, xx = np.mgrid[:257, :257]
+    label_map = ((xx // 86) + (yy > 128)).astype(np.int64)
+    start = time.perf_counter()
+    for _ in range(100):
+        overlay = renderer.render(label_map)
+    print(f"render: {(time.perf_counter() - start) * 10:.2f} ms per frame, classes {renderer.classes()}")
+    print(overlay.shape, overlay[0, 0], overlay[-1, -1], renderer.mask(1).sum() // 255)
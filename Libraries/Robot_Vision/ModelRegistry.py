@@ -0,0 +1,157 @@
+import threading
+
+import cv2
+import numpy as np
+
+from TFLiteDetector import load_interpreter, load_labels, quantization, input_lut, dequantize
+
+
+class Model:
+    """
+    One loaded TFLite model: tensor details and preprocessing parameters,
+    read once, plus a ready (allocated) interpreter per thread.
+
+    TFLite memory-maps the model file, so every interpreter of the same model
+    shares the weights in the page cache; only the tensor arena is per thread.
+
+    Quantized (uint8/int8) models are fed uint8 pixels directly, or through a
+    256-entry lookup table that folds the mean/std normalization into the
+    input quantization; nothing is converted to float on the way in. Outputs
+    stay quantized until dequantize() is called on the values actually used.
+    """
+
+    def __init__(self, path, num_threads=4, xnnpack=True):
+        self.path = path
+        self.num_threads = num_threads
+        self.xnnpack = xnnpack
+        self._local = threading.local()
+        interpreter = self.interpreter()  # also validates the model up front
+        self.input_details = interpreter.get_input_details()
+        self.output_details = interpreter.get_output_details()
+        details = self.input_details[0]
+        self.input_index = details["index"]
+        self.height, self.width = int(details["shape"][1]), int(details["shape"][2])
+        self.input_dtype = details["dtype"]
+        self.floating = self.input_dtype == np.float32
+        self.input_quantization = quantization(details)
+        self.output_indices = [d["index"] for d in self.output_details]
+        self.output_quantization = [quantization(d) for d in self.output_details]
+        self.output_shape = tuple(int(v) for v in self.output_details[0]["shape"])
+        self._luts = {}
+
+    @property
+    def input_size(self):
+        """(width, height) for cv2.resize"""
+        return (self.width, self.height)
+
+    def interpreter(self):
+        """This thread's interpreter, created and allocated on first use"""
+        interpreter = getattr(self._local, "interpreter", None)
+        if interpreter is None:
+            interpreter = load_interpreter(self.path, self.num_threads, self.xnnpack)
+            interpreter.allocate_tensors()
+            self._local.interpreter = interpreter
+        return interpreter
+
+    def set_input(self, picture, mean=0.0, std=1.0):
+        """
+        Write a model-sized uint8 image into this thread's input tensor; float
+        models get (picture - mean) / std, quantized models the same values
+        in their input quantization.
+        """
+        interpreter = self.interpreter()
+        # Not kept across invoke(): it refuses to run while a view of its buffers exists
+        tensor = interpreter.tensor(self.input_index)()[0]
+        if self.floating:
+            np.subtract(picture, mean, out=tensor, casting="unsafe")
+            if std != 1.0:
+                np.multiply(tensor, 1.0 / std, out=tensor)
+        else:
+            key = (mean, std)
+            if key not in self._luts:
+                self._luts[key] = input_lut(self.input_details[0], mean, std)
+            lut = self._luts[key]
+            if lut is None:
+                np.copyto(tensor, picture)
+            else:
+                cv2.LUT(picture, lut, dst=tensor)
+        del tensor
+        return interpreter
+
+    def run(self, picture, mean=0.0, std=1.0):
+        """set_input() and invoke(); returns this thread's interpreter for get_tensor()"""
+        interpreter = self.set_input(picture, mean, std)
+        interpreter.invoke()
+        return interpreter
+
+    def output(self, i=0):
+        """Batch item 0 of output tensor i of this thread's last run (a copy, raw values)"""
+        return self.interpreter().get_tensor(self.output_indices[i])[0]
+
+    def dequantize(self, i, values):
+        """Real values of some raw values of output tensor i (unchanged for float outputs)"""
+        return dequantize(values, self.output_quantization[i])
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of models, label files and colour palettes.
+
+    Everything is loaded on first request and reused afterwards, so the
+    per-frame inference functions of the examples only pay for the model
+    itself.
+
+    Example usage:
+        >>> model = registry.model("mobilenet_v2.tflite")
+        >>> labels = registry.labels("coco_labels.txt")
+        >>> interpreter = model.run(cv2.resize(rgb, model.input_size), mean=127.5, std=127.5)
+        >>> boxes = model.output(0)
+    """
+
+    def __init__(self, num_threads=4, xnnpack=True):
+        """
+        :param num_threads: Interpreter CPU threads for models loaded without an explicit count
+        :param xnnpack: Use the XNNPACK CPU delegate (the TFLite default)
+        """
+        self.num_threads = num_threads
+        self.xnnpack = xnnpack
+        self._models = {}
+        self._labels = {}
+        self._palettes = {}
+        self._lock = threading.Lock()
+
+    def configure(self, num_threads=None, xnnpack=None):
+        """Defaults for models loaded from now on (call before the first model())"""
+        if num_threads is not None:
+            self.num_threads = num_threads
+        if xnnpack is not None:
+            self.xnnpack = xnnpack
+
+    def model(self, path, num_threads=None):
+        num_threads = num_threads or self.num_threads
+        key = (path, num_threads, self.xnnpack)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._models[key] = Model(path, num_threads, self.xnnpack)
+        return model
+
+    def labels(self, path):
+        """{class_id: name} of a label file, or None for no file"""
+        if not path:
+            return None
+        with self._lock:
+            if path not in self._labels:
+                self._labels[path] = load_labels(path)
+            return self._labels[path]
+
+    def palette(self, path):
+        """Colour table of a palette file (one "r g b a" row per class) as a uint8 array"""
+        with self._lock:
+            if path not in self._palettes:
+                self._palettes[path] = np.loadtxt(path).astype(np.uint8)
+            return self._palettes[path]
+
+
+# Shared registry used by the example scripts
+registry = ModelRegistry()
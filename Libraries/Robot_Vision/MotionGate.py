@@ -0,0 +1,170 @@
+import time
+
+import cv2
+import numpy as np
+
+# Reasons the heavy stage was run, as counted in MotionGate.stats()
+REASONS = ("first", "motion", "settle", "change", "keep_alive")
+
+
+def encoder_motion(read, min_ticks=2, min_interval_s=0.05):
+    """
+    Wheel motion callable() -> bool from encoder counts.
+
+    :param read: callable() -> {motor: Sample of the 16-bit count}, e.g.
+                 RobotController.get_all_encoder_samples, or the value of the
+                 "sensor/encoders" RobotBus topic
+    :param min_ticks: Count change of any wheel that means the robot moves
+    :param min_interval_s: Encoders are read at most this often; calls in between return the last answer
+    """
+    state = {"counts": None, "read_ns": 0, "moving": False}
+    interval_ns = int(min_interval_s * 1e9)
+
+    def moving():
+        now = time.monotonic_ns()
+        if now - state["read_ns"] < interval_ns:
+            return state["moving"]
+        state["read_ns"] = now
+        samples = read()
+        if samples is None:
+            return state["moving"]
+        counts = {motor: sample.value for motor, sample in samples.items() if sample.valid}
+        previous = state["counts"]
+        state["counts"] = counts
+        if previous is None:
+            return state["moving"]
+        state["moving"] = False
+        for motor, count in counts.items():
+            if motor in previous:
+                delta = (count - previous[motor]) & 0xFFFF  # wraparound-safe
+                if min(delta, 0x10000 - delta) >= min_ticks:
+                    state["moving"] = True
+                    break
+        return state["moving"]
+    return moving
+
+
+class MotionGate:
+    """
+    Decides per frame whether an expensive vision stage needs to run.
+
+    A thumbnail of the frame is built from a sparse grid of pixels (every
+    step-th pixel in both directions, averaged down to a tiny grayscale
+    image, about 0.1 ms for 640x480) and compared with the thumbnail of the
+    last frame the heavy stage ran on. The score is the share of thumbnail
+    pixels that changed by more than pixel_threshold; comparing with the
+    last processed frame (not the previous frame) also catches slow
+    changes. The heavy stage runs when the scene changed, while the robot's
+    wheels move (and for settle_frames after they stop), on the first
+    frame, and at least every keep_alive_s; otherwise its last result
+    stays valid.
+
+    Example usage:
+        >>> gate = MotionGate(motion=encoder_motion(Motor.get_all_encoder_samples))
+        >>> if gate.should_run(frame, timestamp_ns):
+        ...     detections = detector.detect(frame)
+    """
+
+    def __init__(self, size=(32, 24), step=5, pixel_threshold=8, min_changed=0.005, keep_alive_s=1.0, motion=None,
+                 settle_frames=2):
+        """
+        :param size: (width, height) of the thumbnail
+        :param step: Pixel step of the sparse sampling grid
+        :param pixel_threshold: Thumbnail gray level difference (0-255) that counts a pixel as changed
+        :param min_changed: Share of changed thumbnail pixels that counts as a scene change
+        :param keep_alive_s: Longest time between two runs, whatever the scene
+        :param motion: callable() -> True while the robot moves (e.g. encoder_motion(...)), or None
+        :param settle_frames: Frames still run after the wheels stop
+        """
+        self.size = size
+        self.step = step
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.keep_alive_ns = int(keep_alive_s * 1e9)
+        self.motion = motion
+        self.settle_frames = settle_frames
+        self._reference = None
+        self._thumbnail = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._last_run_ns = None
+        self._settle = 0
+        self.score = 0.0         # change score of the last frame
+        self.reason = None       # why the last frame ran, None if it was skipped
+        # Statistics
+        self.frames = 0
+        self.runs = {reason: 0 for reason in REASONS}
+        self.gate_ns = 0
+
+    def thumbnail(self, frame):
+        """Tiny grayscale thumbnail of a BGR/BGRA or grayscale frame (reused buffer)"""
+        offset = self.step // 2
+        sparse = frame[offset::self.step, offset::self.step]
+        if sparse.ndim == 2:
+            cv2.resize(sparse, self.size, dst=self._thumbnail, interpolation=cv2.INTER_AREA)
+        else:
+            small = cv2.resize(sparse, self.size, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY if small.shape[2] == 4 else cv2.COLOR_BGR2GRAY,
+                         dst=self._thumbnail)
+        return self._thumbnail
+
+    def should_run(self, frame, timestamp_ns=None):
+        """True when the heavy stage should process this frame"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        start = time.perf_counter_ns()
+        self.frames += 1
+        thumbnail = self.thumbnail(frame)
+        reason = None
+        if self._reference is None:
+            reason = "first"
+        else:
+            difference = cv2.absdiff(thumbnail, self._reference)
+            self.score = cv2.countNonZero(cv2.threshold(difference, self.pixel_threshold, 255,
+                                                        cv2.THRESH_BINARY)[1]) / difference.size
+        if reason is None and self.motion is not None and self.motion():
+            reason = "motion"
+            self._settle = self.settle_frames
+        elif reason is None and self._settle > 0:
+            reason = "settle"
+            self._settle -= 1
+        if reason is None and self.score >= self.min_changed:
+            reason = "change"
+        if reason is None and timestamp_ns - self._last_run_ns >= self.keep_alive_ns:
+            reason = "keep_alive"
+        if reason is not None:
+            if self._reference is None:
+                self._reference = thumbnail.copy()
+            else:
+                np.copyto(self._reference, thumbnail)
+            self._last_run_ns = timestamp_ns
+            self.runs[reason] += 1
+        self.reason = reason
+        self.gate_ns += time.perf_counter_ns() - start
+        return reason is not None
+
+    def reset(self):
+        """Run on the next frame whatever it shows"""
+        self._reference = None
+
+    def stats(self):
+        frames = max(1, self.frames)
+        ran = sum(self.runs.values())
+        result = {
+            "frames": self.frames,
+            "run_pct": 100.0 * ran / frames,
+            "skipped": self.frames - ran,
+            "gate_ms_mean": self.gate_ns / frames / 1e6,
+        }
+        result.update({f"runs_{reason}": count for reason, count in self.runs.items()})
+        return result
+
+
+if __name__ == "__main__":
+    # A parked robot: a still scene with sensor noise, a hand passing through for a second
+    rng = np.random.default_rng(0)
+    scene = cv2.resize(rng.integers(40, 200, size=(60, 80, 3), dtype=np.uint8), (640, 480))
+    gate = MotionGate()
+    for i in range(300):
+        frame = np.clip(scene + rng.normal(0, 3, size=scene.shape), 0, 255).astype(np.uint8)
+        if 100 <= i < 130:
+            cv2.circle(frame, (200 + 8 * (i - 100), 240), 60, (60, 90, 160), -1)
+        gate.should_run(frame, timestamp_ns=int(i * 1e9 / 30))
+    print(gate.stats())
@@ -0,0 +1,353 @@
+import time
+
+import cv2
+import numpy as np
+
+# Correlation tracker constructors by name: main module first, then cv2.legacy (opencv-contrib)
+TRACKERS = {
+    "KCF": "TrackerKCF_create",
+    "CSRT": "TrackerCSRT_create",
+    "MOSSE": "TrackerMOSSE_create",
+    "MIL": "TrackerMIL_create",
+}
+
+
+def make_tracker_factory(kind="KCF"):
+    """
+    Constructor of an OpenCV single-object tracker, falling back to MIL
+    (part of the main OpenCV module) when kind needs opencv-contrib.
+
+    :return: (create, name)
+    """
+    for name in (kind, "MIL"):
+        for module in (cv2, getattr(cv2, "legacy", None)):
+            create = getattr(module, TRACKERS[name], None) if module is not None else None
+            if create is not None:
+                return create, name
+    raise ImportError(f"No OpenCV tracker {kind}: install opencv-contrib-python")
+
+
+class Target:
+    """The tracked object in full-frame pixel coordinates"""
+    __slots__ = ("x", "y", "w", "h", "confidence", "reacquired", "timestamp_ns")
+
+    def __init__(self, x, y, w, h, confidence, reacquired, timestamp_ns):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.confidence = confidence    # appearance match of the box (normalized correlation), None if unchecked
+        self.reacquired = reacquired    # True on the frame the target was found again after a loss
+        self.timestamp_ns = timestamp_ns
+
+    @property
+    def center(self):
+        return (self.x + self.w // 2, self.y + self.h // 2)
+
+    @property
+    def bbox(self):
+        return (self.x, self.y, self.w, self.h)
+
+    def __repr__(self):
+        confidence = "-" if self.confidence is None else f"{self.confidence:.2f}"
+        return f"Target(bbox={self.bbox}, confidence={confidence}, reacquired={self.reacquired})"
+
+
+class ObjectTracker:
+    """
+    Correlation tracker on a downscaled frame, with scale adaptation,
+    confidence monitoring and re-detection after a loss.
+
+    Every frame is resized by scale into a reused buffer and the tracker
+    (KCF by default) updates on that; boxes are mapped back to full
+    resolution. Every check_every frames the box is compared with the
+    target's template at a few scales around its size (normalized
+    correlation on the small grayscale frame): the best score is the
+    confidence, and a better fitting scale resizes the box and restarts the
+    tracker on it (KCF keeps a fixed box size by itself). A failed update
+    or a confidence below min_confidence marks the target lost. While
+    lost, the target is searched for in a window around its last position
+    that grows every frame until it covers the whole frame, by template
+    matching at several scales or by color histogram back-projection, and
+    the tracker restarts on the first hit good enough.
+
+    Example usage:
+        >>> tracker = ObjectTracker(scale=0.5, kind="KCF")
+        >>> tracker.init(frame, (x, y, w, h))
+        >>> target = tracker.update(frame, timestamp_ns)
+        >>> if target is not None:
+        ...     print(target.center, target.confidence)
+    """
+
+    def __init__(self, scale=0.5, kind="KCF", check_every=5, min_confidence=0.4, reacquire_confidence=0.6,
+                 scales=(0.9, 1.0, 1.1), search_scales=(0.8, 1.0, 1.25), grow=0.5, redetect="template",
+                 template_update=0.05):
+        """
+        :param scale: Downscale factor of the frames the tracker works on
+        :param kind: Correlation tracker, "KCF", "CSRT", "MOSSE" or "MIL" (see make_tracker_factory)
+        :param check_every: Frames between confidence and scale checks
+        :param min_confidence: Template correlation below which the target counts as lost
+        :param reacquire_confidence: Template correlation a re-detection needs
+        :param scales: Box scales compared in each check
+        :param search_scales: Template scales tried by the re-detection
+        :param grow: Search window growth per lost frame, as a multiple of the target size
+        :param redetect: "template" (template matching over the window) or "histogram" (hue/saturation
+            back-projection picks the spot, template matching around it confirms)
+        :param template_update: Blend rate of the current appearance into the template on confident checks
+        """
+        self.scale = scale
+        self._create, self.kind = make_tracker_factory(kind)
+        self.check_every = check_every
+        self.min_confidence = min_confidence
+        self.reacquire_confidence = reacquire_confidence
+        self.scales = scales
+        self.search_scales = search_scales
+        self.grow = grow
+        self.redetect = redetect
+        self.template_update = template_update
+        self._small = None
+        self._gray = None
+        self._tracker = None
+        self._template = None     # float32 grayscale appearance at init size (small frame)
+        self._histogram = None    # hue/saturation histogram of the target
+        self._box = None          # (x, y, w, h) in small-frame coordinates
+        self._since_check = 0
+        self._lost_ns = None      # timestamp of the first lost frame
+        self._lost_frames = 0
+        self.target = None
+        self.window = None        # full-resolution search window of the last re-detection
+        # Statistics
+        self.frames = 0
+        self.tracked = 0
+        self.checks = 0
+        self.rescales = 0
+        self.losses = 0
+        self.reacquire_ns = []
+        self.update_ns = 0
+        self.redetect_ns = 0
+        self.redetect_frames = 0
+
+    ##---------Frame section----------------##
+    def _resize(self, frame):
+        height, width = frame.shape[:2]
+        size = (max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale))))
+        if self._small is None or self._small.shape[:2] != (size[1], size[0]) or \
+                self._small.shape[2:] != frame.shape[2:]:
+            self._small = np.empty((size[1], size[0]) + frame.shape[2:], dtype=frame.dtype)
+        cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        self._gray = None
+        return self._small
+
+    def _grayscale(self):
+        """Grayscale small frame, converted once per frame and only when needed"""
+        if self._gray is None:
+            small = self._small
+            if small.ndim == 2:
+                self._gray = small
+            else:
+                self._gray = cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY if small.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def _hsv(self, x0, y0, x1, y1):
+        return cv2.cvtColor(np.ascontiguousarray(self._small[y0:y1, x0:x1, :3]), cv2.COLOR_BGR2HSV)
+
+    def _clip(self, box):
+        """Box (x, y, w, h) in small-frame coordinates clipped to the frame, as ints"""
+        height, width = self._small.shape[:2]
+        x, y, w, h = box
+        x0, y0 = max(0, int(round(x))), max(0, int(round(y)))
+        x1, y1 = min(width, int(round(x + w))), min(height, int(round(y + h)))
+        return (x0, y0, max(1, x1 - x0), max(1, y1 - y0))
+    ##########################################
+
+    def _restart(self, box):
+        self._box = self._clip(box)
+        self._tracker = self._create()
+        self._tracker.init(self._small, self._box)
+        self._since_check = 0
+
+    def init(self, frame, bbox, timestamp_ns=None):
+        """Start tracking the full-resolution box (x, y, w, h) of frame"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        self._resize(frame)
+        self._restart([v * self.scale for v in bbox])
+        x, y, w, h = self._box
+        self._template = self._grayscale()[y:y + h, x:x + w].astype(np.float32)
+        if self._small.ndim == 3:
+            hsv = self._hsv(x, y, x + w, y + h)
+            self._histogram = cv2.calcHist([hsv], [0, 1], None, [30, 32], [0, 180, 0, 256])
+            cv2.normalize(self._histogram, self._histogram, 0, 255, cv2.NORM_MINMAX)
+        self._lost_ns = None
+        self._lost_frames = 0
+        self.target = self._target(None, False, timestamp_ns)
+        return self.target
+
+    def _target(self, confidence, reacquired, timestamp_ns):
+        x, y, w, h = self._box
+        return Target(int(x / self.scale), int(y / self.scale), int(w / self.scale), int(h / self.scale),
+                      confidence, reacquired, timestamp_ns)
+
+    ##---------Appearance section-----------##
+    def _match(self, window, size):
+        """Best (score, x, y) of the template resized to size inside window (x0, y0, x1, y1)"""
+        x0, y0, x1, y1 = window
+        w, h = size
+        if w < 4 or h < 4 or x1 - x0 < w or y1 - y0 < h:
+            return -1.0, 0, 0
+        template = cv2.resize(self._template, (w, h), interpolation=cv2.INTER_AREA)
+        scores = cv2.matchTemplate(self._grayscale()[y0:y1, x0:x1], template.astype(np.uint8),
+                                   cv2.TM_CCOEFF_NORMED)
+        _, best, _, (x, y) = cv2.minMaxLoc(scores)
+        return best, x0 + x, y0 + y
+
+    def _check(self):
+        """Confidence of the current box, resizing it (and restarting the tracker) when another scale fits better"""
+        height, width = self._small.shape[:2]
+        x, y, w, h = self._box
+        cx, cy = x + w / 2, y + h / 2
+        pad = 0.15 * max(w, h)
+        best = (-1.0, 1.0, x, y, w, h)
+        for s in self.scales:
+            sw, sh = int(round(w * s)), int(round(h * s))
+            window = (max(0, int(cx - sw / 2 - pad)), max(0, int(cy - sh / 2 - pad)),
+                      min(width, int(cx + sw / 2 + pad) + 1), min(height, int(cy + sh / 2 + pad) + 1))
+            score, mx, my = self._match(window, (sw, sh))
+            if score > best[0] + (0.02 if s != 1.0 else 0.0):  # prefer the current scale on near ties
+                best = (score, s, mx, my, sw, sh)
+        self.checks += 1
+        score, s, mx, my, sw, sh = best
+        if s != 1.0 and score >= self.min_confidence:
+            self.rescales += 1
+            self._restart((mx, my, sw, sh))
+        elif score >= max(self.min_confidence, self.reacquire_confidence) and self.template_update > 0:
+            # Follow slow appearance changes (lighting, pose) of a confidently tracked target
+            x, y, w, h = self._box
+            current = cv2.resize(self._grayscale()[y:y + h, x:x + w].astype(np.float32),
+                                 self._template.shape[::-1], interpolation=cv2.INTER_AREA)
+            cv2.accumulateWeighted(current, self._template, self.template_update)
+        return score
+
+    def _search(self, window):
+        """(score, box) of the best re-detection inside window (x0, y0, x1, y1) of the small frame"""
+        height, width = self._template.shape
+        if self.redetect == "histogram" and self._histogram is not None:
+            x0, y0, x1, y1 = window
+            projection = cv2.calcBackProject([self._hsv(x0, y0, x1, y1)], [0, 1], self._histogram,
+                                             [0, 180, 0, 256], 1)
+            # Densest target-sized box of the back-projection; only its surroundings are template matched
+            w, h = self._box[2], self._box[3]
+            density = cv2.boxFilter(projection, cv2.CV_32F, (w, h), normalize=True)
+            _, _, _, (x, y) = cv2.minMaxLoc(density)
+            reach = max(w, h, width, height) * 0.75
+            cx, cy = x0 + x, y0 + y
+            window = (max(x0, int(cx - reach)), max(y0, int(cy - reach)), min(x1, int(cx + reach) + 1),
+                      min(y1, int(cy + reach) + 1))
+        best = (-1.0, None)
+        for s in self.search_scales:
+            sw, sh = int(round(width * s)), int(round(height * s))
+            score, x, y = self._match(window, (sw, sh))
+            if score > best[0]:
+                best = (score, (x, y, sw, sh))
+        return best
+    ##########################################
+
+    def update(self, frame, timestamp_ns=None):
+        """Target in a new full-resolution frame, or None while lost"""
+        if self._template is None:
+            raise RuntimeError("ObjectTracker: init() must be called first")
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        self.frames += 1
+        self._resize(frame)
+        if self._lost_ns is None:
+            start = time.perf_counter_ns()
+            ok, box = self._tracker.update(self._small)
+            confidence = None
+            if ok:
+                self._box = self._clip(box)
+                self._since_check += 1
+                if self._since_check >= self.check_every:
+                    self._since_check = 0
+                    confidence = self._check()
+                    ok = confidence >= self.min_confidence
+            self.update_ns += time.perf_counter_ns() - start
+            if ok:
+                self.tracked += 1
+                self.window = None
+                self.target = self._target(confidence, False, timestamp_ns)
+                return self.target
+            self.losses += 1
+            self._lost_ns = timestamp_ns
+            self._lost_frames = 0
+        # Lost: search a window around the last box that grows every frame
+        start = time.perf_counter_ns()
+        self._lost_frames += 1
+        self.redetect_frames += 1
+        height, width = self._small.shape[:2]
+        x, y, w, h = self._box
+        reach = self.grow * self._lost_frames * max(w, h)
+        window = (max(0, int(x - reach)), max(0, int(y - reach)),
+                  min(width, int(x + w + reach) + 1), min(height, int(y + h + reach) + 1))
+        self.window = tuple(int(v / self.scale) for v in (window[0], window[1], window[2] - window[0],
+                                                          window[3] - window[1]))
+        score, box = self._search(window)
+        self.redetect_ns += time.perf_counter_ns() - start
+        if box is None or score < self.reacquire_confidence:
+            self.target = None
+            return None
+        self._restart(box)
+        self.reacquire_ns.append(timestamp_ns - self._lost_ns)
+        self._lost_ns = None
+        self.tracked += 1
+        self.target = self._target(score, True, timestamp_ns)
+        return self.target
+
+    @property
+    def lost(self):
+        return self._lost_ns is not None
+
+    def draw(self, image, target=None):
+        """Overlay the target box, or the search window while lost (for display only)"""
+        target = self.target if target is None else target
+        if target is not None:
+            cv2.rectangle(image, (target.x, target.y), (target.x + target.w, target.y + target.h), (0, 255, 0), 2)
+            cv2.circle(image, target.center, 5, (0, 0, 255), -1)
+        elif self.window is not None:
+            x, y, w, h = self.window
+            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 0, 255), 1)
+        return image
+
+    def stats(self):
+        frames = max(1, self.frames)
+        updates = max(1, self.frames - self.redetect_frames)
+        seconds = self.update_ns / 1e9
+        return {
+            "frames": self.frames,
+            "tracked_pct": 100.0 * self.tracked / frames,
+            "tracker_fps": (self.frames - self.redetect_frames) / seconds if seconds > 0 else 0.0,
+            "update_ms_mean": self.update_ns / updates / 1e6,
+            "redetect_ms_mean": self.redetect_ns / max(1, self.redetect_frames) / 1e6,
+            "losses": self.losses,
+            "rescales": self.rescales,
+            "reacquire_ms_mean": float(np.mean(self.reacquire_ns)) / 1e6 if self.reacquire_ns else float("nan"),
+            "reacquire_ms_max": max(self.reacquire_ns) / 1e6 if self.reacquire_ns else float("nan"),
+        }
+
+
+if __name__ == "__main__":
+    # A textured target sliding over a textured background, hidden for a second, then back
+    rng = np.random.default_rng(0)
+    background = cv2.resize(rng.integers(40, 200, size=(60, 80, 3), dtype=np.uint8), (640, 480))
+    texture = cv2.resize(rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8), (80, 80),
+                         interpolation=cv2.INTER_NEAREST)
+    tracker = ObjectTracker(scale=0.5)
+    for i in range(150):
+        frame = background.copy()
+        x, y = 100 + 2 * i, 200 + int(40 * np.sin(i / 20))
+        if not 60 <= i < 90:
+            frame[y:y + 80, x:x + 80] = texture
+        if i == 0:
+            tracker.init(frame, (x, y, 80, 80), timestamp_ns=0)
+            continue
+        target = tracker.update(frame, timestamp_ns=int(i * 1e9 / 30))
+    print(f"tracker {tracker.kind}: {target}")
+    print(tracker.stats())
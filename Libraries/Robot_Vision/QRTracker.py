@@ -0,0 +1,252 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class QRCode:
+    """
+    One QR code in full-frame pixel coordinates.
+
+    corners: (4, 2) float array as returned by OpenCV (top-left, top-right,
+    bottom-right, bottom-left of an upright code). data is None while the
+    code has been found but not (yet) decoded.
+    """
+    __slots__ = ("data", "corners", "center", "timestamp_ns", "decoded_ns")
+
+    def __init__(self, data, corners, timestamp_ns, decoded_ns=None):
+        self.data = data
+        self.corners = corners
+        self.center = corners.mean(axis=0)
+        self.timestamp_ns = timestamp_ns
+        self.decoded_ns = decoded_ns      # frame timestamp of the last decode
+
+    @property
+    def bbox(self):
+        """(x, y, w, h) of the corners"""
+        x0, y0 = self.corners.min(axis=0)
+        x1, y1 = self.corners.max(axis=0)
+        return (int(x0), int(y0), int(np.ceil(x1 - x0)), int(np.ceil(y1 - y0)))
+
+    def __repr__(self):
+        return f"QRCode(data={self.data!r}, center=({self.center[0]:.1f}, {self.center[1]:.1f}))"
+
+
+class _Track:
+    """A tracked code with the image patch it was last seen in"""
+    __slots__ = ("code", "box", "patch", "decoded_frame", "decoded_corners")
+
+    def __init__(self, code, box, patch, decoded_frame, decoded_corners):
+        self.code = code
+        self.box = box
+        self.patch = patch
+        self.decoded_frame = decoded_frame
+        self.decoded_corners = decoded_corners
+
+
+class QRTracker:
+    """
+    QR code detection that finds codes on a downscaled frame, decodes them
+    on full-resolution crops and leaves stable codes alone.
+
+    A full pass runs detectMulti on the grayscale frame downscaled by scale
+    (every code in view, at a fraction of the full-frame cost). Each quad is
+    decoded from a crop of the full-resolution frame with its corners
+    given, so decoding skips detection. Between full passes every tracked
+    code is checked with a subsampled patch difference: an unchanged patch
+    means the code has not moved and is reported as is (no detection, no
+    decode). A changed patch is searched again inside its grown region
+    only; the code is re-decoded when it moved more than stable_px since
+    its last decode or after redecode_every frames. A full pass still runs
+    every full_every frames (to pick up new codes) and when tracked codes
+    are lost.
+
+    Example usage:
+        >>> tracker = QRTracker(scale=0.5)
+        >>> for code in tracker.detect(gray, timestamp_ns):
+        ...     print(code.data, code.corners)
+    """
+
+    def __init__(self, scale=0.5, full_every=15, margin=0.25, min_roi=64, stable_px=3.0, redecode_every=30,
+                 change_threshold=6.0, patch_step=4):
+        """
+        :param scale: Downscale factor of the full-pass detection
+        :param full_every: Frames between full passes while codes are tracked
+        :param margin: Search region growth on each side as a fraction of the code size
+        :param min_roi: Minimum search region side in pixels
+        :param stable_px: Mean corner movement below which a tracked code is not decoded again
+        :param redecode_every: Frames after which a tracked code is decoded again anyway
+        :param change_threshold: Mean absolute patch difference (0-255) above which a code is searched again
+        :param patch_step: Pixel step of the subsampled change patch
+        """
+        self.scale = scale
+        self.full_every = full_every
+        self.margin = margin
+        self.min_roi = min_roi
+        self.stable_px = stable_px
+        self.redecode_every = redecode_every
+        self.change_threshold = change_threshold
+        self.patch_step = patch_step
+        self._detector = cv2.QRCodeDetector()
+        self._small = None
+        self._tracks = []
+        self.codes = []          # codes of the last frame
+        self.rois = []           # (x, y, w, h) searched in the last frame
+        self._since_full = 0
+        # Statistics
+        self.frames = 0
+        self.full_passes = 0
+        self.roi_searches = 0
+        self.unchanged = 0
+        self.decodes = 0
+        self.detect_ns = 0
+
+    def reset(self):
+        self._tracks = []
+        self.codes = []
+        self.rois = []
+
+    def _box(self, corners, height, width):
+        """Search region around a quad (x0, y0, x1, y1), grown by margin"""
+        x0, y0 = corners.min(axis=0)
+        x1, y1 = corners.max(axis=0)
+        grow_w = max(self.min_roi, (x1 - x0) * (1 + 2 * self.margin)) / 2
+        grow_h = max(self.min_roi, (y1 - y0) * (1 + 2 * self.margin)) / 2
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        return (max(0, int(cx - grow_w)), max(0, int(cy - grow_h)),
+                min(width, int(cx + grow_w) + 1), min(height, int(cy + grow_h) + 1))
+
+    def _patch(self, gray, box):
+        x0, y0, x1, y1 = box
+        return gray[y0:y1:self.patch_step, x0:x1:self.patch_step].astype(np.int16)
+
+    def _decode(self, gray, corners, box):
+        """Data of the quad at corners, decoded from the full-resolution crop, or None"""
+        x0, y0, x1, y1 = box
+        crop = np.ascontiguousarray(gray[y0:y1, x0:x1])
+        self.decodes += 1
+        data, _ = self._detector.decode(crop, (corners - (x0, y0)).astype(np.float32).reshape(1, 4, 2))
+        if not data:
+            # Corners from the downscaled pass can be a little off: let the detector refine them
+            data, points, _ = self._detector.detectAndDecode(crop)
+            if data and points is not None:
+                corners[:] = points.reshape(4, 2) + (x0, y0)
+        return data or None
+
+    def _update(self, gray, corners, previous, timestamp_ns):
+        """Track of a quad found this frame, decoded again only when needed"""
+        height, width = gray.shape[:2]
+        box = self._box(corners, height, width)
+        if previous is not None and previous.code.data is not None:
+            moved = float(np.mean(np.linalg.norm(corners - previous.decoded_corners, axis=1)))
+            if moved < self.stable_px and self.frames - previous.decoded_frame < self.redecode_every:
+                code = QRCode(previous.code.data, corners, timestamp_ns, previous.code.decoded_ns)
+                return _Track(code, box, self._patch(gray, box), previous.decoded_frame, previous.decoded_corners)
+        data = self._decode(gray, corners, box)
+        if data is None and previous is not None and previous.code.data is not None:
+            # Same place as a known code: keep its data, and when and where it was last
+            # decoded, until it decodes again (the failure is not a fresh decode)
+            code = QRCode(previous.code.data, corners, timestamp_ns, previous.code.decoded_ns)
+            return _Track(code, box, self._patch(gray, box), previous.decoded_frame, previous.decoded_corners)
+        code = QRCode(data, corners, timestamp_ns, timestamp_ns if data is not None else None)
+        return _Track(code, box, self._patch(gray, box), self.frames, corners.copy())
+
+    def _full_pass(self, gray, timestamp_ns):
+        height, width = gray.shape[:2]
+        size = (max(1, int(width * self.scale)), max(1, int(height * self.scale)))
+        if self._small is None or self._small.shape[:2] != (size[1], size[0]):
+            self._small = np.empty((size[1], size[0]), dtype=np.uint8)
+        cv2.resize(gray, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        self.full_passes += 1
+        found, points = self._detector.detectMulti(self._small)
+        if not found or points is None:
+            return []
+        tracks = []
+        for quad in points.reshape(-1, 4, 2).astype(np.float64) / self.scale:
+            # The known code nearest to the quad, if the quad's center lies inside its search region
+            previous = None
+            cx, cy = quad.mean(axis=0)
+            for track in self._tracks:
+                x0, y0, x1, y1 = track.box
+                if x0 <= cx < x1 and y0 <= cy < y1 and (previous is None or np.hypot(*(track.code.center - (cx, cy)))
+                                                        < np.hypot(*(previous.code.center - (cx, cy)))):
+                    previous = track
+            tracks.append(self._update(gray, quad, previous, timestamp_ns))
+        return tracks
+
+    def detect(self, gray, timestamp_ns=None):
+        """Codes in a grayscale frame (list of QRCode)"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        start = time.perf_counter_ns()
+        self.frames += 1
+        self.rois = []
+        tracks = None
+        if self._tracks and self._since_full < self.full_every:
+            self._since_full += 1
+            tracks = []
+            for track in self._tracks:
+                patch = self._patch(gray, track.box)
+                if patch.shape == track.patch.shape and \
+                        np.mean(np.abs(patch - track.patch)) < self.change_threshold:
+                    self.unchanged += 1
+                    code = track.code
+                    tracks.append(_Track(QRCode(code.data, code.corners, timestamp_ns, code.decoded_ns), track.box,
+                                         track.patch, track.decoded_frame, track.decoded_corners))
+                    continue
+                # Changed: search the region around the code at full resolution
+                x0, y0, x1, y1 = track.box
+                self.rois.append((x0, y0, x1 - x0, y1 - y0))
+                self.roi_searches += 1
+                found, points = self._detector.detect(np.ascontiguousarray(gray[y0:y1, x0:x1]))
+                if not found or points is None:
+                    tracks = None  # lost: look at the whole frame
+                    break
+                tracks.append(self._update(gray, points.reshape(4, 2).astype(np.float64) + (x0, y0), track,
+                                           timestamp_ns))
+        if tracks is None:
+            tracks = self._full_pass(gray, timestamp_ns)
+            self._since_full = 0
+        self._tracks = tracks
+        self.codes = [track.code for track in tracks]
+        self.detect_ns += time.perf_counter_ns() - start
+        return self.codes
+
+    def draw(self, image, codes=None):
+        """Overlay code outlines and data (for display only)"""
+        for code in self.codes if codes is None else codes:
+            cv2.polylines(image, [code.corners.astype(np.int32)], True, (255, 0, 0), 2)
+            if code.data is not None:
+                x, y = code.corners[0]
+                cv2.putText(image, code.data, (int(x), int(y) - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 250, 120), 2)
+        for x, y, w, h in self.rois:
+            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 1)
+        return image
+
+    def stats(self):
+        frames = max(1, self.frames)
+        return {
+            "frames": self.frames,
+            "full_passes": self.full_passes,
+            "roi_searches": self.roi_searches,
+            "unchanged": self.unchanged,
+            "decodes": self.decodes,
+            "detect_ms_mean": self.detect_ns / frames / 1e6,
+        }
+
+
+if __name__ == "__main__":
+    # Two synthetic codes over a noisy background: one still, one sliding
+    encoder = cv2.QRCodeEncoder.create()
+    tracker = QRTracker()
+    rng = np.random.default_rng(0)
+    background = rng.integers(60, 180, size=(480, 640), dtype=np.uint8)
+    still = cv2.resize(encoder.encode("dock-1"), (150, 150), interpolation=cv2.INTER_NEAREST)
+    sliding = cv2.resize(encoder.encode("shelf-A"), (150, 150), interpolation=cv2.INTER_NEAREST)
+    for i in range(60):
+        gray = background.copy()
+        for code, (x, y) in ((still, (60, 100)), (sliding, (380, 180 + i))):
+            gray[y - 10:y + 160, x - 10:x + 160] = 255
+            gray[y:y + 150, x:x + 150] = code
+        codes = tracker.detect(gray, timestamp_ns=int(i * 1e9 / 30))
+    print(codes)
+    print(tracker.stats())
@@ -0,0 +1,104 @@
+import time
+
+import numpy as np
+
+from TFLiteDetector import DETECTION_DTYPE, resize_rgb
+
+# Output tensors of a TensorFlow Object Detection API frozen graph
+FETCHES = ("detection_boxes:0", "detection_scores:0", "detection_classes:0", "num_detections:0")
+
+
+class TFGraphDetector:
+    """
+    Object detector for a TensorFlow Object Detection API frozen graph
+    (frozen_inference_graph.pb), with the TFLiteDetector interface so it
+    can run in a DetectionPipeline.
+
+    The graph is imported and the session opened once; the input and output
+    tensors are resolved once and the session is warmed up with a dummy
+    frame, so the first real frame does not pay for graph optimization.
+    Every frame is then a single sess.run() on a preprocessed buffer, which
+    can be smaller than the camera frame (the SSD graphs resize to 300x300
+    internally anyway). Detections come back as a structured array
+    (DETECTION_DTYPE), so drawing and control cost no more per detection
+    than a loop over a few rows.
+
+    Example usage:
+        >>> detector = TFGraphDetector("frozen_inference_graph.pb", labels=category_index, input_size=(300, 300))
+        >>> buffer = detector.new_input()
+        >>> detector.preprocess(frame, buffer)
+        >>> for d in detector.infer(buffer):
+        ...     print(detector.label(d["class_id"]), d["score"])
+        >>> detector.close()
+    """
+
+    def __init__(self, graph_path, labels=None, input_size=(300, 300), score_threshold=0.5, order="BGR",
+                 num_threads=None, warmup=2):
+        """
+        :param graph_path: Path of frozen_inference_graph.pb
+        :param labels: {class_id: name} or an Object Detection API category index {class_id: {"name": ...}}
+        :param input_size: (width, height) the frames are resized to before inference
+        :param score_threshold: Minimum score of a returned detection
+        :param order: Channel order of the frames, "BGR" (Picamera2 RGB888/XRGB8888) or "RGB"
+        :param num_threads: Intra-op threads of the session (None: TensorFlow default)
+        :param warmup: Dummy runs before the first frame
+        """
+        import tensorflow as tf
+
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            graph_def = tf.compat.v1.GraphDef()
+            with tf.io.gfile.GFile(graph_path, "rb") as f:
+                graph_def.ParseFromString(f.read())
+            tf.import_graph_def(graph_def, name="")
+        config = tf.compat.v1.ConfigProto()
+        if num_threads:
+            config.intra_op_parallelism_threads = num_threads
+        self.session = tf.compat.v1.Session(graph=self.graph, config=config)
+        # Tensors are looked up once, not on every frame
+        self._input = self.graph.get_tensor_by_name("image_tensor:0")
+        self._fetches = [self.graph.get_tensor_by_name(name) for name in FETCHES]
+        self.labels = {int(k): (v["name"] if isinstance(v, dict) else v) for k, v in (labels or {}).items()}
+        self.width, self.height = input_size
+        self.score_threshold = score_threshold
+        self.order = order
+        self._resized = {}
+        # Statistics
+        self.warmup_ms = 0.0
+        start = time.perf_counter()
+        for _ in range(warmup):
+            self.infer(self.new_input())
+        self.warmup_ms = (time.perf_counter() - start) * 1000
+
+    @property
+    def input_size(self):
+        return (self.width, self.height)
+
+    def new_input(self):
+        """A preprocessing buffer of the input size (uint8 RGB)"""
+        return np.zeros((self.height, self.width, 3), dtype=np.uint8)
+
+    def preprocess(self, frame, out):
+        """Resize a BGR/BGRA (or RGB) frame into out as input-sized RGB"""
+        return resize_rgb(frame, out, self.order, self._resized)
+
+    def infer(self, buffer):
+        """Run the graph on a preprocessed buffer; returns a DETECTION_DTYPE array"""
+        boxes, scores, classes, count = self.session.run(self._fetches,
+                                                         feed_dict={self._input: buffer[np.newaxis]})
+        count = int(count[0])
+        scores = scores[0, :count]
+        keep = np.flatnonzero(scores > self.score_threshold)
+        boxes = boxes[0, keep]
+        detections = np.empty(len(keep), dtype=DETECTION_DTYPE)
+        detections["ymin"], detections["xmin"] = boxes[:, 0], boxes[:, 1]
+        detections["ymax"], detections["xmax"] = boxes[:, 2], boxes[:, 3]
+        detections["score"] = scores[keep]
+        detections["class_id"] = classes[0, keep]
+        return detections
+
+    def label(self, class_id):
+        return self.labels.get(int(class_id), "Unknown")
+
+    def close(self):
+        self.session.close()
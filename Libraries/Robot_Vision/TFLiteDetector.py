@@ -0,0 +1,192 @@
+import cv2
+import numpy as np
+
+# One row per detection; box corners normalized to 0..1
+DETECTION_DTYPE = np.dtype([("xmin", np.float32), ("ymin", np.float32), ("xmax", np.float32),
+                            ("ymax", np.float32), ("score", np.float32), ("class_id", np.int32)])
+
+
+def load_interpreter(model_path, num_threads=None, xnnpack=True):
+    """
+    TFLite interpreter from tflite_runtime, or from TensorFlow when only that
+    is installed. XNNPACK is the default CPU delegate of both; xnnpack=False
+    runs the builtin kernels only (for comparison, or for models XNNPACK
+    handles badly).
+    """
+    try:
+        from tflite_runtime.interpreter import Interpreter, OpResolverType
+    except ImportError:
+        from tensorflow.lite import Interpreter
+        from tensorflow.lite.experimental import OpResolverType
+    if xnnpack:
+        return Interpreter(model_path=model_path, num_threads=num_threads)
+    return Interpreter(model_path=model_path, num_threads=num_threads,
+                       experimental_op_resolver_type=OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES)
+
+
+def quantization(details):
+    """(scale, zero_point) of a tensor, or None for a float / unquantized tensor"""
+    scale, zero_point = details.get("quantization", (0.0, 0))
+    return (float(scale), int(zero_point)) if scale else None
+
+
+def input_lut(details, mean=0.0, std=1.0):
+    """
+    256-entry table mapping uint8 pixels straight to the quantized input
+    values of a uint8/int8 model, with the (pixel - mean) / std normalization
+    of the float model folded in; None when the pixels can be copied as they
+    are (float models are normalized separately).
+    """
+    dtype = np.dtype(details["dtype"])
+    if dtype == np.float32:
+        return None
+    params = quantization(details)
+    if params is None:
+        return None
+    scale, zero_point = params
+    info = np.iinfo(dtype)
+    values = np.round((np.arange(256) - mean) / std / scale + zero_point)
+    lut = np.clip(values, info.min, info.max).astype(dtype)
+    if dtype == np.uint8 and np.array_equal(lut, np.arange(256)):
+        return None
+    return lut
+
+
+def dequantize(values, params):
+    """Real values of quantized tensor values (params from quantization()); float values pass through"""
+    if params is None:
+        return values
+    scale, zero_point = params
+    return (values.astype(np.float32) - zero_point) * scale
+
+
+def load_labels(path):
+    """Label file of "<id> <name>" lines (or one name per line) -> {id: name}"""
+    labels = {}
+    with open(path, "r") as f:
+        for i, line in enumerate(f):
+            parts = line.strip().split(maxsplit=1)
+            if not parts:
+                continue
+            if len(parts) == 2 and parts[0].isdigit():
+                labels[int(parts[0])] = parts[1]
+            else:
+                labels[i] = line.strip()
+    return labels
+
+
+def resize_rgb(frame, out, order="BGR", scratch=None):
+    """
+    Resize a BGR/BGRA (or RGB/RGBA) frame into out (h, w, 3 uint8) as RGB.
+    Resizing comes first so the color conversion runs on the small image;
+    scratch is a dict holding the resize buffers between calls.
+    """
+    height, width = out.shape[:2]
+    channels = frame.shape[2] if frame.ndim == 3 else 1
+    scratch = {} if scratch is None else scratch
+    resized = scratch.get(channels)
+    if resized is None or resized.shape[:2] != (height, width):
+        resized = scratch[channels] = np.empty((height, width, channels), np.uint8)
+    cv2.resize(frame, (width, height), dst=resized, interpolation=cv2.INTER_LINEAR)
+    if channels == 4:
+        cv2.cvtColor(resized, cv2.COLOR_BGRA2RGB if order == "BGR" else cv2.COLOR_RGBA2RGB, dst=out)
+    elif order == "BGR":
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=out)
+    else:
+        np.copyto(out, resized)
+    return out
+
+
+class TFLiteDetector:
+    """
+    SSD-style TFLite object detector (boxes, classes, scores, count outputs).
+
+    Preprocessing resizes first and converts colors on the small image, into
+    a caller-provided buffer, so it allocates nothing per frame and can run
+    on another thread than inference. infer() copies that buffer into the
+    interpreter's input tensor in place and returns the detections as a
+    structured array (DETECTION_DTYPE).
+
+    Quantized (uint8/int8) models run end to end on integers: the uint8
+    pixels go into the input tensor as they are, or through a 256-entry
+    lookup table when the model's input quantization differs, and only the
+    scores and the boxes of the kept detections are dequantized.
+
+    Example usage:
+        >>> detector = TFLiteDetector("mobilenet_v2.tflite", num_threads=4)
+        >>> buffer = detector.new_input()
+        >>> detector.preprocess(frame, buffer)
+        >>> for d in detector.infer(buffer):
+        ...     print(detector.label(d["class_id"]), d["score"])
+    """
+
+    def __init__(self, model_path, labels=None, num_threads=4, score_threshold=0.5, order="BGR", xnnpack=True):
+        """
+        :param model_path: Path of the .tflite model
+        :param labels: {class_id: name} or a label file path
+        :param num_threads: Interpreter CPU threads
+        :param score_threshold: Minimum score of a returned detection
+        :param order: Channel order of the frames, "BGR" (Picamera2 RGB888/XRGB8888) or "RGB"
+        :param xnnpack: Use the XNNPACK CPU delegate
+        """
+        self.interpreter = load_interpreter(model_path, num_threads, xnnpack)
+        self.interpreter.allocate_tensors()
+        self.num_threads = num_threads
+        self.labels = load_labels(labels) if isinstance(labels, str) else (labels or {})
+        self.score_threshold = score_threshold
+        self.order = order
+        details = self.interpreter.get_input_details()[0]
+        self.input_index = details["index"]
+        self.height, self.width = int(details["shape"][1]), int(details["shape"][2])
+        self.input_dtype = details["dtype"]
+        self._lut = input_lut(details, mean=127.5, std=127.5)
+        outputs = self.interpreter.get_output_details()[:4]
+        self.output_indices = [d["index"] for d in outputs]
+        self._output_quantization = [quantization(d) for d in outputs]
+        self._resized = {}
+
+    @property
+    def input_size(self):
+        return (self.width, self.height)
+
+    def new_input(self):
+        """A preprocessing buffer shaped like the model input (uint8 RGB)"""
+        return np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def preprocess(self, frame, out):
+        """Resize a BGR/BGRA (or RGB) frame into out as model-sized RGB"""
+        return resize_rgb(frame, out, self.order, self._resized)
+
+    def _set_input(self, buffer):
+        # The view must not outlive this call: invoke() refuses to run while
+        # a reference to the interpreter's internal buffers exists.
+        tensor = self.interpreter.tensor(self.input_index)()[0]
+        if self.input_dtype == np.float32:
+            np.multiply(buffer, 1 / 127.5, out=tensor, casting="unsafe")
+            np.subtract(tensor, 1.0, out=tensor)
+        elif self._lut is not None:
+            cv2.LUT(buffer, self._lut, dst=tensor)
+        else:
+            np.copyto(tensor, buffer)
+        del tensor
+
+    def infer(self, buffer):
+        """Run the model on a preprocessed buffer; returns a DETECTION_DTYPE array"""
+        self._set_input(buffer)
+        self.interpreter.invoke()
+        get = self.interpreter.get_tensor
+        boxes, classes, scores, count = (get(i)[0] for i in self.output_indices)
+        q_boxes, q_classes, q_scores, q_count = self._output_quantization
+        count = int(dequantize(count, q_count))
+        scores = dequantize(scores[:count], q_scores)
+        keep = np.flatnonzero(scores > self.score_threshold)
+        boxes = dequantize(boxes[keep], q_boxes)
+        detections = np.empty(len(keep), dtype=DETECTION_DTYPE)
+        detections["ymin"], detections["xmin"] = boxes[:, 0], boxes[:, 1]
+        detections["ymax"], detections["xmax"] = boxes[:, 2], boxes[:, 3]
+        detections["score"] = scores[keep]
+        detections["class_id"] = dequantize(classes[keep], q_classes)
+        return detections
+
+    def label(self, class_id):
+        return self.labels.get(int(class_id), "Unknown")
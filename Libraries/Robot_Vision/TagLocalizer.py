@@ -0,0 +1,354 @@
+import json
+import time
+import threading
+
+import cv2
+import numpy as np
+
+# Loaded calibrations by path: every localizer of the process shares one copy
+_intrinsics = {}
+_intrinsics_lock = threading.Lock()
+
+
+class CameraIntrinsics:
+    """
+    Camera matrix and distortion of one stream resolution.
+
+    Loaded once per file (calibrations are cached by path) and rescaled for
+    other stream sizes. Per frame only the tag corners are undistorted, all
+    of them in one call; whole-image undistortion maps are built on first
+    use and kept, for display.
+
+    Example usage:
+        >>> intrinsics = CameraIntrinsics.load("camera_calibration.npz", size=(640, 480))
+        >>> normalized = intrinsics.normalize(corners)  # (..., 2) pixels -> undistorted normalized coordinates
+    """
+
+    def __init__(self, camera_matrix, dist_coeffs=None, size=(640, 480)):
+        """
+        :param camera_matrix: 3x3 camera matrix
+        :param dist_coeffs: OpenCV distortion coefficients (None: no distortion)
+        :param size: (width, height) the matrix belongs to
+        """
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64).reshape(3, 3)
+        self.dist_coeffs = np.zeros(5) if dist_coeffs is None else np.asarray(dist_coeffs, dtype=np.float64).ravel()
+        self.size = tuple(size)
+        self.distorted = bool(np.any(self.dist_coeffs))
+        self._maps = None
+
+    @classmethod
+    def load(cls, path, size=None):
+        """
+        Calibration saved as .npz (camera_matrix, dist_coeffs, size), as
+        written by save(); cached by path. size rescales it to another
+        stream resolution.
+        """
+        with _intrinsics_lock:
+            intrinsics = _intrinsics.get(path)
+            if intrinsics is None:
+                data = np.load(path)
+                intrinsics = _intrinsics[path] = cls(data["camera_matrix"], data["dist_coeffs"],
+                                                     tuple(int(v) for v in data["size"]))
+        return intrinsics if size is None else intrinsics.scaled(size)
+
+    @classmethod
+    def from_fov(cls, size=(640, 480), hfov_deg=62.2):
+        """Ideal pinhole camera from the horizontal field of view (Pi Camera v2: 62.2 degrees)"""
+        width, height = size
+        f = width / 2 / np.tan(np.radians(hfov_deg) / 2)
+        return cls([[f, 0, (width - 1) / 2], [0, f, (height - 1) / 2], [0, 0, 1]], None, size)
+
+    def save(self, path):
+        np.savez(path, camera_matrix=self.camera_matrix, dist_coeffs=self.dist_coeffs, size=np.array(self.size))
+
+    def scaled(self, size):
+        """The same camera at another stream resolution (same field of view)"""
+        if tuple(size) == self.size:
+            return self
+        sx, sy = size[0] / self.size[0], size[1] / self.size[1]
+        matrix = self.camera_matrix.copy()
+        matrix[0] *= sx
+        matrix[1] *= sy
+        return CameraIntrinsics(matrix, self.dist_coeffs, size)
+
+    @property
+    def focal(self):
+        return float(self.camera_matrix[0, 0])
+
+    def normalize(self, points):
+        """Pixel points (..., 2) -> undistorted normalized image coordinates, one call for all points"""
+        points = np.asarray(points, dtype=np.float64)
+        flat = points.reshape(-1, 1, 2)
+        if self.distorted:
+            normalized = cv2.undistortPoints(flat, self.camera_matrix, self.dist_coeffs)
+        else:
+            normalized = (flat - self.camera_matrix[:2, 2]) / np.diag(self.camera_matrix)[:2]
+        return normalized.reshape(points.shape)
+
+    def undistort(self, image, dst=None):
+        """Undistorted copy of an image of this size (maps built once)"""
+        if self._maps is None:
+            self._maps = cv2.initUndistortRectifyMap(self.camera_matrix, self.dist_coeffs, None, self.camera_matrix,
+                                                     self.size, cv2.CV_16SC2)
+        return cv2.remap(image, self._maps[0], self._maps[1], cv2.INTER_LINEAR, dst=dst)
+
+
+def pose_matrix(x, y, z, yaw_deg=0.0, pitch_deg=0.0):
+    """4x4 transform of a frame at (x, y, z) turned by yaw about z, then pitched about its y axis"""
+    yaw, pitch = np.radians(yaw_deg), np.radians(pitch_deg)
+    rz = np.array([[np.cos(yaw), -np.sin(yaw), 0], [np.sin(yaw), np.cos(yaw), 0], [0, 0, 1]])
+    ry = np.array([[np.cos(pitch), 0, np.sin(pitch)], [0, 1, 0], [-np.sin(pitch), 0, np.cos(pitch)]])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rz @ ry
+    matrix[:3, 3] = (x, y, z)
+    return matrix
+
+
+class TagMap:
+    """
+    Known tag placements in the world frame (x, y on the floor, z up, metres).
+
+    A tag frame has x to the tag's right, y up and z out of its face. The
+    world corners of every tag are precomputed in AprilTag corner order, as
+    one (max_id + 1, 4, 3) array, so the object points of any set of
+    detected tags are a single indexing operation.
+
+    Example usage:
+        >>> tag_map = TagMap({3: TagMap.wall(1.0, 0.0, 0.15, yaw_deg=180)}, size=0.1)
+        >>> tag_map = TagMap.from_file("tag_map.json")
+    """
+
+    def __init__(self, tags, size=0.1):
+        """
+        :param tags: {tag_id: 4x4 world_T_tag}
+        :param size: Tag side (black square) in metres
+        """
+        self.size = size
+        self.tags = {int(k): np.asarray(v, dtype=np.float64) for k, v in tags.items()}
+        h = size / 2
+        # Bottom-left, bottom-right, top-right, top-left in the tag frame
+        local = np.array([[-h, -h, 0, 1], [h, -h, 0, 1], [h, h, 0, 1], [-h, h, 0, 1]])
+        count = max(self.tags, default=-1) + 1
+        self.corners = np.zeros((count, 4, 3))
+        self.known = np.zeros(count, dtype=bool)
+        for tag_id, matrix in self.tags.items():
+            self.corners[tag_id] = (local @ matrix.T)[:, :3]
+            self.known[tag_id] = True
+
+    @staticmethod
+    def wall(x, y, z, yaw_deg):
+        """world_T_tag of an upright tag centered at (x, y, z) whose face points along yaw_deg"""
+        yaw = np.radians(yaw_deg)
+        matrix = np.eye(4)
+        matrix[:3, 0] = (-np.sin(yaw), np.cos(yaw), 0)   # tag x: to its right
+        matrix[:3, 1] = (0, 0, 1)                         # tag y: up
+        matrix[:3, 2] = (np.cos(yaw), np.sin(yaw), 0)     # tag z: out of the face
+        matrix[:3, 3] = (x, y, z)
+        return matrix
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        JSON map: {"size": 0.1, "tags": {"3": {"x": 1.0, "y": 0.0, "z": 0.15, "yaw": 180}, ...}}
+        (wall-mounted tags; yaw in degrees is the direction the tag faces)
+        """
+        with open(path, "r") as f:
+            data = json.load(f)
+        tags = {int(k): cls.wall(v["x"], v["y"], v.get("z", 0.0), v.get("yaw", 0.0)) for k, v in data["tags"].items()}
+        return cls(tags, size=data.get("size", 0.1))
+
+    def lookup(self, tag_ids):
+        """Boolean mask of the ids that are in the map"""
+        tag_ids = np.asarray(tag_ids, dtype=np.int64)
+        inside = (tag_ids >= 0) & (tag_ids < len(self.known))
+        known = np.zeros(len(tag_ids), dtype=bool)
+        known[inside] = self.known[tag_ids[inside]]
+        return known
+
+
+class TagPose:
+    """Pose of one tag in the camera frame (x right, y down, z forward, metres)"""
+    __slots__ = ("tag_id", "rvec", "tvec", "timestamp_ns")
+
+    def __init__(self, tag_id, rvec, tvec, timestamp_ns):
+        self.tag_id = tag_id
+        self.rvec = rvec
+        self.tvec = tvec
+        self.timestamp_ns = timestamp_ns
+
+    @property
+    def distance(self):
+        return float(np.linalg.norm(self.tvec))
+
+    def __repr__(self):
+        return f"TagPose(id={self.tag_id}, tvec=({self.tvec[0]:+.3f}, {self.tvec[1]:+.3f}, {self.tvec[2]:+.3f}))"
+
+
+class RobotPose:
+    """Robot pose in the world frame from the tags of one frame"""
+    __slots__ = ("x", "y", "z", "yaw", "matrix", "tags", "error_px", "timestamp_ns")
+
+    def __init__(self, x, y, z, yaw, matrix, tags, error_px, timestamp_ns):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.yaw = yaw                # radians, 0 along world x, counter-clockwise
+        self.matrix = matrix          # 4x4 world_T_robot
+        self.tags = tags              # ids of the map tags used
+        self.error_px = error_px      # mean reprojection error
+        self.timestamp_ns = timestamp_ns
+
+    def __repr__(self):
+        return (f"RobotPose(x={self.x:+.3f}, y={self.y:+.3f}, yaw={np.degrees(self.yaw):+.1f} deg, "
+                f"tags={self.tags}, error={self.error_px:.2f} px)")
+
+
+class TagLocalizer:
+    """
+    Robot localization from AprilTags of a known map.
+
+    All corners of a frame are undistorted in one call. The robot pose comes
+    from a single PnP solve over the corners of every map tag in view (more
+    tags add points to one solve instead of more solves), seeded with the
+    previous pose while it is fresh; camera to robot is a fixed transform
+    applied once. Per-tag poses (IPPE for squares) are only computed when
+    asked for. Each RobotPose carries the frame timestamp and is published
+    on a RobotBus topic when a bus is given.
+
+    Example usage:
+        >>> localizer = TagLocalizer(CameraIntrinsics.load("camera_calibration.npz", size=(640, 480)),
+        ...                          TagMap.from_file("tag_map.json"), camera_pose=(0.08, 0.0, 0.12, 0.0))
+        >>> pose = localizer.locate(tracker.detect(gray, timestamp_ns), timestamp_ns)
+        >>> if pose is not None:
+        ...     print(pose.x, pose.y, pose.yaw)
+    """
+
+    def __init__(self, intrinsics, tag_map, camera_pose=(0.0, 0.0, 0.1, 0.0), bus=None, topic="vision/pose",
+                 seed_age=0.5):
+        """
+        :param intrinsics: CameraIntrinsics of the stream the tags are detected in
+        :param tag_map: TagMap
+        :param camera_pose: (x, y, z, pitch_deg) of the camera on the robot (x forward, z up; pitch down positive)
+        :param bus: RobotBus Bus the poses are published on (None: no publishing)
+        :param topic: Bus topic
+        :param seed_age: Seconds a previous pose stays usable as the starting point of the solve
+        """
+        self.intrinsics = intrinsics
+        self.tag_map = tag_map
+        self.bus = bus
+        self.topic = topic
+        self.seed_age = seed_age
+        x, y, z, pitch = camera_pose
+        # Camera axes (x right, y down, z forward) in the robot frame (x forward, y left, z up)
+        robot_T_camera = pose_matrix(x, y, z, 0.0, pitch)
+        robot_T_camera[:3, :3] = robot_T_camera[:3, :3] @ np.array([[0, 0, 1], [-1, 0, 0], [0, -1, 0]])
+        self._camera_T_robot = np.linalg.inv(robot_T_camera)
+        h = tag_map.size / 2
+        # IPPE_SQUARE object points: top-left, top-right, bottom-right, bottom-left
+        self._square = np.array([[-h, h, 0], [h, h, 0], [h, -h, 0], [-h, -h, 0]])
+        self._identity = np.eye(3)
+        self._seed = None             # (rvec, tvec, timestamp_ns) of the last solve
+        self.last = None              # last RobotPose
+        # Statistics
+        self.frames = 0
+        self.located = 0
+        self.solve_ns = 0
+
+    def _corners(self, tags):
+        ids = np.fromiter((tag.tag_id for tag in tags), dtype=np.int64, count=len(tags))
+        corners = np.stack([tag.corners for tag in tags]) if tags else np.zeros((0, 4, 2))
+        return ids, corners
+
+    def tag_poses(self, tags, timestamp_ns=None):
+        """Camera-frame pose of every tag (known to the map or not)"""
+        if not tags:
+            return []
+        ids, corners = self._corners(tags)
+        # To IPPE_SQUARE order; solvePnP needs each tag's points contiguous
+        normalized = np.ascontiguousarray(self.intrinsics.normalize(corners)[:, [3, 2, 1, 0]])
+        poses = []
+        for tag_id, points in zip(ids, normalized):
+            ok, rvec, tvec = cv2.solvePnP(self._square, points, self._identity, None, flags=cv2.SOLVEPNP_IPPE_SQUARE)
+            if ok:
+                poses.append(TagPose(int(tag_id), rvec.ravel(), tvec.ravel(),
+                                     tags[0].timestamp_ns if timestamp_ns is None else timestamp_ns))
+        return poses
+
+    def locate(self, tags, timestamp_ns=None):
+        """Robot pose from the map tags among tags (AprilTagTracker Tags), or None"""
+        timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        start = time.perf_counter_ns()
+        self.frames += 1
+        ids, corners = self._corners(tags)
+        known = self.tag_map.lookup(ids)
+        if not known.any():
+            self.solve_ns += time.perf_counter_ns() - start
+            return None
+        ids, corners = ids[known], corners[known]
+        object_points = self.tag_map.corners[ids].reshape(-1, 3)
+        image_points = self.intrinsics.normalize(corners).reshape(-1, 2)
+        seed = self._seed
+        if seed is not None and (timestamp_ns - seed[2]) / 1e9 <= self.seed_age:
+            ok, rvec, tvec = cv2.solvePnP(object_points, image_points, self._identity, None, seed[0].copy(),
+                                          seed[1].copy(), useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE)
+        elif len(ids) == 1:
+            ok, rvec, tvec = cv2.solvePnP(object_points, image_points, self._identity, None, flags=cv2.SOLVEPNP_IPPE)
+        else:
+            ok, rvec, tvec = cv2.solvePnP(object_points, image_points, self._identity, None, flags=cv2.SOLVEPNP_SQPNP)
+        if not ok:
+            self.solve_ns += time.perf_counter_ns() - start
+            return None
+        projected, _ = cv2.projectPoints(object_points, rvec, tvec, self._identity, None)
+        error_px = float(np.mean(np.linalg.norm(projected.reshape(-1, 2) - image_points, axis=1))) * self.intrinsics.focal
+        camera_T_world = np.eye(4)
+        camera_T_world[:3, :3] = cv2.Rodrigues(rvec)[0]
+        camera_T_world[:3, 3] = tvec.ravel()
+        world_T_robot = np.linalg.inv(camera_T_world) @ self._camera_T_robot
+        x, y, z = world_T_robot[:3, 3]
+        yaw = float(np.arctan2(world_T_robot[1, 0], world_T_robot[0, 0]))
+        pose = RobotPose(float(x), float(y), float(z), yaw, world_T_robot, ids.tolist(), error_px, timestamp_ns)
+        self._seed = (rvec, tvec, timestamp_ns)
+        self.last = pose
+        self.located += 1
+        self.solve_ns += time.perf_counter_ns() - start
+        if self.bus is not None:
+            self.bus.publish(self.topic, pose)
+        return pose
+
+    def reset(self):
+        self._seed = None
+        self.last = None
+
+    def stats(self):
+        frames = max(1, self.frames)
+        return {
+            "frames": self.frames,
+            "located_pct": 100.0 * self.located / frames,
+            "solve_ms_mean": self.solve_ns / frames / 1e6,
+        }
+
+
+if __name__ == "__main__":
+    from AprilTagTracker import Tag
+
+    # Six tags on the walls of a 2 m x 2 m area, robot at (0.4, -0.2) facing 20 degrees
+    intrinsics = CameraIntrinsics.from_fov((640, 480))
+    tag_map = TagMap({0: TagMap.wall(1.0, -0.3, 0.15, 180), 1: TagMap.wall(1.0, 0.0, 0.15, 180),
+                      2: TagMap.wall(1.0, 0.3, 0.15, 180), 3: TagMap.wall(0.6, 1.0, 0.15, -90),
+                      4: TagMap.wall(1.0, 0.6, 0.15, 180), 5: TagMap.wall(-1.0, 0.0, 0.15, 0)}, size=0.1)
+    localizer = TagLocalizer(intrinsics, tag_map, camera_pose=(0.08, 0.0, 0.12, 0.0))
+    world_T_robot = pose_matrix(0.4, -0.2, 0.0, 20.0)
+    world_T_camera = np.linalg.inv(localizer._camera_T_robot @ np.linalg.inv(world_T_robot))
+    camera_T_world = np.linalg.inv(world_T_camera)
+    tags = []
+    for tag_id in range(6):
+        points = np.c_[tag_map.corners[tag_id], np.ones(4)] @ camera_T_world.T
+        if np.all(points[:, 2] > 0.05):
+            pixels = points[:, :2] / points[:, 2:3] * intrinsics.focal + intrinsics.camera_matrix[:2, 2]
+            if np.all((pixels >= 0) & (pixels < (640, 480))):
+                tags.append(Tag(tag_id, "tag36h11", pixels.mean(axis=0), pixels, None, 0))
+    for i in range(3):
+        pose = localizer.locate(tags, timestamp_ns=int(i * 1e9 / 30))
+    print(pose)
+    print(localizer.tag_poses(tags)[:2])
+    print(localizer.stats())
@@ -0,0 +1,118 @@
+import numpy as np
+
+from TFLiteDetector import DETECTION_DTYPE, dequantize
+
+
+def nms(boxes, scores, iou_threshold=0.45, max_detections=100):
+    """
+    Greedy non-max suppression.
+
+    :param boxes: (N, 4) float array of x1, y1, x2, y2
+    :param scores: (N,) float array
+    :return: Indices of the kept boxes, best first
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(scores)[::-1]
+    keep = []
+    while order.size and len(keep) < max_detections:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        # IoU of the best remaining box with all others, in one vectorized step
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.intp)
+
+
+class YOLODecoder:
+    """
+    Decodes the raw YOLOv5 output tensor (N, 5 + classes rows of x, y, w, h,
+    objectness, class probabilities) into detections.
+
+    Rows are masked by objectness first, so the class argmax, the xywh to
+    xyxy conversion and the NMS only ever see the few candidates that can
+    pass; a typical frame keeps tens of the 25200 rows. The score of a
+    detection is objectness times class probability, and NMS is class-aware
+    (boxes of different classes never suppress each other) by offsetting
+    every class into its own coordinate range.
+
+    Outputs of quantized models are decoded without dequantizing the whole
+    tensor: the objectness threshold is compared in the quantized domain and
+    only the surviving rows are converted to float.
+
+    Example usage:
+        >>> decoder = YOLODecoder(score_threshold=0.4, iou_threshold=0.45)
+        >>> detections = decoder.decode(interpreter.get_tensor(output_index))
+        >>> for d in detections:
+        ...     print(d["class_id"], d["score"], d["xmin"], d["ymin"])
+    """
+
+    def __init__(self, score_threshold=0.4, iou_threshold=0.45, max_candidates=300, max_detections=100):
+        """
+        :param score_threshold: Minimum objectness, and minimum final score, of a detection
+        :param iou_threshold: Overlap above which the weaker box of the same class is dropped
+        :param max_candidates: Best-scoring candidates passed to NMS
+        :param max_detections: Detections returned at most
+        """
+        self.score_threshold = score_threshold
+        self.iou_threshold = iou_threshold
+        self.max_candidates = max_candidates
+        self.max_detections = max_detections
+        # Statistics
+        self.candidates = 0
+
+    def decode(self, output, quantization=None):
+        """
+        (1, N, 5 + classes) or (N, 5 + classes) output -> DETECTION_DTYPE array, best first
+
+        :param quantization: (scale, zero_point) of a quantized output tensor, None for float
+        """
+        rows = output[0] if output.ndim == 3 else output
+        if quantization is None:
+            candidates = rows[rows[:, 4] > self.score_threshold]
+        else:
+            scale, zero_point = quantization
+            threshold = self.score_threshold / scale + zero_point  # same test on the raw values
+            candidates = dequantize(rows[rows[:, 4] > threshold], quantization)
+        if len(candidates):
+            class_id = np.argmax(candidates[:, 5:], axis=1)
+            scores = candidates[:, 4] * candidates[np.arange(len(candidates)), 5 + class_id]
+            passed = scores > self.score_threshold
+            candidates, class_id, scores = candidates[passed], class_id[passed], scores[passed]
+        self.candidates += len(candidates)
+        if not len(candidates):
+            return np.empty(0, dtype=DETECTION_DTYPE)
+        if len(candidates) > self.max_candidates:
+            best = np.argpartition(scores, -self.max_candidates)[-self.max_candidates:]
+            candidates, class_id, scores = candidates[best], class_id[best], scores[best]
+        xy, half = candidates[:, 0:2], candidates[:, 2:4] / 2
+        boxes = np.concatenate((xy - half, xy + half), axis=1)
+        # Class-aware NMS in one pass: each class lives in its own coordinate range
+        offsets = class_id[:, np.newaxis] * (float(np.abs(boxes).max()) + 1.0)
+        keep = nms(boxes + offsets, scores, self.iou_threshold, self.max_detections)
+        detections = np.empty(len(keep), dtype=DETECTION_DTYPE)
+        detections["xmin"], detections["ymin"] = boxes[keep, 0], boxes[keep, 1]
+        detections["xmax"], detections["ymax"] = boxes[keep, 2], boxes[keep, 3]
+        detections["score"] = scores[keep]
+        detections["class_id"] = class_id[keep]
+        return detections
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    output = rng.uniform(0, 1, size=(1, 25200, 85)).astype(np.float32)
+    output[..., 4] *= 0.05                     # background rows: low objectness
+    objects = rng.choice(25200, 60, replace=False)
+    output[0, objects, 4] = 0.9                # a few objects, each seen by several anchors
+    decoder = YOLODecoder()
+    start = time.perf_counter()
+    for _ in range(100):
+        detections = decoder.decode(output)
+    print(f"decode: {(time.perf_counter() - start) * 10:.2f} ms per frame, {len(detections)} detections")
+    print(detections[:3])
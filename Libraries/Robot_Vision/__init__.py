@@ -0,0 +1,74 @@
+"""
+Robot Vision Library
+====================
+
+Shared camera and vision infrastructure for the MobileRobot examples.
+
+Features:
+- CameraService: single owner of the Picamera2 camera
+- FrameRing: fixed ring of preallocated frame buffers with sequence numbers and timestamps
+- Zero-copy multi-consumer reads; slow consumers skip frames instead of stalling capture
+- Grayscale stream from the lores YUV420 Y plane (no color conversion); capture_config helper
+- FrameExchange: sequence-numbered buffer-swapping handoff between one producer and one consumer
+- BlobTracker: color blob tracking in a predicted ROI with a downscaled global search when lost
+- ColorLUT: HSV color bounds compiled into a quantized color -> class lookup table (no per-frame HSV conversion)
+- LineDetector: scanline line detection (band column histograms, offset/heading/curvature) with PDSteering
+- Display: debug display (none, window or localhost MJPEG stream) with signal-based quit
+- TFLiteDetector: SSD TFLite detector with allocation-free preprocessing and structured-array detections
+- Float and uint8/int8 quantized models end to end (input lookup table, output dequantized on use), optional XNNPACK
+- TFGraphDetector: TF Object Detection API frozen graph with tensors resolved once, warm-up and one sess.run per frame
+- AprilTagTracker: persistent AprilTag detector (decimation, threads) searching ROIs around known tags
+- ObjectTracker: KCF on a downscaled frame with template confidence/scale checks and re-detection when lost
+- MotionGate: skips heavy vision stages while the scene and the wheels are still (thumbnail change score, keep-alive)
+- GesturePipeline: MediaPipe hand landmarks on a worker thread, predicted between results; GestureSteering
+- QRTracker: multi-code QR reading (downscaled detection, crop decodes, stable codes skipped)
+- TagLocalizer: tag and robot poses from a known tag map (cached intrinsics, one PnP solve per frame)
+- DetectionPipeline: capture, preprocess and inference stages overlapping on bounded queues, with per-stage stats
+- ModelRegistry: models, labels and palettes loaded once, with a ready interpreter per thread
+- MaskRenderer: segmentation label maps to RGBA overlays in one palette lookup into reused buffers
+- YOLODecoder: vectorized YOLOv5 output decoding (objectness pre-filter, class-aware NumPy NMS)
+
+Example usage:
+    >>> from CameraService import CameraService
+    >>> camera = CameraService(size=(640, 480), vflip=True).start()
+    >>> detector, display = camera.reader("detector"), camera.reader("display")
+    >>> frame = detector.get(timeout=1)
+    >>> print(frame.seq, frame.array.shape)
+"""
+
+from .CameraService import CameraService, FrameRing, FrameReader, Frame, frame_shape, capture_config, y_plane
+from .FrameExchange import FrameExchange, ExchangedFrame
+from .BlobTracker import BlobTracker, Blob, hsv_mask, largest_component
+from .ColorLUT import ColorLUT
+from .LineDetector import LineDetector, LineEstimate, PDSteering
+from .Display import Display
+from .TFLiteDetector import (TFLiteDetector, DETECTION_DTYPE, load_interpreter, load_labels, quantization, input_lut,
+                             dequantize, resize_rgb)
+from .TFGraphDetector import TFGraphDetector
+from .AprilTagTracker import AprilTagTracker, Tag, make_tag_detector
+from .ObjectTracker import ObjectTracker, Target, make_tracker_factory
+from .MotionGate import MotionGate, encoder_motion
+from .GesturePipeline import GesturePipeline, GestureSteering, Hand, mediapipe_hands, HAND_CONNECTIONS
+from .QRTracker import QRTracker, QRCode
+from .TagLocalizer import TagLocalizer, CameraIntrinsics, TagMap, TagPose, RobotPose, pose_matrix
+from .DetectionPipeline import DetectionPipeline, StageStats, Result
+from .ModelRegistry import ModelRegistry, Model, registry
+from .MaskRenderer import MaskRenderer
+from .YOLODecoder import YOLODecoder, nms
+
+__version__ = "1.0.0"
+__author__ = "JIaLeChye"
+__email__ = "jialecjl2016@outlook.com"
+__license__ = "MIT"
+
+__all__ = ["CameraService", "FrameRing", "FrameReader", "Frame", "frame_shape", "capture_config", "y_plane",
+           "FrameExchange", "ExchangedFrame", "BlobTracker", "Blob", "hsv_mask", "largest_component",
+           "ColorLUT", "LineDetector", "LineEstimate", "PDSteering", "Display",
+           "TFLiteDetector", "DETECTION_DTYPE", "load_interpreter", "load_labels", "quantization",
+           "input_lut", "dequantize", "resize_rgb", "TFGraphDetector",
+           "AprilTagTracker", "Tag", "make_tag_detector",
+           "ObjectTracker", "Target", "make_tracker_factory",
+           "MotionGate", "encoder_motion", "GesturePipeline", "GestureSteering", "Hand", "mediapipe_hands", "HAND_CONNECTIONS",
+           "QRTracker", "QRCode", "TagLocalizer", "CameraIntrinsics", "TagMap", "TagPose", "RobotPose", "pose_matrix",
+           "DetectionPipeline", "StageStats", "Result", "ModelRegistry", "Model", "registry",
+           "MaskRenderer", "YOLODecoder", "nms"]
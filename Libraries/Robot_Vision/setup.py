@@ -0,0 +1,36 @@
+from setuptools import setup, find_packages
+
+setup(
+    name="robot-vision-lib",
+    version="1.0.0",
+    description="Shared camera and vision infrastructure for the MobileRobot examples",
+    long_description="Shared camera and vision infrastructure for the MobileRobot examples, including a camera capture service that fills a ring of preallocated frame buffers read by several consumers without copying.",
+    long_description_content_type="text/plain",
+    author="JIaLeChye",
+    author_email="jialecjl2016@outlook.com",
+    url="https://github.com/JIaLeChye/MobileRobot",
+    packages=find_packages(),
+    py_modules=["CameraService", "FrameExchange", "BlobTracker", "ColorLUT", "LineDetector", "Display", "TFLiteDetector",
+                "DetectionPipeline", "ModelRegistry", "MaskRenderer",
+                "YOLODecoder", "TFGraphDetector", "AprilTagTracker", "TagLocalizer",
+                "QRTracker", "GesturePipeline", "ObjectTracker",
+                "MotionGate"],
+    install_requires=["numpy"],
+    python_requires=">=3.8",
+    classifiers=[
+        "Development Status :: 4 - Beta",
+        "Intended Audience :: Developers",
+        "Intended Audience :: Education",
+        "License :: OSI Approved :: MIT License",
+        "Operating System :: POSIX :: Linux",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Topic :: Multimedia :: Video :: Capture",
+        "Topic :: Education",
+        "Topic :: Scientific/Engineering :: Image Recognition",
+    ],
+    keywords="raspberry-pi, robotics, camera, picamera2, computer-vision",
+)
@@ -1,5 +1,6 @@
 import RPi.GPIO as GPIO
 import time
+from SensorSample import Sample
 
 __version__ = "1.0.3"
 
@@ -132,6 +133,33 @@ class Ultrasonic:
                 print(f"Error measuring distance on pin {pin}: {e}")
             return None
 
+    def sensor_id(self, pin):
+        """Sample sensor_id for a pin, e.g. "ultrasonic/front" """
+        names = {self.Left_sensor: "left", self.Front_sensor: "front", self.Right_sensor: "right"}
+        return f"ultrasonic/{names.get(pin, pin)}"
+
+    def get_sample(self, pin):
+        """
+        Measures distance like get_distance() but returns a timestamped Sample.
+        The timestamp is taken when the trigger pulse is sent.
+        :return: Sample with the distance in cm (valid=False if the measurement failed)
+        """
+        timestamp_ns = time.monotonic_ns()
+        distance = self.get_distance(pin)
+        return Sample(distance, self.sensor_id(pin), timestamp_ns)
+
+    def samples(self):
+        """
+        Timestamped version of distances().
+        :return: Tuple of (Left, Front, Right) Samples
+        """
+        Left = self.get_sample(self.Left_sensor)
+        time.sleep(0.1)  # Small delay between sensors
+        Front = self.get_sample(self.Front_sensor)
+        time.sleep(0.1)
+        Right = self.get_sample(self.Right_sensor)
+        return Left, Front, Right
+
     def get_distance_average(self, pin, samples=3, delay=0.1):
         """
         Gets multiple distance readings and returns the average for better accuracy.
@@ -9,12 +9,15 @@ Features:
 - Obstacle detection
 - Multiple sensor support
 - Averaged readings for accuracy
+- Timestamped Sample readings (see Robot_Core SensorSample)
 
 Example usage:
     >>> from Ultrasonic_sens import Ultrasonic
     >>> sensor = Ultrasonic()
     >>> left, front, right = sensor.distances()
     >>> print(f"Front distance: {front}cm")
+    >>> left, front, right = sensor.samples()
+    >>> print(front.value, front.timestamp_ns, front.valid)
 """
 
 from .Ultrasonic_sens import Ultrasonic
@@ -13,6 +13,7 @@ setup(
     py_modules=["Ultrasonic_sens"],
     install_requires=[
         "rpi-lgpio>=0.4",
+        "robot-core-lib>=1.0.0",
     ],
     python_requires=">=3.7",
     classifiers=[
@@ -1,8 +1,6 @@
-from picamera2 import Picamera2
-from libcamera import controls, Transform 
-import cv2
-import numpy as np
-import time
+from CameraService import CameraService
+from LineDetector import LineDetector, PDSteering
+from Display import Display
 from RPi_Robot_Hat_Lib import RobotController 
 
 def init():
@@ -11,10 +9,10 @@ def init():
 
     Returns
     -------
-    picamera2.Picamera2
-        The initialized Picamera2 object.
+    CameraService
+        The started camera capture service.
     """
-    global picam2, horizontal, vertical, frame_center, Motor, enc
+    global camera, frames, horizontal, vertical, frame_center, Motor, enc
     # Initialise the Motor
     Motor = RobotController()
     
@@ -26,84 +24,60 @@ def init():
     Motor.set_servo(vertical, 90)
     Motor.set_servo(horizontal,180 )
 
-    # Set preview configuration (modify resolution as needed)
-    picam2 = Picamera2()
-    config = picam2.create_preview_configuration(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1))
-    picam2.configure(config)
-    picam2.start()  # Start camera preview
-    ## Continous Auto Focus 
-    picam2.set_controls({"AfMode": controls.AfModeEnum.Continuous})
+    # Start the camera capture service (modify resolution as needed)
+    # It owns the camera, runs continuous autofocus and captures in the background.
+    # The line detector reads the grayscale Y plane of the 320x240 lores stream;
+    # the RGB main stream is only used for the display.
+    camera = CameraService(size=(640, 480), format='RGB888', vflip=True, lores=(320, 240)).start()
+    frames = camera.reader("line", stream="gray")
 
-    frame_center = (picam2.preview_configuration.main.size[0] // 2 ,
-                    picam2.preview_configuration.main.size[1] // 2)
+    frame_center = camera.frame_center
 
 
-    return picam2
+    return camera
 
 def main():
     """
-    main fucntion is to perform object tracking and motor control 
+    main function samples a few bands at the bottom of the frame for the line
+    and steers with PD control on its offset and heading
     """
-    global picam2, frame_center, Motor
+    global camera, frames, frame_center, Motor
 
     init()
-
-    while True:
-        frame = picam2.capture_array()
-        
-        
-        hsv_frame = cv2.cvtColor(frame, cv2.COLOR_RGB2HSV)
-        Black_lower = np.array([0,0,0], dtype = "uint8")
-        Black_upper = np.array([179, 255, 118], dtype = "uint8")
-        Blacklines = cv2.inRange(frame, Black_lower, Black_upper)
-            
-                                  
-        canny_edges = cv2.Canny(Blacklines, 50, 150)
-        
-        contours, _  = cv2.findContours(Blacklines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if len(contours) > 0 :
-            for contour in contours:
-                cv2.drawContours(frame, [contour] , 0 , (0,255,0), 2)
-                
-            
-        frame_offset = (0,0)
-        if len(contours) > 0:
-            largeset = max(contours, key = cv2.contourArea)
-            cv2.drawContours(frame, largeset , 0 , (0,0,255), 5)
-            
-            M = cv2.moments(largeset)
-            cx = int(M["m10"] / M["m00"]) if M["m00"] != 0 else 0
-            cy = int(M["m01"] / M["m00"]) if M["m00"] != 0 else 0
-#             frame_offset = (cx - frame_center[0], cy - frame_center[1])
-            cv2.putText(frame, f" Offset: X = {cx}, Y: = {cy}",
-                        (10,20), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0,255,255), 2 )
-            
-            if cx >= 350:
-                print("Going Left")
-                Motor.move(speed=0, turn=-30)
-            
-            if cx < 350 and cx > 300:
-                print("On track")
-                Motor.Forward(40)
-            if cx < 300:
-                print("Going Right")
-                Motor.move(speed =0 , turn=30)
-
-      
-            
-            cv2.circle(frame, (cx,cy),5,(255,255,0),-1)
+    # ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+    display = Display.from_env("Line Following")
+    # Only copy the RGB main stream when something can show it
+    shown_frames = camera.reader("display") if display.mode != "none" else None
+    # Dark line on a light floor; only the band rows are thresholded
+    detector = LineDetector(bands=5, roi=(0.5, 0.95), threshold=118, line_width=20)
+    steering = PDSteering(kp=40, kd=6, k_heading=20, base_speed=40)
+    lost = 0
+
+    while display.running:
+        captured = frames.get(timeout=1)
+        if captured is None:
+            continue
+
+        line = detector.detect(captured.array, captured.timestamp_ns)
+        if line is not None:
+            lost = 0
+            speed, turn = steering.update(line)
+            Motor.move(speed=speed, turn=turn)
         else:
-            Motor.Brake()
-            print("Nothing Detected")
+            lost += 1
+            steering.reset()
+            if lost == 1:
+                Motor.Brake()
+                print("Nothing Detected")
 
+        if display.wants_frame():
+            shown = shown_frames.get(timeout=0)
+            if shown is not None:
+                # The ring buffer is shared with other consumers; draw on a copy
+                display.show(detector.draw(shown.array.copy(), line))
 
-        cv2.imshow("Black Lines", Blacklines)
-        cv2.imshow("Edge Detection", canny_edges)
-        cv2.imshow("Main", frame) 
-    
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break 
+    display.close()
+    print(detector.stats())
 
         
 try:
@@ -117,6 +91,5 @@ except KeyboardInterrupt:
 finally:
     Motor.Brake()
     Motor.cleanup()
-    cv2.destroyAllWindows()
-    picam2.stop()
+    camera.stop()
     exit()
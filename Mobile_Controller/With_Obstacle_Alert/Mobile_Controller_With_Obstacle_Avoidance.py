@@ -3,6 +3,8 @@ import BlynkLib
 import time
 from Ultrasonic_sens import Ultrasonic 
 from IRSens import IRsens 
+from SharedState import SharedState
+from RobotBus import Bus, Poller, LATEST, QUEUE
 AUTH = "thhcE_N3Hi7WQTq-K2jHJQC-5x1ng-jZ"
 
 
@@ -12,9 +14,42 @@ print("Motor Controller Initialized")
 blynk = BlynkLib.Blynk(AUTH) 
 print("Blynk Connection Established")
 Motor.Brake()
-obstacleSens = Ultrasonic(debug=False)
-ReverseSens = IRsens()
-print("Initialising Obstacle Detection")
+LOOP_PERIOD = 0.1 # Seconds; the control loop only reads the bus, sensors are polled on their own threads
+RANGE_RATE = 4 # Hz (one ultrasonic cycle reads all three sensors ~0.25s)
+IR_RATE = 50 # Hz, shared state IR polling (the GPIO path is edge-triggered)
+STATE_MAX_AGE = 1 # Seconds before an ultrasonic reading is considered stale
+# The state server owns the sensors when it runs: read its shared memory instead
+# of claiming the same GPIO lines a second time. Otherwise open them here.
+shared_state = SharedState.attach()
+obstacleSens = None
+ReverseSens = None
+if shared_state is None:
+	obstacleSens = Ultrasonic(debug=False)
+	ReverseSens = IRsens()
+	print("Initialising Obstacle Detection")
+else:
+	print("Reading obstacle sensors from the state server")
+
+# Sensors publish on the bus; the control loop and the rear brake subscribe
+bus = Bus()
+bus.topic("sensor/ultrasonic", kind=LATEST)
+bus.topic("sensor/ir", kind=QUEUE) # every transition matters
+
+# Rear obstacles brake straight from the publishing thread (GPIO event or
+# shared state poller) instead of waiting for the next pass of the main loop
+rear_obstacle = None
+def reverse_obstacle(message):
+	global rear_obstacle
+	value = message.value.value
+	if value == 1 and rear_obstacle != 1:
+		Motor.Brake()
+		print("CAUTION OBSTACLE AT THE BACK")
+	rear_obstacle = value
+
+bus.subscribe("sensor/ir", callback=reverse_obstacle)
+if ReverseSens is not None:
+	bus.publish("sensor/ir", ReverseSens.sample())
+	ReverseSens.on_change(lambda event: bus.publish("sensor/ir", event))
 
 Freq = 0
 blynk.virtual_write(4,Freq)
@@ -100,12 +135,36 @@ def blynk_connected():
 			pass
 	blynk.sync_virtual(0,1,2,3,4)
 
+def read_distances():
+	"""Ultrasonic distances from the state server's shared memory when it is
+	running, otherwise straight from the sensors."""
+	if shared_state is None:
+		return obstacleSens.distances()
+	sample = shared_state.read_sample("ultrasonic")
+	if sample.valid and sample.age() < STATE_MAX_AGE:
+		return sample.value["left"], sample.value["front"], sample.value["right"]
+	return None, None, None
+
+pollers = [Poller(bus, "sensor/ultrasonic", read_distances, RANGE_RATE)]
+if shared_state is not None:
+	pollers.append(Poller(bus, "sensor/ir", lambda: shared_state.read_sample("ir"), IR_RATE))
+
+def latest_distances():
+	"""Newest ultrasonic distances on the bus, (None, None, None) if missing or stale"""
+	message = bus.latest("sensor/ultrasonic")
+	if message is None or time.monotonic_ns() - message.timestamp_ns > STATE_MAX_AGE * 1e9:
+		return None, None, None
+	return message.value
+
 def main():
 	
+	for poller in pollers:
+		poller.start()
+	next_tick = time.monotonic()
 	while True: 
 		blynk.run()
-		left,front,right = obstacleSens.distances()
-		Reverse = ReverseSens.status() 
+		left,front,right = latest_distances()
+		Reverse = rear_obstacle # newest IR state, no GPIO access
 		# print("Reverse: "+ str(Reverse))
 
 		# print("Left: %.2f, Front: %.2f, Right: %.2f" % (left, front, right))
@@ -139,6 +198,12 @@ def main():
 			blynk.connect()
 		else:
 			pass
+		next_tick += LOOP_PERIOD
+		delay = next_tick - time.monotonic()
+		if delay > 0:
+			time.sleep(delay)
+		else:
+			next_tick = time.monotonic()  # fell behind: do not try to catch up
 			
 			
 
@@ -155,8 +220,16 @@ except KeyboardInterrupt:
   Freq = 0 
   blynk.virtual_write(4, Freq)
   blynk.virtual_write(8, Freq)
+  for poller in pollers:
+    poller.stop(timeout=1)
   Motor.cleanup()
-  obstacleSens.cleanup()
+  # Sensors owned by the state server are left alone
+  if ReverseSens is not None:
+    ReverseSens.cleanup()
+  if obstacleSens is not None:
+    obstacleSens.cleanup()
+  if shared_state is not None:
+    shared_state.close()
 
 
 
@@ -2,7 +2,6 @@
 ## Object detection and image processing 
 import tensorflow as tf 
 from object_detection.utils import label_map_util
-from object_detection.utils import visualization_utils as viz_utils 
 import object_detection as od_pkg
 
 # TensorFlow 2.x compatibility for TF1-style code used by Object Detection API utils
@@ -19,15 +18,19 @@ import time
 
 ## Image aquation and atftyer processing process 
 import cv2
-import numpy as np
-from picamera2 import Picamera2 
-from libcamera import controls, Transform 
+from CameraService import CameraService
+from Display import Display
+from TFGraphDetector import TFGraphDetector
+from MotionGate import MotionGate
 
 
 
 ## define global variables 
 frame_height = 480 
 frame_width = 640
+# Detector input: the SSDLite graph resizes to 300x300 internally, so feeding
+# that size skips the in-graph resize of the full frame
+input_size = (300, 300)
 
 ## Load the Model Folder 
 model_folder = 'object_detection'
@@ -119,95 +122,90 @@ if not isCKPTexist:
 if not isLabelexist:
     raise FileNotFoundError(f"Missing label map: {path_to_labels}. Ensure TensorFlow Object Detection API is installed or provide the file locally.")
 
-## load the Tensorflow Detection Graph
-print("Loading tensorflow Graph....")
-detection_graph = tf.Graph()
-with detection_graph.as_default():
-    od_graph_def = tf.compat.v1.GraphDef()
-    with tf.io.gfile.GFile(path_To_ckpt, 'rb') as fid:
-        serialized_graph = fid.read()
-        od_graph_def.ParseFromString(serialized_graph)
-        tf.import_graph_def(od_graph_def, name='')
-
+## Label map
 label_map = label_map_util.load_labelmap(path_to_labels)
 categories = label_map_util.convert_label_map_to_categories(label_map, max_num_classes=number_Class, use_display_name=True)
 category_index = label_map_util.create_category_index(categories)
-print("Graph Loading Process Complete!")
 
-## Initialize Picamera2 Library 
+## load the Tensorflow Detection Graph (tensors resolved once, session warmed up)
+print("Loading tensorflow Graph....")
+detector = TFGraphDetector(path_To_ckpt, labels=category_index, input_size=input_size, score_threshold=0.5)
+print(f"Graph Loading Process Complete! (warm-up {detector.warmup_ms:.0f} ms)")
 
-cam = Picamera2()
+## Start the camera capture service (owns the camera, continuous auto focus)
 
-cam.configure(cam.create_preview_configuration(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1)))
-cam.start()
-cam.set_controls({"AfMode":controls.AfModeEnum.Continuous}) # Enable auto focus 
+cam = CameraService(size=(frame_width, frame_height), format='RGB888', vflip=True).start()
+frames = cam.reader("detector")
  
 ## Object detection Function
 def object_detect(): 
-    
-     with detection_graph.as_default():
-        with tf.compat.v1.Session(graph=detection_graph) as sess:
-            while True:
-                ## Start the capturing the frame 
-                frame = cam.capture_array()
-                bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                ## tidy up the captured frame array 
-                image_np_expanded = np.expand_dims(bgr, axis=0)
-                ## start detection 
-                image_tensor = detection_graph.get_tensor_by_name('image_tensor:0')
-                boxes_tensor = detection_graph.get_tensor_by_name('detection_boxes:0')
-                scores_tensor = detection_graph.get_tensor_by_name('detection_scores:0')
-                classes_tensor = detection_graph.get_tensor_by_name('detection_classes:0')
-                num_detections_tensor = detection_graph.get_tensor_by_name('num_detections:0')
-
-                (boxes, scores, classes, num_detections) = sess.run(
-                                                                    [boxes_tensor, scores_tensor, classes_tensor, num_detections_tensor],
-                                                                    feed_dict={image_tensor: image_np_expanded})
-                
-                ## When Object detected
-                for i in range(0,10):
-                    if scores[0][i] > 0.5:
-                        
-                        print("Object:", category_index[classes[0][i]]['name'])
-                        print("Score:", scores[0][i])
-                        
-                        ## Draw boxes for the detected object
-                        viz_utils.visualize_boxes_and_labels_on_image_array(
-                                bgr,
-                                np.squeeze(boxes),
-                                np.squeeze(classes).astype(np.int32),
-                                np.squeeze(scores),
-                                category_index,
-                                use_normalized_coordinates=True,
-                                line_thickness=2)
-                        ## get the coordinates of the detected object
-                        box = boxes[0][i]
-                        ymin, xmin, ymax, xmax = box
-                        im_height, im_width, _ = frame.shape 
-                        left = int(xmin * im_width)
-                        right = int(xmax * im_width)
-                        top = int(ymin * im_height)
-                        bottom = int(ymax * im_height)
-                        center_y = int((left + right) // 2)
-                        center_x = int((top + bottom) // 2)
-                        print("Coordinates: ", "\nX: ", center_x, "\nY: ", center_y)
-                  
-
-                        ## When the specific object is selected  
-                        if category_index[classes[0][i]]['name'] == 'bottle':
-                            coordinates = [center_y, center_x] 
-
-                            # movement(coordinates)
-                            object_detected = True
-                        else:
-                            object_detected = False
-
-
-                    frame = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-                    cv2.imshow("main", frame)
-
-                    if cv2.waitKey(1) == ord('q'):
-                        break
+    # ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+    display = Display.from_env("main")
+    buffer = detector.new_input()
+    runs, infer_ns = 0, 0
+    # The graph only runs when the scene changed or once a second; otherwise the
+    # last detections are reused
+    gate = MotionGate(keep_alive_s=1.0)
+    detections = []
+    try:
+        while display.running:
+            ## Start the capturing the frame 
+            captured = frames.get(timeout=1)
+            if captured is None:
+                continue
+            fresh = gate.should_run(captured.array, captured.timestamp_ns)
+            ## Resize and convert into the reused input buffer, then one sess.run per frame
+            if fresh:
+                detector.preprocess(captured.array, buffer)
+            # The ring slot is shared with the capture thread: keep a copy only for a viewer
+            shown = captured.array.copy() if display.wants_frame() else None
+            frames.release()
+            if fresh:
+                start = time.monotonic_ns()
+                detections = detector.infer(buffer)
+                infer_ns += time.monotonic_ns() - start
+                runs += 1
+
+            ## When Object detected
+            object_detected = False
+            boxes = []
+            for detection in detections:
+                label = detector.label(detection["class_id"])
+                if fresh:
+                    print("Object:", label)
+                    print("Score:", detection["score"])
+                ## get the coordinates of the detected object
+                left = int(detection["xmin"] * frame_width)
+                right = int(detection["xmax"] * frame_width)
+                top = int(detection["ymin"] * frame_height)
+                bottom = int(detection["ymax"] * frame_height)
+                center_x = int((left + right) // 2)
+                center_y = int((top + bottom) // 2)
+                if fresh:
+                    print("Coordinates: ", "\nX: ", center_x, "\nY: ", center_y)
+                boxes.append((left, top, right, bottom, f"{label}: {detection['score']:.0%}"))
+
+                ## When the specific object is selected  
+                if label == 'bottle':
+                    coordinates = [center_x, center_y]
+
+                    # movement(coordinates)
+                    object_detected = True
+
+            ## Draw all boxes once per frame (only when someone is watching)
+            if shown is not None:
+                for left, top, right, bottom, text in boxes:
+                    cv2.rectangle(shown, (left, top), (right, bottom), (0, 255, 0), 2)
+                    cv2.putText(shown, text, (left, max(top - 8, 12)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+                cv2.putText(shown, f"inference : {infer_ns / max(1, runs) / 1e6:.0f} ms", (10, 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+                display.show(shown)
+    finally:
+        display.close()
+        detector.close()
+        if runs:
+            print(f"{runs} inferences, mean inference {infer_ns / runs / 1e6:.1f} ms")
+        print(gate.stats())
 
 
 def main():
@@ -223,6 +221,6 @@ except KeyboardInterrupt:
     pass
  
 finally:
-    cam.close() 
+    cam.stop() 
     exit()
 
@@ -1,20 +1,20 @@
-## Tensorflow Lite Library
-import tflite_runtime.interpreter as tflite
+## Tensorflow Lite detector and the capture -> preprocess -> inference pipeline
+from TFLiteDetector import TFLiteDetector
+from DetectionPipeline import DetectionPipeline
+from MotionGate import MotionGate, encoder_motion
 
 ## For Image processing 
 import cv2
-import numpy as np
 
 ## To capture the frames from the camera
-from picamera2 import Picamera2
-from libcamera import controls, Transform
+from CameraService import CameraService
+
+## Debug display (none / window / MJPEG stream)
+from Display import Display
 
 ## For validation of the model and label files 
 import os
 
-## To get the accurate time 
-import time 
-
 ## Control the Servo Pan Tilt HAT 
 from RPi_Robot_Hat_Lib import RobotController 
 # Verify the model and label files
@@ -55,81 +55,89 @@ Motor.set_servo(horizontal, 90)
 # Start the camera
 frame_height = 480
 frame_width = 640
-cam = Picamera2()
-cam.configure(cam.create_preview_configuration(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1)))
-cam.start()
-cam.set_controls({"AfMode": controls.AfModeEnum.Continuous})
+cam = CameraService(size=(frame_width, frame_height), format='RGB888', vflip=True).start()
+frames = cam.reader("detector")
 
 
 
-# Object Detection function
-def object_detection():
-    interpreter = tflite.Interpreter(model_path=model_path)
-    interpreter.allocate_tensors()
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
-    height = input_details[0]['shape'][1]
-    width = input_details[0]['shape'][2]
-    
-    
-    while True:
-        frame = cam.capture_array()
-        t_start = time.time()
-        fps = 0
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        resized_frame = cv2.resize(rgb_frame, (width, height))
-        input_data = np.expand_dims(resized_frame, axis=0)
-
-        if input_details[0]['dtype'] == np.float32:
-            input_data = (np.float32(input_data) - 127.5) / 127.5
-
-        interpreter.set_tensor(input_details[0]['index'], input_data)
-        interpreter.invoke()
-
-        detected_boxes = interpreter.get_tensor(output_details[0]['index'])[0]
-        detected_classes = interpreter.get_tensor(output_details[1]['index'])[0]
-        detected_scores = interpreter.get_tensor(output_details[2]['index'])[0]
-        num_boxes = int(interpreter.get_tensor(output_details[3]['index'])[0])
-
-        for i in range(num_boxes):
-            if detected_scores[i] > 0.5:
-                ymin, xmin, ymax, xmax = detected_boxes[i]
-                im_height, im_width, _ = frame.shape
-                left = int(xmin * im_width)
-                right = int(xmax * im_width)
-                top = int(ymin * im_height)
-                bottom = int(ymax * im_height)
-
-                center_x = int((left + right) // 2)
-                center_y = int((top + bottom) // 2)
-                print("Coordinates: ", "\nX: ", center_x, "\nY: ", center_y)
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+# Interpreter CPU threads (the Pi has 4 cores; capture and preprocessing run alongside)
+NUM_THREADS = 3
+# Viewer refresh rate; it does not depend on how often the (gated) model runs
+DISPLAY_RATE = 30
 
-                # Ensure detected class index is within the range of labels
-                class_id = int(detected_classes[i])
-                if class_id in labels:
-                    label = labels[class_id]
-                else:
-                    label = 'Unknown'
 
-                # Debugging output to verify label and class index
-                print(f"Detected class ID: {class_id}, Label: {label}, Score: {detected_scores[i]}")
+# Pixel boxes of one Result (printed once per inference)
+def boxes_of(result, detector):
+    boxes = []
+    for detection in result.detections:
+        left = int(detection["xmin"] * frame_width)
+        right = int(detection["xmax"] * frame_width)
+        top = int(detection["ymin"] * frame_height)
+        bottom = int(detection["ymax"] * frame_height)
 
-                cv2.putText(frame, label, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2) 
+        center_x = int((left + right) // 2)
+        center_y = int((top + bottom) // 2)
+        print("Coordinates: ", "\nX: ", center_x, "\nY: ", center_y)
+
+        class_id = int(detection["class_id"])
+        label = detector.label(class_id)
+
+        # Debugging output to verify label and class index
+        print(f"Detected class ID: {class_id}, Label: {label}, Score: {detection['score']}")
+        boxes.append((left, top, right, bottom, label))
+    return boxes
 
-        fps += 1
-        mfps = fps / (time.time() - t_start)
-        cv2.putText(frame, "FPS : " + str(int(mfps)), (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-        cv2.imshow("main", frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+
+# Object Detection function
+def object_detection():
+    detector = TFLiteDetector(model_path, labels=labels, num_threads=NUM_THREADS, score_threshold=0.5)
+    # The model only runs when the scene changed, while the wheels turn, or once
+    # a second; otherwise the last detections stay current
+    gate = MotionGate(keep_alive_s=1.0, motion=encoder_motion(Motor.get_all_encoder_samples))
+    # Capture, preprocessing and inference overlap on separate threads
+    pipeline = DetectionPipeline(frames, detector, gate=gate).start()
+    # ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+    display = Display.from_env("main")
+    shown_frames = cam.reader("display") if display.mode != "none" else None
+
+    seq = 0
+    boxes = []
+    try:
+        while display.running:
+            # A still scene produces no new results: wake up at the display rate anyway
+            result = pipeline.wait(seq, timeout=1 / DISPLAY_RATE if display.mode != "none" else 1)
+            if result is not None:
+                seq = result.seq
+                boxes = boxes_of(result, detector)
+
+            # Rendering runs here, apart from the pipeline stages, and only for a viewer;
+            # the boxes of the last result are drawn until a new one arrives
+            if not display.wants_frame():
+                continue
+            shown = shown_frames.get(timeout=0)
+            if shown is None:
+                continue
+            # The ring buffer is shared with other consumers; draw on a copy
+            frame = shown.array.copy()
+            for left, top, right, bottom, label in boxes:
+                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+                cv2.putText(frame, label, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2) 
+            stats = pipeline.stats()
+            cv2.putText(frame, f"FPS : {stats['inference']['fps']:.1f}  latency : {stats['end_to_end']['ms_mean']:.0f} ms",
+                        (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+            display.show(frame)
+    finally:
+        pipeline.stop()
+        display.close()
+        pipeline.print_stats()
+        print(gate.stats())
 
 try:
     if __name__ == '__main__':
         object_detection()
 except KeyboardInterrupt:
+    pass
+finally:
     cam.stop()
     Motor.cleanup()
     print("Exiting")
-    exit()
-
@@ -24,8 +24,7 @@
 import argparse
 
 import cv2
-import numpy as np
-import tflite_runtime.interpreter as tflite
+from ModelRegistry import registry
 
 from picamera2 import MappedArray, Picamera2, Preview
 
@@ -35,16 +34,6 @@ lowresSize = (320, 240)
 rectangles = []
 
 
-def ReadLabelFile(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    ret = {}
-    for line in lines:
-        pair = line.strip().split(maxsplit=1)
-        ret[int(pair[0])] = pair[1].strip()
-    return ret
-
-
 def DrawRectangles(request):
     with MappedArray(request, "main") as m:
         for rect in rectangles:
@@ -56,39 +45,22 @@ def DrawRectangles(request):
 def InferenceTensorFlow(image, model, output, label=None):
     global rectangles
 
-    if label:
-        labels = ReadLabelFile(label)
-    else:
-        labels = None
-
-    interpreter = tflite.Interpreter(model_path=model, num_threads=4)
-    interpreter.allocate_tensors()
-
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
-    height = input_details[0]['shape'][1]
-    width = input_details[0]['shape'][2]
-    floating_model = False
-    if input_details[0]['dtype'] == np.float32:
-        floating_model = True
+    # Model, tensor details and labels are loaded once and cached; the
+    # interpreter is this thread's own, already allocated
+    net = registry.model(model)
+    labels = registry.labels(label)
 
     rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
     initial_h, initial_w, channels = rgb.shape
 
-    picture = cv2.resize(rgb, (width, height))
-
-    input_data = np.expand_dims(picture, axis=0)
-    if floating_model:
-        input_data = (np.float32(input_data) - 127.5) / 127.5
-
-    interpreter.set_tensor(input_details[0]['index'], input_data)
+    picture = cv2.resize(rgb, net.input_size)
 
-    interpreter.invoke()
+    interpreter = net.run(picture, mean=127.5, std=127.5)  # uint8/int8 models get mean/std folded into a lookup table
 
-    detected_boxes = interpreter.get_tensor(output_details[0]['index'])
-    detected_classes = interpreter.get_tensor(output_details[1]['index'])
-    detected_scores = interpreter.get_tensor(output_details[2]['index'])
-    num_boxes = interpreter.get_tensor(output_details[3]['index'])
+    detected_boxes = interpreter.get_tensor(net.output_indices[0])
+    detected_classes = interpreter.get_tensor(net.output_indices[1])
+    detected_scores = net.dequantize(2, interpreter.get_tensor(net.output_indices[2]))
+    num_boxes = interpreter.get_tensor(net.output_indices[3])
 
     rectangles = []
     for i in range(int(num_boxes)):
@@ -113,7 +85,10 @@ def main():
     parser.add_argument('--model', help='Path of the detection model.', required=True)
     parser.add_argument('--label', help='Path of the labels file.')
     parser.add_argument('--output', help='File path of the output image.')
+    parser.add_argument('--threads', type=int, default=4, help='Interpreter CPU threads.')
+    parser.add_argument('--no-xnnpack', action='store_true', help='Run without the XNNPACK delegate.')
     args = parser.parse_args()
+    registry.configure(num_threads=args.threads, xnnpack=not args.no_xnnpack)
 
     if (args.output):
         output_file = args.output
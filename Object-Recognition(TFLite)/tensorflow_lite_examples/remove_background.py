@@ -6,7 +6,8 @@ import argparse
 
 import cv2
 import numpy as np
-import tflite_runtime.interpreter as tflite
+from MaskRenderer import MaskRenderer
+from ModelRegistry import registry
 from PIL import Image
 
 from picamera2 import Picamera2, Preview
@@ -14,47 +15,27 @@ from picamera2 import Picamera2, Preview
 normalSize = (640, 480)
 lowresSize = (320, 240)
 
-background_mask = None
 background_img = None
+renderer = MaskRenderer(np.zeros((1, 4)), size=normalSize)
 
 
 def InferenceTensorFlow(image, model):
-    global background_mask
-
-    interpreter = tflite.Interpreter(model_path=model, num_threads=4)
-    interpreter.allocate_tensors()
-
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
-    height = input_details[0]['shape'][1]
-    width = input_details[0]['shape'][2]
-    o_height = output_details[0]['shape'][1]
-    o_width = output_details[0]['shape'][2]
-    floating_model = False
-    if input_details[0]['dtype'] == np.float32:
-        floating_model = True
+    # Model and tensor details are loaded once and cached; the
+    # interpreter is this thread's own, already allocated
+    net = registry.model(model)
 
     rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
 
-    picture = cv2.resize(rgb, (width, height))
-
-    input_data = np.expand_dims(picture, axis=0)
-    if floating_model:
-        input_data = np.float32(input_data / 255)
-
-    interpreter.set_tensor(input_details[0]['index'], input_data)
+    picture = cv2.resize(rgb, net.input_size)
 
-    interpreter.invoke()
+    interpreter = net.run(picture, std=255.0)  # uint8/int8 models get mean/std folded into a lookup table
 
-    output = interpreter.get_tensor(output_details[0]['index'])[0]
+    output = interpreter.get_tensor(net.output_indices[0])[0]
 
-    mask = np.argmax(output, axis=-1)
-    output_shape = (o_width, o_height)
-    overlay = (mask == 0).astype(np.uint8)
-    overlay = np.array([0, 255])[overlay].reshape(
-        output_shape).astype(np.uint8)
-    overlay = cv2.resize(overlay, normalSize)
-    background_mask = Image.fromarray(overlay)
+    # Background image where the model sees background (class 0), transparent
+    # over everything else; only the alpha channel changes per frame
+    mask = np.argmax(output, axis=-1)  # same on quantized values: no dequantization needed
+    return renderer.cutout(mask, background_img)
 
 
 def main():
@@ -62,7 +43,10 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--model', help='Path of the segmentation model.', required=True)
     parser.add_argument('--background', help='Path of the background image.')
+    parser.add_argument('--threads', type=int, default=4, help='Interpreter CPU threads.')
+    parser.add_argument('--no-xnnpack', action='store_true', help='Run without the XNNPACK delegate.')
     args = parser.parse_args()
+    registry.configure(num_threads=args.threads, xnnpack=not args.no_xnnpack)
 
     picam2 = Picamera2()
     picam2.start_preview(Preview.QTGL)
@@ -75,22 +59,15 @@ def main():
     picam2.start()
 
     if args.background:
-        background_img = Image.open(args.background)
-        background_img = background_img.resize(normalSize)
+        background_img = Image.open(args.background).convert("RGB")
+        background_img = np.array(background_img.resize(normalSize))
     else:
         background_img = np.zeros((normalSize[1], normalSize[0], 3), dtype=np.uint8)
-        background_img = Image.fromarray(background_img)
 
     while True:
         buffer = picam2.capture_buffer("lores")
         grey = buffer[:stride * lowresSize[1]].reshape((lowresSize[1], stride))
-        InferenceTensorFlow(grey, args.model)
-        base_img = np.zeros((normalSize[1], normalSize[0], 3), dtype=np.uint8)
-        base_img = Image.fromarray(base_img)
-        global background_mask
-        overlay = Image.composite(background_img, base_img, background_mask)
-        overlay.putalpha(background_mask)
-        overlay = np.array(overlay)
+        overlay = InferenceTensorFlow(grey, args.model)
         picam2.set_overlay(overlay)
 
 
@@ -9,7 +9,8 @@ import time
 
 import cv2
 import numpy as np
-import tflite_runtime.interpreter as tflite
+from MaskRenderer import MaskRenderer
+from ModelRegistry import registry
 from PIL import Image
 
 from picamera2 import Picamera2, Preview
@@ -17,75 +18,36 @@ from picamera2 import Picamera2, Preview
 normalSize = (640, 480)
 lowresSize = (320, 240)
 
-masks = {}
+masks = {}      # name -> class id of the classes in the last frame
 captured = []
-segmenter = None
-
-
-def ReadLabelFile(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    ret = {}
-    for line in lines:
-        pair = line.strip().split(maxsplit=1)
-        ret[int(pair[0])] = pair[1].strip()
-    return ret
+renderer = None
 
 
 def InferenceTensorFlow(image, model, colours, label=None):
-    global masks
+    global masks, renderer
 
-    if label:
-        labels = ReadLabelFile(label)
-    else:
-        labels = None
+    # Model, tensor details, labels and palette are loaded once and cached; the
+    # interpreter is this thread's own, already allocated
+    net = registry.model(model)
+    labels = registry.labels(label)
+    if renderer is None:
+        renderer = MaskRenderer(registry.palette(colours), size=normalSize, alpha=150)
 
-    interpreter = tflite.Interpreter(model_path=model, num_threads=4)
-    interpreter.allocate_tensors()
+    rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
 
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
-    height = input_details[0]['shape'][1]
-    width = input_details[0]['shape'][2]
-    o_height = output_details[0]['shape'][1]
-    o_width = output_details[0]['shape'][2]
-    floating_model = False
-    if input_details[0]['dtype'] == np.float32:
-        floating_model = True
+    picture = cv2.resize(rgb, net.input_size)
 
-    rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    interpreter = net.run(picture, std=255.0)  # uint8/int8 models get mean/std folded into a lookup table
 
-    picture = cv2.resize(rgb, (width, height))
-
-    input_data = np.expand_dims(picture, axis=0)
-    if floating_model:
-        input_data = np.float32(input_data / 255)
-
-    interpreter.set_tensor(input_details[0]['index'], input_data)
-
-    interpreter.invoke()
-
-    output = interpreter.get_tensor(output_details[0]['index'])[0]
-
-    mask = np.argmax(output, axis=-1)
-    found_indices = np.unique(mask)
-    colours = np.loadtxt(colours)
-    new_masks = {}
-    for i in found_indices:
-        if i == 0:
-            continue
-        output_shape = [o_width, o_height, 4]
-        colour = [(0, 0, 0, 0), colours[i]]
-        overlay = (mask == i).astype(np.uint8)
-        overlay = np.array(colour)[overlay].reshape(
-            output_shape).astype(np.uint8)
-        overlay = cv2.resize(overlay, normalSize)
-        if labels is not None:
-            new_masks[labels[i]] = overlay
-        else:
-            new_masks[i] = overlay
-    masks = new_masks
+    output = interpreter.get_tensor(net.output_indices[0])[0]
+
+    # One overlay for all classes: nearest-neighbour resize of the label map
+    # and a single palette lookup into a reused buffer
+    mask = np.argmax(output, axis=-1)  # same on quantized values: no dequantization needed
+    overlay = renderer.render(mask)
+    masks = {(labels[i] if labels is not None else i): i for i in renderer.classes()}
     print("Found", masks.keys())
+    return overlay
 
 
 def capture_image_and_masks(picam2: Picamera2, model, colour_file, label_file):
@@ -100,9 +62,8 @@ def capture_image_and_masks(picam2: Picamera2, model, colour_file, label_file):
     grey = lores[:stride * lowresSize[1]].reshape((lowresSize[1], stride))
 
     InferenceTensorFlow(grey, model, colour_file, label_file)
-    for k, v in masks.items():
-        comp = np.array([0, 0, 0, 0]).reshape(1, 1, 4)
-        mask = (~((v == comp).all(axis=-1)) * 255).astype(np.uint8)
+    for k, class_id in masks.items():
+        mask = renderer.mask(class_id)
         label = k
         label = label.replace(" ", "_")
         if label in captured:
@@ -119,7 +80,10 @@ def main():
     parser.add_argument('--label', help='Path of the labels file.')
     parser.add_argument('--colours', help='File path of the label colours.')
     parser.add_argument('--output', help='File path of the output image.')
+    parser.add_argument('--threads', type=int, default=4, help='Interpreter CPU threads.')
+    parser.add_argument('--no-xnnpack', action='store_true', help='Run without the XNNPACK delegate.')
     args = parser.parse_args()
+    registry.configure(num_threads=args.threads, xnnpack=not args.no_xnnpack)
 
     if args.output:
         output_file = args.output
@@ -150,13 +114,7 @@ def main():
         while True:
             buffer = picam2.capture_buffer("lores")
             grey = buffer[:stride * lowresSize[1]].reshape((lowresSize[1], stride))
-            InferenceTensorFlow(grey, args.model, colour_file, label_file)
-            overlay = np.zeros((normalSize[1], normalSize[0], 4), dtype=np.uint8)
-            global masks
-            for v in masks.values():
-                overlay += v
-            # Set Alphas and overlay
-            overlay[:, :, -1][overlay[:, :, -1] == 255] = 150
+            overlay = InferenceTensorFlow(grey, args.model, colour_file, label_file)
             picam2.set_overlay(overlay)
             # Check if enter has been pressed
             i, o, e = select.select([sys.stdin], [], [], 0.1)
@@ -21,12 +21,16 @@
 # and run from the command line,
 #
 # python3 yolo_v5_real_time_with_labels.py --model=yolov5s-fp16.tflite --label=coco_labels_yolov5.txt
+#
+# --save-output outputs.npy keeps the first raw output tensors for
+# Benchmarks/Detection_Benchmark.py --tensors outputs.npy
 
 import argparse
 
 import cv2
 import numpy as np
-import tflite_runtime.interpreter as tflite
+from ModelRegistry import registry
+from YOLODecoder import YOLODecoder
 
 from picamera2 import MappedArray, Picamera2, Platform, Preview
 
@@ -35,16 +39,7 @@ lowresSize = (640, 640)  # Shape Yolov5 s was trained with
 # if using other yolov5 flavour then image from stream will be resized accordingly.
 
 rectangles = []
-
-
-def ReadLabelFile(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    ret = {}
-    for line in lines:
-        pair = line.strip().split(maxsplit=1)
-        ret[int(pair[0])] = pair[1].strip()
-    return ret
+SAVED_OUTPUTS = 50
 
 
 def DrawRectangles(request):
@@ -62,21 +57,17 @@ def DrawRectangles(request):
                             font, 1, (255, 255, 255), 2, cv2.LINE_AA)
 
 
-def classFilter(classdata):
-    return [c.argmax() for c in classdata]
-    # generates a list, loop through all predictions and get the best classification location
-
-
-def YOLOdetect(output_data):  # input = interpreter, output is boxes(xyxy), classes, scores
-    output_data = output_data[0]                # x(1, 25200, 7) to x(25200, 7)
-    boxes = np.squeeze(output_data[..., :4])    # boxes  [25200, 4]
-    scores = np.squeeze(output_data[..., 4:5])  # confidences  [25200, 1]
-    classes = classFilter(output_data[..., 5:])  # get classes
-    # Convert nx4 boxes from [x, y, w, h] to [x1, y1, x2, y2] where xy1=top-left, xy2=bottom-right
-    x, y, w, h = boxes[..., 0], boxes[..., 1], boxes[..., 2], boxes[..., 3]  # xywh
-    xyxy = [x - w / 2, y - h / 2, x + w / 2, y + h / 2]  # xywh to xyxy
-
-    return xyxy, classes, scores  # output is boxes(x,y,x,y), classes(int), scores(float) [predictions length]
+def YOLOdetect(decoder, output_data, labels=None, quantization=None):
+    """Raw output tensor -> [xmin, ymin, xmax, ymax(, label)] rectangles in main stream pixels"""
+    # Objectness filter (on the raw values), argmax, class-aware NMS
+    detections = decoder.decode(output_data, quantization)
+    scale = np.array(normalSize * 2, dtype=np.float32)
+    boxes = np.stack([detections["xmin"], detections["ymin"], detections["xmax"], detections["ymax"]], axis=1)
+    boxes = np.clip(boxes * scale, 1, scale).astype(np.int32).tolist()
+    if labels:
+        for box, class_id in zip(boxes, detections["class_id"].tolist()):
+            box.append(labels.get(class_id, "Unknown"))
+    return boxes
 
 
 def main():
@@ -84,12 +75,13 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--model', help='Path of the detection model.', required=True)
     parser.add_argument('--label', help='Path of the labels file.')
+    parser.add_argument('--save-output', help='Save the first raw output tensors to this .npy file.')
+    parser.add_argument('--threads', type=int, default=4, help='Interpreter CPU threads.')
+    parser.add_argument('--no-xnnpack', action='store_true', help='Run without the XNNPACK delegate.')
     args = parser.parse_args()
+    registry.configure(num_threads=args.threads, xnnpack=not args.no_xnnpack)
 
-    if args.label:
-        labels = ReadLabelFile(args.label)
-    else:
-        labels = None
+    labels = registry.labels(args.label)
     picam2 = Picamera2()
     picam2.start_preview(Preview.QTGL)
 
@@ -103,49 +95,28 @@ def main():
     picam2.post_callback = DrawRectangles
 
     picam2.start()
-    interpreter = tflite.Interpreter(model_path=args.model, num_threads=4)
-    interpreter.allocate_tensors()
+    net = registry.model(args.model)
+    decoder = YOLODecoder(score_threshold=0.4, iou_threshold=0.45)
+    new_shape = net.input_size  # the shape the model was trained with
+    saved = []
 
     while True:
         img = picam2.capture_array("lores")
 
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
-        height = input_details[0]['shape'][1]
-        width = input_details[0]['shape'][2]
-
-        floating_model = False
-        if input_details[0]['dtype'] == np.float32:
-            floating_model = True
-
         if stream_format == "YUV420":
             img = cv2.cvtColor(img, cv2.COLOR_YUV420p2RGB)
 
-        new_shape = (width, height)  # the shape the model was trained with
         if new_shape != lowresSize:
             img = cv2.resize(img, new_shape)
 
-        input_data = np.expand_dims(img, axis=0)
-        if floating_model:
-            input_data = (np.float32(input_data) - 127.5) / 127.5
-
-        interpreter.set_tensor(input_details[0]['index'], input_data)
-        interpreter.invoke()
-        output_data = interpreter.get_tensor(output_details[0]['index'])
-        xyxy, classes, scores = YOLOdetect(output_data)
-        rectangles = []
-
-        for i in range(len(scores)):
-            if ((scores[i] > 0.4) and (scores[i] <= 1.0)):
-                xmin = int(max(1, (xyxy[0][i] * normalSize[0])))
-                ymin = int(max(1, (xyxy[1][i] * normalSize[1])))
-                xmax = int(min(normalSize[0], (xyxy[2][i] * normalSize[0])))
-                ymax = int(min(normalSize[1], (xyxy[3][i] * normalSize[1])))
-
-                box = [xmin, ymin, xmax, ymax]
-                rectangles.append(box)
-                if labels:
-                    rectangles[-1].append(labels[classes[i]])
+        net.run(img, mean=127.5, std=127.5)  # uint8/int8 models get mean/std folded into a lookup table
+        output_data = net.output(0)
+        if args.save_output and len(saved) < SAVED_OUTPUTS:
+            saved.append(output_data)
+            if len(saved) == SAVED_OUTPUTS:
+                np.save(args.save_output, np.stack(saved))
+                print(f"Saved {SAVED_OUTPUTS} output tensors to {args.save_output}")
+        rectangles = YOLOdetect(decoder, output_data, labels, net.output_quantization[0])
 
 
 if __name__ == '__main__':
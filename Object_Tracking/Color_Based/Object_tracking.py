@@ -1,16 +1,21 @@
 import cv2
-from picamera2 import Picamera2
-from libcamera import controls, Transform
+from CameraService import CameraService
+from BlobTracker import BlobTracker
+from ColorLUT import ColorLUT
+from Display import Display
 from RPi_Robot_Hat_Lib import RobotController 
 import numpy as np
+import os
 
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Bounds saved by HSV_Color_Picker, used when there is no window for the trackbars
+# (HSV_VALUES=path overrides)
+HSV_VALUES = os.environ.get("HSV_VALUES", os.path.normpath(os.path.join(HERE, "..", "..", "HSV_Color_Picker", "hsv_value.npy")))
 
 
-picam = Picamera2()
-config = picam.create_preview_configuration(main={"format": 'XRGB8888', "size": (640, 480)},transform=Transform(vflip=1))
-picam.configure(config)
-picam.start()
-picam.set_controls({"AfMode": controls.AfModeEnum.Continuous})
+
+camera = CameraService(size=(640, 480), format='XRGB8888', vflip=True).start()
+frames = camera.reader("tracker")
 Motor = RobotController()
 
 vertical = 2
@@ -21,7 +26,7 @@ Motor.set_servo(horizontal, 90)
 
 
 def colorPicker(): 
-    global picam 
+    global frames 
     def nothing(x):
         pass    
     cv2.namedWindow("Color_Picker")
@@ -31,9 +36,12 @@ def colorPicker():
     cv2.createTrackbar("Upper Hue", "Color_Picker", 179, 179, nothing)
     cv2.createTrackbar("Upper Saturation", "Color_Picker", 255, 255, nothing)
     cv2.createTrackbar("Upper Value", "Color_Picker", 255, 255, nothing)
+    lut, lut_bounds = None, None
     while True:
-        img = picam.capture_array()
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+        frame = frames.get(timeout=1)
+        if frame is None:
+            continue
+        img = frame.array
         l_h = cv2.getTrackbarPos("Lower Hue", "Color_Picker")
         l_s = cv2.getTrackbarPos("Lower Saturation", "Color_Picker")
         l_v = cv2.getTrackbarPos("Lower Value", "Color_Picker")
@@ -42,7 +50,9 @@ def colorPicker():
         u_v = cv2.getTrackbarPos("Upper Value", "Color_Picker")
         lower_bound = np.array([l_h, l_s, l_v])
         upper_bound = np.array([u_h, u_s, u_v])
-        mask = cv2.inRange(hsv, lower_bound, upper_bound) 
+        if lut is None or not (np.array_equal(lower_bound, lut_bounds[0]) and np.array_equal(upper_bound, lut_bounds[1])):
+            lut, lut_bounds = ColorLUT([(lower_bound, upper_bound)]), (lower_bound, upper_bound)  # recompile only when a trackbar moves
+        mask = lut.mask(img)
         res = cv2.bitwise_and(img, img, mask=mask)
         mask = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGRA)
         stacked = np.hstack((mask, img, res))
@@ -54,57 +64,69 @@ def colorPicker():
 
 
 def main():
-    global picam 
-    lower_bound , upper_bound = colorPicker()
-
-    while True:
-        img = picam.capture_array()
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv, lower_bound, upper_bound)
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    global frames 
+    if Display.mode_from_env() == "window":
+        lower_bound , upper_bound = colorPicker()
+    else:
+        # No window for the trackbars: use the bounds saved by HSV_Color_Picker
+        if not os.path.exists(HSV_VALUES):
+            print(f"No HSV bounds at {HSV_VALUES}: run HSV_Color_Picker.py or set HSV_VALUES")
+            exit()
+        lower_bound, upper_bound = np.load(HSV_VALUES)
+    # ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+    display = Display.from_env("Result")
+    # Searches a predicted ROI around the target, full frame at 1/4 scale only when lost
+    tracker = BlobTracker(ColorLUT([(lower_bound, upper_bound)]).mask_fn(), min_area=1500)
 
-        if contours:
-            for i, contour in enumerate(contours):
-                largest_contour = max(contours, key=cv2.contourArea)
-                area = cv2.contourArea(largest_contour)
-                if area > 1500:
-                    x, y, w, h = cv2.boundingRect(largest_contour)
-                    cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                    # cv2.putText(img, f"Object {i + 1}", (x, y - 10), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
+    while display.running:
+        frame = frames.get(timeout=1)
+        if frame is None:
+            continue
+        blob = tracker.update(frame.array, frame.timestamp_ns)
 
-                    center_x = int(x + w // 2)
-                    center_y = int(y + h // 2)
-                    print("Center X:", center_x)
-                    print("Center Y:", center_y)
-                    print("Area:", area)
+        if blob is not None:
+            center_x, center_y = blob.center
+            print("Center X:", center_x)
+            print("Center Y:", center_y)
+            print("Area:", blob.area)
 
-                    cv2.putText(img, f"Center X: {center_x}", (10, 30), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
-                    cv2.putText(img, f"Center Y: {center_y}", (10, 60), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
-                    cv2.putText(img, f"Area: {area}", (10, 90), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
-
-                    if center_y < 400:
-                        if 50 < center_x < 320:
-                            print("Turn right")
-                            Motor.move(speed=0, turn=30)
-                        elif 400 < center_x < 600:
-                            print("Turn left")
-                            Motor.move(speed=0, turn=-30)
-                        elif 320 <= center_x <= 400:
-                            Motor.Forward(20)
-                            print("Centered")
-                        else:
-                            print("Out of range")
-                            Motor.Brake() 
-                    else:
-                        print("Out of range")
-                        Motor.Brake()
+            if center_y < 400:
+                if 50 < center_x < 320:
+                    print("Turn right")
+                    Motor.move(speed=0, turn=30)
+                elif 400 < center_x < 600:
+                    print("Turn left")
+                    Motor.move(speed=0, turn=-30)
+                elif 320 <= center_x <= 400:
+                    Motor.Forward(20)
+                    print("Centered")
+                else:
+                    print("Out of range")
+                    Motor.Brake() 
+            else:
+                print("Out of range")
+                Motor.Brake()
         else: 
             Motor.Brake()
             print("Stoped! - Not Detected")
-        cv2.imshow("Camera", mask)
-        cv2.imshow("Result", img)
-        if cv2.waitKey(1) == ord('q'):
-            break
+
+        if not display.wants_frame():
+            continue  # nobody is watching: skip the overlays
+        # The ring buffer is shared with other consumers; draw on a copy
+        img = frame.array.copy()
+        if blob is not None:
+            x, y, w, h = blob.bbox
+            center_x, center_y = blob.center
+            cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(img, f"Center X: {center_x}", (10, 30), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(img, f"Center Y: {center_y}", (10, 60), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(img, f"Area: {blob.area}", (10, 90), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
+        if tracker.roi is not None:
+            # Region searched this frame
+            rx, ry, rw, rh = tracker.roi
+            cv2.rectangle(img, (rx, ry), (rx + rw, ry + rh), (255, 0, 0), 1)
+        display.show(img)
+    display.close()
 
 try:
     if __name__ == '__main__':
@@ -112,7 +134,7 @@ try:
 except KeyboardInterrupt:
     print("KeyboardInterrupt")
 finally:
-    picam.stop()
+    camera.stop()
     Motor.cleanup()
     cv2.destroyAllWindows()
     print("Program Terminated \n Exiting....")
@@ -1,20 +1,22 @@
 import cv2
 import numpy as np
 from RPi_Robot_Hat_Lib import RobotController
-from picamera2 import Picamera2
-from libcamera import controls, Transform 
+from CameraService import CameraService
+from Display import Display
+from ObjectTracker import ObjectTracker
 import time
 
-tracker = cv2.TrackerKCF_create() 
+# KCF runs on a half-resolution copy of each frame; the box is checked against
+# the target's template every 5 frames (confidence and scale), and a lost
+# target is searched for in a growing window until it is found again
+tracker = ObjectTracker(scale=0.5, kind="KCF", check_every=5, redetect="template")
 # cap = cv2.VideoCapture(0)
 # frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 # frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 frame_width = 640  
 frame_height = 480
-cap = Picamera2()
-cap.configure(cap.create_preview_configuration(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1)))
-cap.set_controls({"AfMode": controls.AfModeEnum.Continuous})
-cap.start()
+cap = CameraService(size=(frame_width, frame_height), format='RGB888', vflip=True).start()
+frames = cap.reader("tracker")
 
 Motor = RobotController()
 # enc = Encoder()
@@ -30,16 +32,18 @@ time.sleep(1)
 
 
 
-def tracking(frame, x,y,w,h):
-    
+def draw_tracking(frame, x,y,w,h):
     cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
     cv2.putText(frame, "Tracking", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
     cv2.putText(frame, "Press 'q' to quit", (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
     cv2.putText(frame, f"X:{x} , Y: {y}", (x ,y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    cv2.circle(frame, (x + w // 2, y + h // 2), 5, (0, 0, 255), -1)  # Draw a circle at the center
+
+
+def tracking(x,y,w,h):
     # Calculate the center of Bounding Box 
     center_x = x + w // 2
     center_y = y + h // 2
-    cv2.circle(frame, (center_x, center_y), 5, (0, 0, 255), -1)  # Draw a circle at the center
     # Tracking Logic 
     # enc.encoder() 
     if center_y < 220 and center_y > 100:
@@ -67,9 +71,22 @@ def tracking(frame, x,y,w,h):
     
 
 def main(): 
-    frame = cap.capture_array()
-    bbox = cv2.selectROI(frame, showCrosshair=True, fromCenter=False)
-    cv2.destroyWindow("ROI selector")
+    # ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+    display = Display.from_env("Tracking_Area")
+    first = frames.get(timeout=5)
+    if first is None:
+        print("Error: No frame from the camera.")
+        display.close()
+        return
+    # Copy and free the ring slot at once: selectROI blocks until the user is done
+    frame = first.array.copy()
+    frames.release()
+    if display.mode == "window":
+        bbox = cv2.selectROI(frame, showCrosshair=True, fromCenter=False)
+        cv2.destroyWindow("ROI selector")
+    else:
+        # No window to select in: track whatever is in the middle of the view
+        bbox = (frame_width * 3 // 8, frame_height * 3 // 8, frame_width // 4, frame_height // 4)
  
     # Initialize tracker with first frame and bounding box
     tracker.init(frame, bbox)
@@ -79,26 +96,39 @@ def main():
     #     return
     # print(f"Tracking started with ROI: {bbox}")
     
-    while True:
-        frame = cap.capture_array()  # Read frame
-        # Convert the frame from RGBA to BGR (From 4 channel to 1 channel)
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        # Tracking mode: update the tracker and draw the tracked bounding box
-        success, box = tracker.update(frame)  # Update the tracker with the new frame
+    while display.running:
+        captured = frames.get(timeout=1)  # Read the newest frame
+        if captured is None:
+            continue
+        # Tracking mode: update the tracker (it works on its own downscaled copy)
+        target = tracker.update(captured.array, captured.timestamp_ns)
+        success = target is not None
 
         if success:
-            (x, y, w, h) = [int(v) for v in box]
-            tracking(frame, x,y,w,h)
+            (x, y, w, h) = target.bbox
+            if target.reacquired:
+                print(f"Target reacquired after {tracker.reacquire_ns[-1] / 1e6:.0f} ms")
+            tracking(x,y,w,h)
         else:
-            cv2.putText(frame, "Tracking failure", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
             Motor.Brake() 
-        cv2.imshow('Tracking_Area', frame)
-        
-        # Press 'q' to quit
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
 
-      # Release the video capture when done
+        if display.wants_frame():
+            # The ring buffer is shared with other consumers; draw on a copy
+            frame = captured.array.copy()
+            if success:
+                draw_tracking(frame, x,y,w,h)
+            else:
+                tracker.draw(frame)  # the re-detection search window
+                cv2.putText(frame, "Searching...", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            display.show(frame)
+        frames.release()
+    display.close()
+    stats = tracker.stats()
+    summary = (f"tracker {tracker.kind}: {stats['tracker_fps']:.1f} fps, tracked {stats['tracked_pct']:.1f}% of frames, "
+               f"{stats['losses']} losses")
+    if stats['losses'] and tracker.reacquire_ns:
+        summary += f", reacquired in {stats['reacquire_ms_mean']:.0f} ms on average"
+    print(summary)
 
 try:
     if __name__ == '__main__':
@@ -110,5 +140,4 @@ finally:
     Motor.cleanup()
     # enc.stop()
     cap.stop()
-    cv2.destroyAllWindows()
     print("Program Terminated \nExiting....")
\ No newline at end of file
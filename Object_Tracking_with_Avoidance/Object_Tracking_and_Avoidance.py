@@ -1,31 +1,43 @@
 import cv2
-import time
 import numpy as np
-from picamera2 import Picamera2
+from picamera2 import Picamera2, MappedArray
 from libcamera import controls, Transform 
+from FrameExchange import FrameExchange
+from BlobTracker import BlobTracker
+from ColorLUT import ColorLUT
+from Display import Display
+from ModeArbiter import ModeArbiter, IDLE, TRACKING, AVOIDING, FOUND
 from RPi_Robot_Hat_Lib import RobotController
 from Ultrasonic_sens import Ultrasonic
 import threading 
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Bounds saved by HSV_Color_Picker, used when there is no window for the trackbars
+# (HSV_VALUES=path overrides)
+HSV_VALUES = os.environ.get("HSV_VALUES", os.path.normpath(os.path.join(HERE, "..", "HSV_Color_Picker", "hsv_value.npy")))
 
 
 
 # Initialize camera, motor, encoder, and ultrasonic sensor
 picam = Picamera2()
-picam.configure(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1))
+picam.configure(picam.create_preview_configuration(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1)))
 picam.start()
 picam.set_controls({"AfMode": controls.AfModeEnum.Continuous})
 Motor = RobotController()
 ultrasonic = Ultrasonic()
 
 # Threading synchronization
-Frame_lock = threading.Lock()
+frames = FrameExchange((480, 640, 3)) # Camera -> tracker frame handoff (no copies)
 shutdown_event = threading.Event() 
-Avoidance_event = threading.Event() 
 
-# Declare global variable 
-latest_frame = None
-Tracking_mode = False 
-Avoidance_mode = False 
+# Behavior arbiter: only the active mode may drive the motors.
+# A mode must be asked for continuously before it takes over (hysteresis),
+# so one frame with or without the object does not flip the behavior.
+arbiter = ModeArbiter(Motor, initial=IDLE,
+                      enter_after={TRACKING: 0.1, FOUND: 0.2, AVOIDING: 0.5},
+                      min_dwell=0.3,
+                      on_change=lambda old, new: print(f"Mode: {old} -> {new}"))
 
 
 # Set initial servo position
@@ -43,12 +55,17 @@ print("Initialasition Complete")
 
 
 def camera():
-    global latest_frame 
-    picam.start() 
+    # capture_request() blocks until the next frame, so this loop never spins
     while not shutdown_event.is_set():
-        with Frame_lock:
-            latest_frame = picam.capture_array()
-        time.sleep(0.01) # Prevent high CPU usage
+        request = picam.capture_request()
+        try:
+            # Fill the back buffer outside any lock, then swap it in
+            with MappedArray(request, "main") as m:
+                np.copyto(frames.back(), m.array)
+        finally:
+            request.release()
+        frames.publish()
+    frames.close()
     picam.stop()
 
 # Color Picker for object tracking
@@ -64,14 +81,14 @@ def colorPicker():
     cv2.createTrackbar("Upper Saturation", "Color_Picker", 255, 255, nothing)
     cv2.createTrackbar("Upper Value", "Color_Picker", 255, 255, nothing)
 
+    seq = 0
+    lut, lut_bounds = None, None
     while True:
-        with Frame_lock:
-            if latest_frame is not None:
-                img = latest_frame.copy() # Copy the image from the camera thread
-            else:
-                continue # Skip the proces if no frame available 
+        frame = frames.wait_newer_than(seq, timeout=1) # Block until a new frame arrives
+        if frame is None:
+            continue
+        img, seq = frame.array, frame.seq
         
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
         l_h = cv2.getTrackbarPos("Lower Hue", "Color_Picker")
         l_s = cv2.getTrackbarPos("Lower Saturation", "Color_Picker")
         l_v = cv2.getTrackbarPos("Lower Value", "Color_Picker")
@@ -80,7 +97,9 @@ def colorPicker():
         u_v = cv2.getTrackbarPos("Upper Value", "Color_Picker")
         lower_bound = np.array([l_h, l_s, l_v])
         upper_bound = np.array([u_h, u_s, u_v])
-        mask = cv2.inRange(hsv, lower_bound, upper_bound) 
+        if lut is None or not (np.array_equal(lower_bound, lut_bounds[0]) and np.array_equal(upper_bound, lut_bounds[1])):
+            lut, lut_bounds = ColorLUT([(lower_bound, upper_bound)]), (lower_bound, upper_bound)  # recompile only when a trackbar moves
+        mask = lut.mask(img)
         res = cv2.bitwise_and(img, img, mask=mask)
         mask = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGRA)
         stacked = np.hstack((mask, img, res))
@@ -93,154 +112,131 @@ def colorPicker():
 
             
 def avoidance_mode():
-    global Avoidance_mode,object_detected 
-
-    while not shutdown_event.is_set(): 
+    """Obstacle avoidance behavior; sleeps until the arbiter activates AVOIDING"""
+    motor = arbiter.motor(AVOIDING)
+    Speed = 40
+    rotation_speed = 30
 
-        while Avoidance_event.is_set() and not shutdown_event.is_set():
-
-            print("No object detected, switching to obstacle avoidance.")
-            Speed = 40
-            rotation_speed = 30
-            Motor.Brake()
+    while arbiter.wait_for(AVOIDING) is not None:
+        with arbiter.work(AVOIDING):
+            motor.Brake()
             left,front,right = ultrasonic.distances()
-            if left is not None  and front is not None  and right is not None:
-                print("left: {:.2f}".format(left))
-                print("front: {:.2f}".format(front) )
-                print("right: {:.2f}".format(right))
-                if front < threshold or left < threshold or right < threshold:
-                    if front < threshold:
-                        if front <= min_thresh_dist:
-                            Motor.Backward(Speed)
-                            time.sleep(0.1)
-                        elif left < min_thresh_dist and right < min_thresh_dist:
-                            Motor.Backward(Speed)
-                            time.sleep(0.1)
-                        elif left < threshold:
-                            Motor.move(speed=0, turn=rotation_speed)
-                            time.sleep(0.1)
-                        elif right < threshold:
-                            Motor.move(speed=0, turn=-rotation_speed)
-                            time.sleep(0.1)
-                        else:
-                            Motor.Backward(Speed)
+        if left is not None  and front is not None  and right is not None:
+            print("left: {:.2f}".format(left))
+            print("front: {:.2f}".format(front) )
+            print("right: {:.2f}".format(right))
+            if front < threshold or left < threshold or right < threshold:
+                if front < threshold:
+                    if front <= min_thresh_dist:
+                        motor.Backward(Speed)
+                        arbiter.sleep(AVOIDING, 0.1)
+                    elif left < min_thresh_dist and right < min_thresh_dist:
+                        motor.Backward(Speed)
+                        arbiter.sleep(AVOIDING, 0.1)
                     elif left < threshold:
-                        Motor.move(speed=0, turn=rotation_speed)
-                        time.sleep(0.1)
+                        motor.move(speed=0, turn=rotation_speed)
+                        arbiter.sleep(AVOIDING, 0.1)
                     elif right < threshold:
-                        Motor.move(speed=0, turn=-rotation_speed)
-                        time.sleep(0.1)
-                else:
-                    Motor.Forward(Speed)
+                        motor.move(speed=0, turn=-rotation_speed)
+                        arbiter.sleep(AVOIDING, 0.1)
+                    else:
+                        motor.Backward(Speed)
+                elif left < threshold:
+                    motor.move(speed=0, turn=rotation_speed)
+                    arbiter.sleep(AVOIDING, 0.1)
+                elif right < threshold:
+                    motor.move(speed=0, turn=-rotation_speed)
+                    arbiter.sleep(AVOIDING, 0.1)
             else:
-                print("No data received")
-                Motor.Brake()
-                time.sleep(1)
-            time.sleep(0.5)
+                motor.Forward(Speed)
         else:
-            # print("Avoidance event is not set")
-            pass
-           
+            print("No data received")
+            motor.Brake()
+            arbiter.sleep(AVOIDING, 1)
+        # Returns early as soon as tracking takes over
+        arbiter.sleep(AVOIDING, 0.5)
 
     
 
-# Main function where object tracking and obstacle avoidance happen sequentially
+# Main function: perception runs on every new frame and proposes a mode;
+# the tracking and found behaviors act here, avoidance runs in its own thread
 def main():
-    global Tracking_mode, Avoidance_mode, object_detected
-    lower_bound, upper_bound = colorPicker()  # Get color bounds from the color picker
-    cv2.destroyAllWindows()
+    if Display.mode_from_env() == "window":
+        lower_bound, upper_bound = colorPicker()  # Get color bounds from the color picker
+        cv2.destroyAllWindows()
+    else:
+        # No window for the trackbars: use the bounds saved by HSV_Color_Picker
+        if not os.path.exists(HSV_VALUES):
+            print(f"No HSV bounds at {HSV_VALUES}: run HSV_Color_Picker.py or set HSV_VALUES")
+            exit()
+        lower_bound, upper_bound = np.load(HSV_VALUES)
+    # ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+    display = Display.from_env("Object Tracking and Avoidance")
+    track_motor = arbiter.motor(TRACKING)
+    found_motor = arbiter.motor(FOUND)
+    arbiter.set_mode(AVOIDING)
+    # Searches a predicted ROI around the target, full frame at 1/4 scale only when lost
+    tracker = BlobTracker(ColorLUT([(lower_bound, upper_bound)]).mask_fn(), min_area=MIN_AREA_THRESHOLD)
 
-    while not shutdown_event.is_set():
-        # 1. Run color tracker to check for the object
-        with Frame_lock:
-            if latest_frame is not None:
-                img = latest_frame.copy()
-            else:
-                print("No frame available")
-                break  # Skip if no frame available
+    seq = 0
+    while display.running and not shutdown_event.is_set():
+        # 1. Run color tracker on the next new frame (each frame is processed once)
+        frame = frames.wait_newer_than(seq, timeout=1)
+        if frame is None:
+            print("No frame available")
+            continue
+        img, seq = frame.array, frame.seq
 
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv, lower_bound, upper_bound)
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        object_detected = False
-        if contours:
-            contours = sorted(contours, key=cv2.contourArea, reverse=True)
-            largest_contour = contours[0] 
-            area = cv2.contourArea(largest_contour)
-            if area > MIN_AREA_THRESHOLD:
-                if Avoidance_mode:
-                    cv2.destroyWindow("Obstacle Avoidance")
-                    Tracking_mode = True
-                    Avoidance_mode = False
-                    Avoidance_event.clear()
+        with arbiter.work(arbiter.mode):
+            blob = tracker.update(img, frame.timestamp_ns)
 
-                cv2.putText(img, "Object Tracking Mode", (10, 30), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 0, 255), 2)
-                object_detected = True  # Object detected
-                x, y, w, h = cv2.boundingRect(largest_contour)
-                cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                cv2.circle(img, (x + w // 2, y + h // 2), 5, (0, 0, 255), -1)
-                cv2.putText(img, "Object", (x, y - 10), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
-                cv2.putText(img, "Area: " + str(area), (x, y + h + 20), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
-                cv2.putText(img, "Center of Object: (" + "x: " + str(x + w // 2) + ", " + "y: " + str(y + h // 2) + ")", (10, 60), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
-                
-
-                center_x = int(x + w // 2)
-                center_y = int(y + h // 2)
+            if blob is not None:
+                x, y, w, h = blob.bbox
+                area = blob.area
+                center_x, center_y = blob.center
+                found = (370 < center_y < 400) or area > 30000
+                mode = arbiter.propose(FOUND if found else TRACKING)
+            else:
+                mode = arbiter.propose(AVOIDING)
 
+            # 2. Act for the active mode (commands from other modes are ignored)
+            if mode == TRACKING and blob is not None:
                 # Motor control based on object's center position
                 if 80 < center_y < 440:
                     if 50 < center_x < 320:
                         print("Turn Left")
-                        Motor.move(speed=0, turn=-30)
+                        track_motor.move(speed=0, turn=-30)
                     elif 400 < center_x < 600:
                         print("Turn Right")
-                        Motor.move(speed=0, turn=30)
+                        track_motor.move(speed=0, turn=30)
                     elif 320 <= center_x <= 400:
-                        Motor.Forward(40)
+                        track_motor.Forward(40)
                         print("Centered")
                     else:
-                        Motor.Brake()
-                if  (370 < center_y < 400) or area > 30000:
-                    Motor.Brake()
-                    print("Object Found")
-                    cv2.putText(img, "Object Found", (200, 200), cv2.FONT_HERSHEY_COMPLEX, 1, (0, 0, 255), 4)
-                else:
-                    object_detected = False
-                    if not Avoidance_mode:
-                        Avoidance_mode = True
-                        Avoidance_event.set()
-                        print("Switching to Avoidance mode")
-                cv2.imshow("Tracking", img)
-            else:
-                cv2.destroyWindow("Tracking")
-                object_detected = False
-                if not Avoidance_mode:
-                    Avoidance_mode = True
-                    Avoidance_event.set()
-                    print("Switching to Avoidance mode")
-                cv2.putText(img, "Obstacle Avoidance Mode", (10, 30), cv2.FONT_HERSHEY_COMPLEX, 0.7, (255, 0, 0), 2)
-                cv2.imshow("Obstacle Avoidance", img)
+                        track_motor.Brake()
+            elif mode == FOUND:
+                found_motor.Brake()
+
+        if not display.wants_frame():
+            continue  # nobody is watching: skip the overlays
+        if blob is not None:
+            cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.circle(img, (center_x, center_y), 5, (0, 0, 255), -1)
+            cv2.putText(img, "Object", (x, y - 10), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(img, "Area: " + str(area), (x, y + h + 20), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(img, "Center of Object: (" + "x: " + str(center_x) + ", " + "y: " + str(center_y) + ")", (10, 60), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 255, 0), 2)
+        if mode == FOUND:
+            cv2.putText(img, "Object Found", (200, 200), cv2.FONT_HERSHEY_COMPLEX, 1, (0, 0, 255), 4)
+        elif mode == TRACKING:
+            cv2.putText(img, "Object Tracking Mode", (10, 30), cv2.FONT_HERSHEY_COMPLEX, 0.7, (0, 0, 255), 2)
         else:
-            if not Avoidance_mode:
-                Avoidance_mode = True
-                Avoidance_event.set()
-                print("Switching to Avoidance mode")
-            if Tracking_mode:
-                cv2.destroyWindow("Tracking")
-                Tracking_mode = False
             cv2.putText(img, "Obstacle Avoidance Mode", (10, 30), cv2.FONT_HERSHEY_COMPLEX, 0.7, (255, 0, 0), 2)
-            cv2.imshow("Obstacle Avoidance", img)
+        display.show(img)
+
+    print("Shutting down...")
+    shutdown_event.set()
+    display.close()
 
-        # Check for user input to quit the program
-        if cv2.waitKey(1) == ord('q'):
-            print("Shutting down...")
-            cv2.destroyAllWindows()
-            Motor.cleanup()
-            picam.stop()
-            print("Program Terminated \n Exiting....")
-            shutdown_event.set()
-            
-            
 
 
 try:
@@ -256,10 +252,11 @@ except KeyboardInterrupt:
     print("KeyboardInterrupt")
 finally:
     shutdown_event.set()
-    Avoidance_event.clear()
+    arbiter.set_mode(IDLE)  # Brakes the motors
+    arbiter.close()         # Wakes the avoidance thread so it can exit
     camera_thread.join()
-    cv2.destroyAllWindows()
+    Avoidance_thread.join()
     Motor.cleanup()
-    picam.stop()
+    arbiter.print_stats()
     print("Program Terminated \n Exiting....")
     exit()
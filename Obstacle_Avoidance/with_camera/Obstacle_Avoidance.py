@@ -1,8 +1,9 @@
 import threading 
-import cv2 
 from picamera2 import Picamera2
 from Ultrasonic_sens import Ultrasonic 
 from RPi_Robot_Hat_Lib import RobotController 
+from RobotBus import Bus, Poller, LATEST
+from Display import Display
 import time 
 from libcamera import controls, Transform 
 
@@ -18,26 +19,46 @@ Speed = 30
 rotation_speed = 20
 threshold = 30 
 min_thresh_dist = 10 
-picam2 = Picamera2() 
-picam2.configure(picam2.create_preview_configuration(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1)))
-picam2.start()
-picam2.set_controls({"AfMode": controls.AfModeEnum.Continuous})
-frame_lock = threading.Lock()
-capture_thread = threading.Thread(target=capture_frame)  # Start the capture frame thread
+DISPLAY_RATE = 15 # Max frames per second sent to the preview window
+# ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+display = Display.from_env("Frame", max_fps=DISPLAY_RATE)
+# The camera is only used for the preview; headless runs don't open it at all
+picam2 = None
+if display.mode != "none":
+    picam2 = Picamera2() 
+    picam2.configure(picam2.create_preview_configuration(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1)))
+    picam2.start()
+    picam2.set_controls({"AfMode": controls.AfModeEnum.Continuous})
+
+# Sensors and camera publish on the bus; the control loop and the display subscribe
+bus = Bus()
+bus.topic("camera/frame", kind=LATEST)
+bus.topic("sensor/ultrasonic", kind=LATEST)
 shutdown_event = threading.Event()
 
 
-# Capture and Display Frame 
+# Capture Frame (producer)
 def capture_frame():
-    global picam2, frame_lock, shutdown_event
     while not shutdown_event.is_set():
-        with frame_lock:
-            frame = picam2.capture_array()
-        cv2.imshow("Frame", frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        bus.publish("camera/frame", picam2.capture_array()) # New array per capture, handed off without copying
+
+
+# Display Frame (consumer, rate limited)
+def display_frame():
+    frames = bus.subscribe("camera/frame", max_rate=DISPLAY_RATE)
+    while not shutdown_event.is_set():
+        message = frames.get(timeout=0.5)
+        if message is None:
+            continue
+        if display.wants_frame():
+            display.show(message.value)
+        if not display.running:
             shutdown_event.set()  # Signal to stop the program
-            break 
-    cv2.destroyAllWindows()  # Cleanup the OpenCV windows
+
+
+capture_thread = threading.Thread(target=capture_frame)
+display_thread = threading.Thread(target=display_frame)
+ultrasonic_poller = Poller(bus, "sensor/ultrasonic", ultrasonic.samples, rate_hz=5)
 
 
 def obstacle_Avoid(left, front, right):
@@ -98,18 +119,24 @@ def obstacle_Avoid(left, front, right):
 
 def main(): 
     print("Program Started")
-    capture_thread.start()
-    while not shutdown_event.is_set():
-        # enc.encoder()
-        left, front, right = ultrasonic.distances()
-        time.sleep(0.1)
-        if left is not None and front is not None and right is not None: 
-            print("Left: {:.2f}".format(left)) 
-            print("Front: {:.2f}".format(front))
-            print("Right: {:.2f}".format(right)) 
+    ranges = bus.subscribe("sensor/ultrasonic")
+    if picam2 is not None:
+        capture_thread.start()
+        display_thread.start()
+    ultrasonic_poller.start()
+    while display.running and not shutdown_event.is_set():
+        message = ranges.get(timeout=1)
+        if message is None:
+            print("No data received")
+            Motor.Brake()
+            continue
+        left, front, right = message.value
+        if left.valid and front.valid and right.valid: 
+            print("Left: {:.2f}".format(left.value)) 
+            print("Front: {:.2f}".format(front.value))
+            print("Right: {:.2f}".format(right.value)) 
             print(" ")
-            obstacle_Avoid(left, front, right)
-            time.sleep(0.1)
+            obstacle_Avoid(left.value, front.value, right.value)
         else:
             print("No data received")
             Motor.Brake()
@@ -125,13 +152,18 @@ try:
             
 
 except KeyboardInterrupt:
-    shutdown_event.set()
-    Motor.cleanup()
-    print("Program Terminated")
+    print("KeyboardInterrupt")
 
 finally: 
     shutdown_event.set()
-    capture_thread.join()
-    cv2.destroyAllWindows()
+    Motor.cleanup()
+    ultrasonic_poller.stop()
+    for thread in (capture_thread, display_thread):
+        if thread.is_alive():
+            thread.join()
+    if picam2 is not None:
+        picam2.stop()
+    display.close()
+    bus.print_stats()
+    print("Program Terminated")
     exit()
-    print("Program Terminated")
\ No newline at end of file
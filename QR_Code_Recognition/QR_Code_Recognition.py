@@ -1,6 +1,8 @@
 import cv2 
-from picamera2 import Picamera2 
-from libcamera import controls, Transform
+from CameraService import CameraService
+from Display import Display
+from QRTracker import QRTracker
+from MotionGate import MotionGate, encoder_motion
 import time 
 from RPi_Robot_Hat_Lib import RobotController
 
@@ -12,46 +14,55 @@ Motor.set_servo(vertical, 90)
 
 frame_width = 640 
 frame_height = 480 
-cam = Picamera2()
-cam.configure(cam.create_preview_configuration(main={"format": 'RGB888', "size": (640, 480)},transform=Transform(vflip=1))) 
-cam.start()
-cam.set_controls({"AfMode":controls.AfModeEnum.Continuous})
+# The detector reads the grayscale Y plane of the lores stream; the RGB main
+# stream is only used for the display
+cam = CameraService(size=(frame_width, frame_height), format='RGB888', vflip=True,
+                    lores=(frame_width, frame_height)).start()
+frames = cam.reader("qr", stream="gray")
+# ROBOT_DISPLAY=none|window|mjpeg; Ctrl+C or SIGTERM quits
+display = Display.from_env("code detector")
+shown_frames = cam.reader("display") if display.mode != "none" else None
 
-detector = cv2.QRCodeDetector()
+# Codes are found on a half-resolution frame and decoded from full-resolution
+# crops; codes that have not moved are neither searched nor decoded again
+tracker = QRTracker(scale=0.5, full_every=15)
+# Nothing is searched while the view and the wheels are still (the last codes
+# stay valid), apart from one pass a second
+gate = MotionGate(keep_alive_s=1.0, motion=encoder_motion(Motor.get_all_encoder_samples))
+codes = []
 
 t_start = time.time()
 fps = 0
 
 
-while True :
-    frame = cam.capture_array()
-    data, bbox, _ = detector.detectAndDecode(frame)
+while display.running:
+    captured = frames.get(timeout=1)
+    if captured is None:
+        continue
+    if gate.should_run(captured.array, captured.timestamp_ns):
+        codes = tracker.detect(captured.array, captured.timestamp_ns)
+        for code in codes:
+            # Report each code once per decode, not on every frame it stays in view
+            if code.data is not None and code.decoded_ns == code.timestamp_ns:
+                print("data: %s, center: %s, t: %d" % (code.data, code.center, code.timestamp_ns))
+    frames.release()
     fps +=1
     mfps = fps/(time.time() - t_start)
 
-    if(bbox is not None):
-        for i in range(len(bbox)):
-            
-            pt1 = (int(bbox[i][0][0]), int(bbox[i][0][1]))
-            pt2 = (int(bbox[(i + 1) % len(bbox)][0][0]), int(bbox[(i + 1) % len(bbox)][0][1]))
-            
-            cv2.line(frame, pt1, pt2, color=(255,
-                     0, 0), thickness=2)
-            
-        cv2.putText(frame, data, (int(bbox[0][0][0]), int(bbox[0][0][1]) - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                    1, (255, 250, 120), 2)
-
-        
-        
-    else:
-        print("No Data Found")
+    if not display.wants_frame():
+        continue  # nobody is watching: skip the overlays
+    shown = shown_frames.get(timeout=0)
+    if shown is None:
+        continue
+    # The ring buffer is shared with other consumers; draw on a copy
+    frame = shown.array.copy()
+    tracker.draw(frame, codes)
 
     cv2.putText(frame, "FPS : " + str(int(mfps)), (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-    cv2.imshow("code detector", frame)
-
-    if cv2.waitKey(1) == ord("q"):
-        break 
+    display.show(frame)
 
+display.close()
 cam.stop()
 Motor.cleanup()
-cv2.destroyAllWindows() 
+print(tracker.stats())
+print(gate.stats())
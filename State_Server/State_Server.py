@@ -0,0 +1,80 @@
+from RPi_Robot_Hat_Lib import RobotController
+from Ultrasonic_sens import Ultrasonic
+from IRSens import IRsens
+from RobotBus import Bus, Poller
+from SharedState import SharedState
+import time
+import signal
+import sys
+
+# Owner of the shared-memory state table: the only process that talks to the
+# sensors. Battery.py, the mobile controller with obstacle alert (ultrasonic),
+# self-test.py and monitoring tools read the latest values from shared memory
+# instead of opening the hardware.
+
+ENCODER_RATE = 50     # Hz
+LINE_RATE = 50        # Hz
+ULTRASONIC_RATE = 3   # Hz (one cycle reads all three sensors ~0.25s)
+BATTERY_RATE = 1      # Hz
+STATS_INTERVAL = 30   # s
+
+
+robot = RobotController()
+ultrasonic = Ultrasonic()
+ir = IRsens()
+state = SharedState(create=True)
+bus = Bus()
+
+# Every producer publishes on the bus; the subscriptions below copy each
+# reading into its shared state group
+GROUP_TOPICS = {
+    "encoders": "sensor/encoders",
+    "line": "sensor/line",
+    "ultrasonic": "sensor/ultrasonic",
+    "battery": "sensor/battery",
+    "ir": "sensor/ir",
+}
+for group, topic in GROUP_TOPICS.items():
+    bus.subscribe(topic, callback=lambda message, group=group: state.write_sample(group, message.value))
+
+pollers = [
+    Poller(bus, "sensor/encoders", robot.get_all_encoder_samples, ENCODER_RATE),
+    Poller(bus, "sensor/line", robot.get_line_sample, LINE_RATE),
+    Poller(bus, "sensor/ultrasonic", ultrasonic.samples, ULTRASONIC_RATE),
+    Poller(bus, "sensor/battery", robot.get_battery_sample, BATTERY_RATE),
+]
+# IR is edge-triggered: write the initial state, then every debounced transition.
+# The initial write comes first so the GPIO callback thread is the only writer
+# of the ir group afterwards (the seqlock allows a single writer)
+bus.publish("sensor/ir", ir.sample())
+ir.on_change(lambda sample: bus.publish("sensor/ir", sample))
+
+
+def handle_sigterm(signum, frame):
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+def main():
+    print(f"State server started (shared memory '{state.name}')")
+    for poller in pollers:
+        poller.start()
+    while True:
+        time.sleep(STATS_INTERVAL)
+        bus.print_stats()
+
+
+try:
+    if __name__ == "__main__":
+        main()
+except KeyboardInterrupt:
+    print("Program stopped by User")
+finally:
+    for poller in pollers:
+        poller.stop(timeout=1)
+    ir.cleanup()
+    ultrasonic.cleanup()
+    robot.cleanup()
+    state.close()
+    print("State server stopped")
@@ -1,6 +1,7 @@
 from RPi_Robot_Hat_Lib import RobotController
 from Ultrasonic_sens import Ultrasonic
 from IRSens import IRsens
+from SharedState import SharedState
 import time
 import board
 import busio
@@ -53,6 +54,7 @@ def test_menu():
     print("13. Camera test")
     print("14. OLED test")
     print("15. I2C test")
+    print("16. Shared state monitor")
     print("0. Exit")
 
 def test_i2C():
@@ -486,6 +488,26 @@ def test_ir_sensor():
         ir.cleanup()
         print("IR sensor test complete.\n")
 
+def test_shared_state():
+    print("\nReading shared state for 5 seconds...")
+    state = SharedState.attach()
+    if state is None:
+        print("No shared state found. Start State_Server/State_Server.py first.\n")
+        return
+    try:
+        print(f"Attached to state server (pid {state.owner_pid})")
+        start = time.time()
+        while time.time() - start < 5:
+            for name, sample in state.snapshot().items():
+                print(f"  {name:<11} age={sample.age():6.3f}s value={sample.value}")
+            print()
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nShared state test interrupted.")
+    finally:
+        state.close()
+        print("Shared state test complete.\n")
+
 def main():
     robot = RobotController(wheel_diameter=98)
     oled_objects = initialize_oled()
@@ -498,7 +520,7 @@ def main():
             # print("Library versin: ", robot.__version__())
             robot.__version__() 
             test_menu()
-            choice = input("\nSelect test (0-15): ")
+            choice = input("\nSelect test (0-16): ")
             if choice == '0':
                 break
             elif choice == '1':
@@ -531,6 +553,8 @@ def main():
                 test_OLED()
             elif choice == '15':
                 test_i2C()
+            elif choice == '16':
+                test_shared_state()
             else:
                 print("Invalid choice!")
                 
@@ -206,9 +206,12 @@ echo "Step 5): Install local libraries"
 echo "=============================================================="
 ROBOT_PATH=$(pwd)
 echo "Installing local libraries (skip if same version already installed)..."
+# Robot_Core first: the other libraries depend on it
+install_local_if_needed "$ROBOT_PATH/Libraries/Robot_Core" "robot-core-lib" || true
 install_local_if_needed "$ROBOT_PATH/Libraries/RPi_Robot_Hat_Lib" "rpi-robot-hat-lib" || true
 install_local_if_needed "$ROBOT_PATH/Libraries/Ultrasonic_Sensor" "ultrasonic-sensor-lib" || true
 install_local_if_needed "$ROBOT_PATH/Libraries/IR_Sensor" "ir-sensor-lib" || true
+install_local_if_needed "$ROBOT_PATH/Libraries/Robot_Vision" "robot-vision-lib" || true
 check_status "Local libraries installation"
 
 # Consolidated RPi_Robot_Hat_Lib installation to avoid redundancy
@@ -221,7 +224,7 @@ if [ -d "$ROBOT_PATH/Libraries/RPi_Robot_Hat_Lib" ]; then
 fi
 
 # Verify custom library installations
-custom_libraries=("RPi_Robot_Hat_Lib" "Ultrasonic_Sensor" "IR_Sensor")
+custom_libraries=("RPi_Robot_Hat_Lib" "Ultrasonic_Sensor" "IR_Sensor" "Robot_Core" "Robot_Vision")
 for lib in "${custom_libraries[@]}"; do
     echo "Verifying $lib installation..."
     if python3 -c "import $lib" 2>/dev/null; then
@@ -242,6 +245,22 @@ for lib in "${custom_libraries[@]}"; do
             echo "✗ IR_Sensor installation failed or not working"
             exit 1
         fi
+    # Robot_Core installs its modules (SimGPIO, ...) at top level
+    elif [ "$lib" == "Robot_Core" ]; then
+        if python3 -c "import SimGPIO" 2>/dev/null; then
+            echo "✓ Robot_Core installed and working"
+        else
+            echo "✗ Robot_Core installation failed or not working"
+            exit 1
+        fi
+    # Robot_Vision installs its modules (CameraService, ...) at top level
+    elif [ "$lib" == "Robot_Vision" ]; then
+        if python3 -c "import CameraService" 2>/dev/null; then
+            echo "✓ Robot_Vision installed and working"
+        else
+            echo "✗ Robot_Vision installation failed or not working"
+            exit 1
+        fi
     else
         echo "✗ $lib installation failed or not working"
         exit 1
@@ -381,6 +400,8 @@ echo "- Local libraries installed and verified:"
 echo "    - RPi_Robot_Hat_Lib ($(get_dist_version rpi-robot-hat-lib))"
 echo "    - Ultrasonic_Sensor ($(get_dist_version ultrasonic-sensor-lib))"
 echo "    - IR_Sensor ($(get_dist_version ir-sensor-lib))"
+echo "    - Robot_Core ($(get_dist_version robot-core-lib))"
+echo "    - Robot_Vision ($(get_dist_version robot-vision-lib))"
 echo "- Interfaces enabled if needed: I2C, Camera"
 echo "- Permissions updated: added $USER to gpio,i2c,spi groups"
 echo "- GPIO stack: removed conflicting RPi.GPIO; installed python3-rpi-lgpio (Pi 5 compatible)"